@@ -0,0 +1,318 @@
+"""
+API views for appointments.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.api import CamposEsparsosMixin, CamposEsparsosSerializerMixin
+from apps.core.paginacao import CursorPaginacao
+from apps.core.cache import get_version
+from apps.core.utils import inicio_do_dia
+from .cache import FUNCIONARIOS_VERSION_KEY, get_funcionarios_do_servico, get_horarios_livres
+from .disponibilidade import AgendaFuncionarios
+from .lote import criar_em_lote
+from .models import Agendamento
+
+
+def reservar_horario(funcionario_id, servico, inicio, excluir_ids=None):
+    """
+    Lock the employee and check that [inicio, inicio + duration) is free,
+    with no booking starting within the service interval after it.
+    Must run inside the transaction that writes the appointment.
+    """
+    from apps.funcionarios.models import Funcionario
+
+    funcionarios = list(
+        Funcionario.objects.select_for_update().filter(pk=funcionario_id, status='ativo', is_active=True)
+    )
+    fim = inicio + timedelta(minutes=servico.duracao_em_minutos)
+    agenda = AgendaFuncionarios(funcionarios, inicio, fim, excluir_ids=excluir_ids)
+    if not agenda.esta_livre(funcionario_id, inicio, fim, servico.intervalo_entre_servicos or 0):
+        raise ValidationError({'data_hora': 'Horário indisponível para o funcionário.'})
+
+
+class AgendamentoSerializer(CamposEsparsosSerializerMixin, serializers.ModelSerializer):
+    cliente_nome = serializers.CharField(source='cliente.nome', read_only=True)
+    funcionario_nome = serializers.CharField(source='funcionario.nome', read_only=True)
+    servico_nome = serializers.CharField(source='servico.nome', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = Agendamento
+        fields = [
+            'id', 'cliente', 'cliente_nome', 'funcionario', 'funcionario_nome',
+            'servico', 'servico_nome', 'pacote', 'data_hora', 'data_hora_fim',
+            'duracao_prevista', 'status', 'status_display', 'origem',
+            'valor_servico', 'desconto_aplicado', 'valor_final',
+            'forma_pagamento', 'pago', 'observacoes', 'observacoes_cliente',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = [
+            'data_hora_fim', 'duracao_prevista', 'status', 'valor_servico',
+            'valor_final', 'pago', 'created_at', 'updated_at',
+        ]
+        # Columns read by the fields that are not a plain model attribute
+        dependencias = {'status_display': ['status']}
+
+    def validate(self, attrs):
+        from apps.servicos.catalogo import get_catalogo
+
+        catalogo = get_catalogo()
+        servico = catalogo.servicos.get(attrs['servico'].pk)
+        if servico is None or not servico.is_disponivel:
+            raise ValidationError({'servico': 'Serviço indisponível para agendamento.'})
+        if not catalogo.pode_realizar(servico.pk, attrs['funcionario'].pk):
+            raise ValidationError({'funcionario': 'Funcionário não realiza este serviço.'})
+        if attrs['data_hora'] <= timezone.now():
+            raise ValidationError({'data_hora': 'O agendamento deve ser para uma data futura.'})
+        if not attrs['cliente'].is_active:
+            raise ValidationError({'cliente': 'Cliente inativo.'})
+        if attrs.get('pacote') is not None:
+            from apps.clientes.models import SaldoPacote
+            if SaldoPacote.objects.disponivel(attrs['cliente'], servico, pacote=attrs['pacote']) <= 0:
+                raise ValidationError({'pacote': 'O cliente não tem saldo deste pacote para o serviço.'})
+        attrs['servico'] = servico
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                reservar_horario(
+                    validated_data['funcionario'].pk, validated_data['servico'], validated_data['data_hora']
+                )
+                return Agendamento.objects.create(usuario_agendou=self.context['request'].user, **validated_data)
+        except DjangoValidationError as erro:
+            # Balance taken by a concurrent booking after validate()
+            raise ValidationError(erro.message_dict)
+
+
+class AgendamentoLoteSerializer(serializers.Serializer):
+    """One row of a bulk creation request (ids validated in bulk by criar_em_lote)"""
+    chave_idempotencia = serializers.CharField(max_length=100, required=False)
+    cliente = serializers.IntegerField(min_value=1)
+    funcionario = serializers.IntegerField(min_value=1)
+    servico = serializers.IntegerField(min_value=1)
+    pacote = serializers.IntegerField(min_value=1, required=False)
+    data_hora = serializers.DateTimeField()
+    desconto_aplicado = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    origem = serializers.ChoiceField(choices=Agendamento.ORIGEM_CHOICES, required=False)
+    observacoes = serializers.CharField(required=False, allow_blank=True)
+    observacoes_cliente = serializers.CharField(required=False, allow_blank=True)
+
+
+class AgendamentoPaginacao(CursorPaginacao):
+    ordering = ('-data_hora', '-id')
+
+
+class AgendamentoViewSet(CamposEsparsosMixin,
+                         mixins.ListModelMixin,
+                         mixins.RetrieveModelMixin,
+                         mixins.CreateModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    Appointments: list (filters `data_inicio`, `data_fim`, `funcionario`,
+    `cliente`, `servico`, `status`), retrieve, create (one or in bulk) and
+    status transitions. `?fields=` selects the returned fields and the
+    loaded columns.
+    """
+    serializer_class = AgendamentoSerializer
+    pagination_class = AgendamentoPaginacao
+    campos_obrigatorios = ('id', 'data_hora')
+
+    def get_queryset(self):
+        queryset = Agendamento.objects.filter(is_active=True).select_related('cliente', 'funcionario', 'servico')
+        if self.action == 'list':
+            queryset = self.filtrar(queryset)
+        return self.projetar(queryset)
+
+    def filtrar(self, queryset):
+        parametros = self.request.query_params
+
+        for nome, lookup in (('data_inicio', 'data_hora__gte'), ('data_fim', 'data_hora__lt')):
+            if parametros.get(nome):
+                dia = parse_date(parametros[nome])
+                if dia is None:
+                    raise ValidationError({nome: 'Informe a data no formato AAAA-MM-DD.'})
+                if nome == 'data_fim':
+                    dia += timedelta(days=1)
+                queryset = queryset.filter(**{lookup: inicio_do_dia(dia)})
+
+        for nome in ('funcionario', 'cliente', 'servico'):
+            if parametros.get(nome):
+                if not parametros[nome].isdigit():
+                    raise ValidationError({nome: 'Informe um id numérico.'})
+                queryset = queryset.filter(**{f'{nome}_id': int(parametros[nome])})
+
+        if parametros.get('status'):
+            lista = parametros['status'].split(',')
+            invalidos = set(lista) - {valor for valor, _ in Agendamento.STATUS_CHOICES}
+            if invalidos:
+                raise ValidationError({'status': f"Status inválido(s): {', '.join(sorted(invalidos))}"})
+            queryset = queryset.filter(status__in=lista)
+        return queryset
+
+    @action(detail=False, methods=['post'])
+    def lote(self, request):
+        """
+        Create up to AGENDAMENTOS_LOTE_MAXIMO appointments, sent as a list or
+        as {"agendamentos": [...]}, with one result per row. Rows carrying a
+        `chave_idempotencia` already used by the caller are not booked again.
+        """
+        linhas = request.data.get('agendamentos') if isinstance(request.data, dict) else request.data
+        if not isinstance(linhas, list) or not linhas:
+            raise ValidationError({'agendamentos': 'Envie uma lista de agendamentos.'})
+        maximo = getattr(settings, 'AGENDAMENTOS_LOTE_MAXIMO', 500)
+        if len(linhas) > maximo:
+            raise ValidationError({'agendamentos': f'Envie no máximo {maximo} agendamentos por lote.'})
+
+        resultados = [None] * len(linhas)
+        validas = []
+        for indice, linha in enumerate(linhas):
+            serializer = AgendamentoLoteSerializer(data=linha)
+            if serializer.is_valid():
+                validas.append((indice, serializer.validated_data))
+            else:
+                resultados[indice] = {'status': 'erro', 'id': None, 'erros': serializer.errors}
+
+        if validas:
+            try:
+                criados = criar_em_lote([dados for _, dados in validas], request.user)
+            except IntegrityError:
+                # Another request stored the same idempotency keys meanwhile
+                return Response(
+                    {'detail': 'Lote concorrente com as mesmas chaves de idempotência. Tente novamente.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            for (indice, _), resultado in zip(validas, criados):
+                resultados[indice] = resultado
+
+        totais = {'criado': 0, 'existente': 0, 'erro': 0}
+        for indice, resultado in enumerate(resultados):
+            resultado['indice'] = indice
+            totais[resultado['status']] += 1
+        return Response({
+            'criados': totais['criado'],
+            'existentes': totais['existente'],
+            'erros': totais['erro'],
+            'resultados': resultados,
+        })
+
+    def _resultado(self, agendamento, sucesso, acao):
+        if not sucesso:
+            raise ValidationError({
+                'status': f'Não é possível {acao} um agendamento com status {agendamento.get_status_display()}.'
+            })
+        return Response(self.get_serializer(agendamento).data)
+
+    @action(detail=True, methods=['post'])
+    def confirmar(self, request, pk=None):
+        agendamento = self.get_object()
+        return self._resultado(agendamento, agendamento.confirmar(usuario=request.user), 'confirmar')
+
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        agendamento = self.get_object()
+        sucesso = agendamento.cancelar(motivo=request.data.get('motivo', ''), usuario=request.user)
+        return self._resultado(agendamento, sucesso, 'cancelar')
+
+    @action(detail=True, methods=['post'])
+    def iniciar(self, request, pk=None):
+        agendamento = self.get_object()
+        return self._resultado(agendamento, agendamento.iniciar_atendimento(usuario=request.user), 'iniciar')
+
+    @action(detail=True, methods=['post'])
+    def concluir(self, request, pk=None):
+        agendamento = self.get_object()
+        sucesso = agendamento.concluir_atendimento(
+            observacoes_funcionario=request.data.get('observacoes_funcionario', ''),
+            usuario=request.user
+        )
+        return self._resultado(agendamento, sucesso, 'concluir')
+
+    @action(detail=True, methods=['post'], url_path='nao-compareceu')
+    def nao_compareceu(self, request, pk=None):
+        agendamento = self.get_object()
+        sucesso = Agendamento.objects.filter(pk=agendamento.pk).marcar_nao_compareceu(usuario=request.user)
+        agendamento.refresh_from_db()
+        return self._resultado(agendamento, sucesso, 'marcar como não compareceu')
+
+    @action(detail=True, methods=['post'])
+    def reagendar(self, request, pk=None):
+        agendamento = self.get_object()
+        try:
+            data_hora = serializers.DateTimeField().run_validation(request.data.get('data_hora'))
+        except ValidationError as erro:
+            raise ValidationError({'data_hora': erro.detail})
+        if data_hora <= timezone.now():
+            raise ValidationError({'data_hora': 'O agendamento deve ser para uma data futura.'})
+
+        try:
+            with transaction.atomic():
+                reservar_horario(
+                    agendamento.funcionario_id, agendamento.servico, data_hora, excluir_ids=[agendamento.pk]
+                )
+                novo = agendamento.reagendar(data_hora, motivo=request.data.get('motivo', ''), usuario=request.user)
+        except DjangoValidationError as erro:
+            raise ValidationError(erro.message_dict)
+        if novo is None:
+            return self._resultado(agendamento, False, 'reagendar')
+        return Response(self.get_serializer(novo).data, status=status.HTTP_201_CREATED)
+
+
+class DisponibilidadeView(APIView):
+    """
+    Free start times for a service on a day (`servico`, `data`), for every
+    enabled employee or only `funcionario`. Served from the availability
+    cache, recomputed only when an affected agenda changed.
+    """
+
+    def get(self, request):
+        from apps.servicos.catalogo import get_catalogo
+
+        parametros = request.query_params
+        if not parametros.get('servico', '').isdigit():
+            raise ValidationError({'servico': 'Informe o id do serviço.'})
+        dia = parse_date(parametros.get('data', ''))
+        if dia is None:
+            raise ValidationError({'data': 'Informe a data no formato AAAA-MM-DD.'})
+        if dia < timezone.localdate():
+            raise ValidationError({'data': 'A data não pode estar no passado.'})
+
+        catalogo = get_catalogo()
+        servico = catalogo.servicos.get(int(parametros['servico']))
+        if servico is None or not servico.is_disponivel:
+            raise ValidationError({'servico': 'Serviço indisponível para agendamento.'})
+
+        versao_funcionarios = get_version(FUNCIONARIOS_VERSION_KEY)
+        funcionarios = get_funcionarios_do_servico(servico.pk, catalogo.versao, versao_funcionarios)
+        if parametros.get('funcionario'):
+            funcionarios = [
+                (funcionario_id, nome) for funcionario_id, nome in funcionarios
+                if str(funcionario_id) == parametros['funcionario']
+            ]
+            if not funcionarios:
+                raise ValidationError({'funcionario': 'Funcionário não realiza este serviço.'})
+
+        horarios = get_horarios_livres(
+            servico, dia, [funcionario_id for funcionario_id, _ in funcionarios],
+            catalogo.versao, versao_funcionarios
+        ) if funcionarios else {}
+        return Response({
+            'servico': servico.pk,
+            'data': dia,
+            'duracao': servico.duracao_em_minutos,
+            'funcionarios': [
+                {'id': funcionario_id, 'nome': nome, 'horarios': horarios[funcionario_id]}
+                for funcionario_id, nome in funcionarios
+            ],
+        })
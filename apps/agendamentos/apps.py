@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AgendamentosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.agendamentos'
+    verbose_name = 'Agendamentos'
+
+    def ready(self):
+        import apps.agendamentos.signals
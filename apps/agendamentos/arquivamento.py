@@ -0,0 +1,131 @@
+"""
+Archival of old appointments into AgendamentoArquivado.
+
+Appointments in a final status older than N years are moved in batches,
+together with their status history, notifications and idempotency keys.
+Package movements stay in the ledger pointing at the archived id
+(AgendamentoArquivado.agendamento_id). Appointments still referenced by a
+rescheduled appointment stay in place until that one is archived. Each
+batch runs in its own transaction, so the job can be interrupted and resumed.
+"""
+from collections import defaultdict
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.clientes.models import MovimentoPacote
+from apps.core.cache import agrupar_invalidacoes
+from apps.core.contadores import agrupar_contagens
+from .models import Agendamento, AgendamentoArquivado, ChaveIdempotencia, Notificacao, StatusAgendamento
+
+STATUS_ARQUIVAVEIS = ['concluido', 'cancelado', 'nao_compareceu', 'reagendado']
+
+
+def serializar(instancia):
+    """Return the concrete column values of a model instance"""
+    return {field.attname: getattr(instancia, field.attname) for field in instancia._meta.concrete_fields}
+
+
+def get_agendamentos_arquivaveis(anos):
+    """
+    Appointments eligible for archival (final status, older than `anos`
+    years, not referenced by a rescheduled appointment)
+    """
+    corte = timezone.now() - relativedelta(years=anos)
+    return Agendamento.objects.filter(
+        data_hora__lt=corte,
+        status__in=STATUS_ARQUIVAVEIS
+    ).exclude(
+        Exists(Agendamento.objects.filter(agendamento_original_id=OuterRef('pk')))
+    )
+
+
+def get_referenciados(ids):
+    """Ids among `ids` still referenced by appointments outside `ids`"""
+    return set(
+        Agendamento.objects.filter(agendamento_original_id__in=ids).exclude(pk__in=ids)
+        .values_list('agendamento_original_id', flat=True)
+    )
+
+
+def arquivar_lote(agendamentos):
+    """
+    Move a list of appointments and their children to the archive table.
+    Appointments still referenced (see get_referenciados) are skipped.
+    Returns the archived appointments.
+    """
+    referenciados = get_referenciados([agendamento.pk for agendamento in agendamentos])
+    agendamentos = [agendamento for agendamento in agendamentos if agendamento.pk not in referenciados]
+    ids = [agendamento.pk for agendamento in agendamentos]
+    if not ids:
+        return agendamentos
+
+    historicos = defaultdict(list)
+    for historico in StatusAgendamento.objects.filter(agendamento_id__in=ids).order_by('data_mudanca'):
+        historicos[historico.agendamento_id].append(serializar(historico))
+
+    notificacoes = defaultdict(list)
+    for notificacao in Notificacao.objects.filter(agendamento_id__in=ids).order_by('data_agendamento'):
+        notificacoes[notificacao.agendamento_id].append(serializar(notificacao))
+
+    movimentos = list(MovimentoPacote.objects.filter(agendamento_id__in=ids).only('pk', 'agendamento_id'))
+
+    chaves = defaultdict(list)
+    for chave in ChaveIdempotencia.objects.filter(agendamento_id__in=ids):
+        chaves[chave.agendamento_id].append(serializar(chave))
+
+    AgendamentoArquivado.objects.bulk_create([
+        AgendamentoArquivado(
+            agendamento_id=agendamento.pk,
+            cliente_id=agendamento.cliente_id,
+            servico_id=agendamento.servico_id,
+            data_hora=agendamento.data_hora,
+            status=agendamento.status,
+            valor_final=agendamento.valor_final,
+            is_active=agendamento.is_active,
+            dados={
+                'agendamento': serializar(agendamento),
+                'historico_status': historicos[agendamento.pk],
+                'notificacoes': notificacoes[agendamento.pk],
+                'chaves_idempotencia': chaves[agendamento.pk],
+            },
+        )
+        for agendamento in agendamentos
+    ])
+
+    # The delete signals run once per row: apply their counter adjustments
+    # and cache invalidations once for the whole batch
+    with agrupar_contagens(), agrupar_invalidacoes():
+        StatusAgendamento.objects.filter(agendamento_id__in=ids).delete()
+        Notificacao.objects.filter(agendamento_id__in=ids).delete()
+        ChaveIdempotencia.objects.filter(agendamento_id__in=ids).delete()
+        Agendamento.objects.filter(pk__in=ids).delete()
+
+    # The delete set their link to NULL: point them at the archived id again
+    MovimentoPacote.objects.bulk_update(movimentos, ['agendamento'], batch_size=1000)
+    return agendamentos
+
+
+def arquivar_agendamentos(anos=2, lote=500, limite=None):
+    """
+    Archive eligible appointments in batches of `lote`.
+    Returns the number of archived appointments.
+    """
+    total = 0
+    while limite is None or total < limite:
+        tamanho = lote if limite is None else min(lote, limite - total)
+        with transaction.atomic():
+            agendamentos = list(
+                get_agendamentos_arquivaveis(anos)
+                .select_for_update(skip_locked=True)
+                .order_by('data_hora')[:tamanho]
+            )
+            if not agendamentos:
+                break
+            arquivados = arquivar_lote(agendamentos)
+        if not arquivados:
+            break
+        total += len(arquivados)
+    return total
@@ -0,0 +1,105 @@
+"""
+Availability cache.
+
+Free slots are cached per (service, day, employee set). Each key embeds the
+catalog version, the employees version and one version per (employee, day);
+an appointment created, moved or cancelled bumps only the versions of its
+employee on its days, so every other entry keeps being served from cache.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.cache import bump_version_on_commit, bump_versions_on_commit, get_or_compute, get_versions
+
+FUNCIONARIOS_VERSION_KEY = 'agendamentos:funcionarios:version'
+
+
+def chave_versao_agenda(funcionario_id, dia):
+    """Version key of an employee's agenda on a day"""
+    return f'agendamentos:agenda:{funcionario_id}:{dia.isoformat()}:version'
+
+
+def dias_da_ocupacao(inicio, fim):
+    """
+    Local days whose availability depends on a busy interval (the day
+    before included, since an overnight shift may reach it).
+    """
+    dia = timezone.localtime(inicio).date() - timedelta(days=1)
+    while dia <= timezone.localtime(fim).date():
+        yield dia
+        dia += timedelta(days=1)
+
+
+def invalidar_agendas(ocupacoes):
+    """Invalidate the agendas touched by (funcionario_id, inicio, fim) intervals after commit"""
+    chaves = {
+        chave_versao_agenda(funcionario_id, dia)
+        for funcionario_id, inicio, fim in ocupacoes
+        for dia in dias_da_ocupacao(inicio, fim)
+    }
+    if chaves:
+        bump_versions_on_commit(chaves)
+
+
+def invalidar_funcionarios():
+    """Invalidate every cached availability after employee data (shifts, status) changed"""
+    bump_version_on_commit(FUNCIONARIOS_VERSION_KEY)
+
+
+def _timeout():
+    return getattr(settings, 'DISPONIBILIDADE_CACHE_TIMEOUT', 300)
+
+
+def get_funcionarios_do_servico(servico_id, versao_catalogo, versao_funcionarios):
+    """Return [(id, nome)] of the active employees able to perform a service"""
+    from .disponibilidade import get_funcionarios_habilitados
+
+    return get_or_compute(
+        f'agendamentos:habilitados:{servico_id}:{versao_catalogo}:{versao_funcionarios}',
+        lambda: [
+            (funcionario.pk, funcionario.nome)
+            for funcionario in get_funcionarios_habilitados({servico_id})[servico_id]
+        ],
+        timeout=_timeout(),
+    )
+
+
+def get_horarios_livres(servico, dia, funcionario_ids, versao_catalogo, versao_funcionarios):
+    """
+    Return {funcionario_id: [free start datetimes]} for a service on a day,
+    computed with one calendar load on a cache miss. Past start times are
+    dropped at read time, so cached entries for today stay valid.
+    """
+    from apps.funcionarios.models import Funcionario
+    from .disponibilidade import AgendaFuncionarios, intervalo_dias
+
+    ids = sorted(funcionario_ids)
+    versoes = get_versions([chave_versao_agenda(funcionario_id, dia) for funcionario_id in ids])
+    assinatura = hashlib.sha1(
+        '|'.join(f'{chave}={versoes[chave]}' for chave in sorted(versoes)).encode()
+    ).hexdigest()
+
+    def calcular():
+        agenda = AgendaFuncionarios(Funcionario.objects.filter(pk__in=ids), *intervalo_dias(dia, 2))
+        return {
+            funcionario_id: agenda.horarios_livres(
+                funcionario_id, dia, servico.duracao_em_minutos, intervalo=servico.intervalo_entre_servicos or 0
+            )
+            for funcionario_id in ids
+        }
+
+    horarios = get_or_compute(
+        f'agendamentos:disponibilidade:{servico.pk}:{dia.isoformat()}:'
+        f'{versao_catalogo}:{versao_funcionarios}:{assinatura}',
+        calcular,
+        timeout=_timeout(),
+        stale_timeout=getattr(settings, 'DISPONIBILIDADE_STALE_TIMEOUT', 60),
+    )
+    agora = timezone.now()
+    return {
+        funcionario_id: [inicio for inicio in livres if inicio > agora]
+        for funcionario_id, livres in horarios.items()
+    }
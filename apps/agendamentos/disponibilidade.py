@@ -0,0 +1,196 @@
+"""
+Slot availability engine.
+
+Loads the busy intervals of a set of employees for a date range with a
+single query and answers availability questions in memory, so batch jobs
+(rescheduling, recurrences, package planning) don't query per slot.
+"""
+import bisect
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from apps.core.utils import inicio_do_dia
+from .models import Agendamento
+
+DIAS_SEMANA = {'seg': 0, 'ter': 1, 'qua': 2, 'qui': 3, 'sex': 4, 'sab': 5, 'dom': 6}
+
+# Statuses that keep the employee busy
+STATUS_OCUPADOS = ['agendado', 'confirmado', 'em_andamento', 'concluido']
+
+# Granularity of the offered start times, in minutes
+PASSO_PADRAO = 15
+
+
+def get_dias_trabalho(funcionario):
+    """
+    Return the weekdays (0 = Monday) an employee works, parsed from
+    `dias_trabalho` ("seg-sex", "seg-sab", "seg,qua,sex"...).
+    """
+    dias = set()
+    for parte in (funcionario.dias_trabalho or 'seg-sex').lower().replace(' ', '').split(','):
+        if '-' in parte:
+            inicio, fim = (DIAS_SEMANA.get(dia) for dia in parte.split('-', 1))
+            if inicio is None or fim is None:
+                continue
+            dia = inicio
+            dias.add(dia)
+            while dia != fim:
+                dia = (dia + 1) % 7
+                dias.add(dia)
+        elif parte in DIAS_SEMANA:
+            dias.add(DIAS_SEMANA[parte])
+    return dias or set(range(5))
+
+
+def get_expediente(funcionario, dia):
+    """Return the (start, end) working window of an employee on a day, or None"""
+    if dia.weekday() not in get_dias_trabalho(funcionario):
+        return None
+    inicio = timezone.make_aware(datetime.combine(dia, funcionario.horario_entrada))
+    fim = timezone.make_aware(datetime.combine(dia, funcionario.horario_saida))
+    if fim <= inicio:
+        # Shift ending after midnight
+        fim += timedelta(days=1)
+    return inicio, fim
+
+
+class AgendaFuncionarios:
+    """
+    In-memory calendars of a set of employees over [inicio, fim).
+    Intervals reserved through `reservar` are taken into account by the
+    following searches, so a batch can place several appointments
+    consistently before writing them.
+    """
+
+    def __init__(self, funcionarios, inicio, fim, excluir_ids=None):
+        self.funcionarios = {funcionario.pk: funcionario for funcionario in funcionarios}
+        self.inicio = inicio
+        self.fim = fim
+        self.ocupacao = defaultdict(list)
+        self._carregar(excluir_ids or [])
+
+    def _carregar(self, excluir_ids):
+        """
+        Load the busy intervals of every employee with one query. The window
+        is widened by the longest service interval, so bookings whose interval
+        reaches into it, and those a new booking's interval reaches, are seen.
+        """
+        from apps.servicos.models import Servico
+
+        margem = timedelta(minutes=Servico.objects.aggregate(
+            maior=Max('intervalo_entre_servicos')
+        )['maior'] or 0)
+        agendamentos = Agendamento.objects.filter(
+            funcionario_id__in=list(self.funcionarios),
+            status__in=STATUS_OCUPADOS,
+            is_active=True,
+            data_hora__lt=self.fim + margem,
+            data_hora__gte=self.inicio - timedelta(days=1),
+        ).filter(
+            Q(data_hora_fim__gt=self.inicio - margem) | Q(data_hora_fim__isnull=True)
+        ).exclude(
+            pk__in=excluir_ids
+        ).values_list(
+            'funcionario_id', 'data_hora', 'data_hora_fim', 'duracao_prevista',
+            'servico__intervalo_entre_servicos'
+        )
+
+        for funcionario_id, inicio, fim, duracao, intervalo in agendamentos:
+            fim = fim or inicio + timedelta(minutes=duracao)
+            self.reservar(funcionario_id, inicio, fim + timedelta(minutes=intervalo or 0))
+
+    def reservar(self, funcionario_id, inicio, fim):
+        """Mark an interval as busy"""
+        bisect.insort(self.ocupacao[funcionario_id], (inicio, fim))
+
+    def esta_livre(self, funcionario_id, inicio, fim, intervalo=0):
+        """
+        Check if the employee works in [inicio, fim) and has no booking in
+        it, nor one starting within the `intervalo` minutes after it
+        """
+        funcionario = self.funcionarios.get(funcionario_id)
+        if funcionario is None:
+            return False
+
+        dia = timezone.localtime(inicio).date()
+        expediente = get_expediente(funcionario, dia) or get_expediente(funcionario, dia - timedelta(days=1))
+        if expediente is None or inicio < expediente[0] or fim > expediente[1]:
+            return False
+
+        ocupados = self.ocupacao[funcionario_id]
+        posicao = bisect.bisect_left(ocupados, (fim + timedelta(minutes=intervalo),))
+        return all(ocupado_fim <= inicio for _, ocupado_fim in ocupados[:posicao])
+
+    def horarios_livres(self, funcionario_id, dia, duracao, a_partir_de=None, intervalo=0, passo=PASSO_PADRAO):
+        """
+        Return every free start time of an employee on a day for a duration
+        in minutes followed by an interval of `intervalo` minutes
+        """
+        funcionario = self.funcionarios.get(funcionario_id)
+        expediente = get_expediente(funcionario, dia) if funcionario else None
+        if expediente is None:
+            return []
+
+        inicio, fim_expediente = expediente
+        limite = max(a_partir_de or inicio, self.inicio, timezone.now())
+        if limite > inicio:
+            # Align to the grid of the working window
+            passos = -(-(limite - inicio) // timedelta(minutes=passo))
+            inicio += timedelta(minutes=passo * passos)
+
+        duracao = timedelta(minutes=duracao)
+        horarios = []
+        while inicio + duracao <= fim_expediente:
+            if self.esta_livre(funcionario_id, inicio, inicio + duracao, intervalo):
+                horarios.append(inicio)
+            inicio += timedelta(minutes=passo)
+        return horarios
+
+    def primeiro_horario(self, funcionario_ids, dia, duracao, a_partir_de=None, intervalo=0):
+        """
+        Return the earliest (funcionario_id, start) among the given employees
+        on a day, or None if nobody is free.
+        """
+        melhor = None
+        for funcionario_id in funcionario_ids:
+            horarios = self.horarios_livres(
+                funcionario_id, dia, duracao, a_partir_de=a_partir_de, intervalo=intervalo
+            )
+            if horarios and (melhor is None or horarios[0] < melhor[1]):
+                melhor = (funcionario_id, horarios[0])
+        return melhor
+
+
+def get_funcionarios_habilitados(servico_ids):
+    """
+    Return {servico_id: [funcionario, ...]} with the active employees able to
+    perform each service (every active employee when none is configured).
+    """
+    from apps.funcionarios.models import Funcionario
+    from apps.servicos.models import Servico
+
+    ativos = {
+        funcionario.pk: funcionario
+        for funcionario in Funcionario.objects.filter(status='ativo', is_active=True)
+    }
+    habilitados = defaultdict(list)
+    for servico_id, funcionario_id in Servico.funcionarios_habilitados.through.objects.filter(
+        servico_id__in=servico_ids
+    ).values_list('servico_id', 'funcionario_id'):
+        habilitados[servico_id].append(funcionario_id)
+
+    return {
+        servico_id: (
+            [ativos[pk] for pk in habilitados[servico_id] if pk in ativos]
+            if servico_id in habilitados else list(ativos.values())
+        )
+        for servico_id in servico_ids
+    }
+
+
+def intervalo_dias(dia_inicial, dias):
+    """Return the [start, end) datetime range covering `dias` days from a date"""
+    return inicio_do_dia(dia_inicial), inicio_do_dia(dia_inicial + timedelta(days=dias))
@@ -0,0 +1,159 @@
+"""
+Bulk appointment creation for integrations.
+
+A batch is validated against the catalog snapshot in memory and against
+the database with a few set-based queries (idempotency keys, clients, package
+balances, the employees' calendars), and the accepted rows are inserted with bulk_create
+in a single transaction. Every row gets its own result, so one bad row does
+not reject the rest of the batch.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.contadores import contar_inseridos
+from apps.servicos.catalogo import get_catalogo
+from apps.servicos.precos import get_tabela_precos
+from .disponibilidade import AgendaFuncionarios
+from .models import Agendamento, ChaveIdempotencia
+from .signals import agendamentos_alterados_em_lote
+
+# Optional appointment fields accepted in a row
+CAMPOS_OPCIONAIS = ['desconto_aplicado', 'origem', 'observacoes', 'observacoes_cliente']
+
+
+def _erro(**erros):
+    return {'status': 'erro', 'id': None, 'erros': erros}
+
+
+def criar_em_lote(linhas, usuario):
+    """
+    Create the appointments described by `linhas`: dicts with `cliente`,
+    `funcionario` and `servico` ids, `data_hora`, and optionally
+    `chave_idempotencia`, a `pacote` id (one session is reserved from the
+    client's balance) plus CAMPOS_OPCIONAIS.
+
+    Returns one result per row, in order:
+        {'status': 'criado' | 'existente' | 'erro', 'id': pk or None, 'erros': {field: message}}
+    A row whose idempotency key was already used by `usuario` is reported
+    as 'existente' with the appointment created the first time.
+    """
+    from apps.clientes.models import Cliente, MovimentoPacote
+    from apps.funcionarios.models import Funcionario
+
+    resultados = [None] * len(linhas)
+    catalogo = get_catalogo()
+    agora = timezone.now()
+
+    with transaction.atomic():
+        # Locked in pk order, so concurrent batches for the same employees
+        # queue up instead of deadlocking or double booking
+        funcionarios = list(Funcionario.objects.select_for_update().filter(
+            pk__in={linha['funcionario'] for linha in linhas},
+            status='ativo',
+            is_active=True
+        ).order_by('pk'))
+        existentes = dict(ChaveIdempotencia.objects.filter(
+            usuario=usuario,
+            chave__in={linha['chave_idempotencia'] for linha in linhas if linha.get('chave_idempotencia')}
+        ).values_list('chave', 'agendamento_id'))
+        clientes = set(Cliente.objects.filter(
+            pk__in={linha['cliente'] for linha in linhas},
+            is_active=True
+        ).values_list('pk', flat=True))
+
+        candidatos = []
+        chaves_lote = set()
+        for indice, linha in enumerate(linhas):
+            chave = linha.get('chave_idempotencia')
+            if chave in existentes:
+                resultados[indice] = {'status': 'existente', 'id': existentes[chave], 'erros': {}}
+                continue
+            if chave in chaves_lote:
+                resultados[indice] = _erro(chave_idempotencia='Chave de idempotência repetida no lote.')
+                continue
+            if chave:
+                chaves_lote.add(chave)
+
+            erros = {}
+            servico = catalogo.servicos.get(linha['servico'])
+            if servico is None or not servico.is_disponivel:
+                erros['servico'] = 'Serviço indisponível para agendamento.'
+            elif not catalogo.pode_realizar(servico.pk, linha['funcionario']):
+                erros['funcionario'] = 'Funcionário não realiza este serviço.'
+            if linha['cliente'] not in clientes:
+                erros['cliente'] = 'Cliente inexistente ou inativo.'
+            if linha['data_hora'] <= agora:
+                erros['data_hora'] = 'O agendamento deve ser para uma data futura.'
+            if erros:
+                resultados[indice] = _erro(**erros)
+                continue
+
+            fim = linha['data_hora'] + timedelta(minutes=servico.duracao_em_minutos)
+            candidatos.append((indice, linha, servico, fim))
+
+        novos = []
+        if candidatos:
+            agenda = AgendaFuncionarios(
+                funcionarios,
+                min(linha['data_hora'] for _, linha, _, _ in candidatos),
+                max(fim for _, _, _, fim in candidatos)
+            )
+            saldos = MovimentoPacote.saldos_disponiveis({
+                (linha['cliente'], servico.pk, linha['pacote'])
+                for _, linha, servico, _ in candidatos if linha.get('pacote')
+            })
+            tabela_precos = get_tabela_precos()
+            for indice, linha, servico, fim in candidatos:
+                intervalo = servico.intervalo_entre_servicos or 0
+                if not agenda.esta_livre(linha['funcionario'], linha['data_hora'], fim, intervalo):
+                    resultados[indice] = _erro(data_hora='Horário indisponível para o funcionário.')
+                    continue
+
+                saldo = (linha['cliente'], servico.pk, linha.get('pacote'))
+                if linha.get('pacote') and saldos[saldo] <= 0:
+                    resultados[indice] = _erro(pacote='Saldo insuficiente no pacote do cliente.')
+                    continue
+
+                agendamento = Agendamento(
+                    cliente_id=linha['cliente'],
+                    funcionario_id=linha['funcionario'],
+                    servico=servico,
+                    pacote_id=linha.get('pacote'),
+                    data_hora=linha['data_hora'],
+                    usuario_agendou=usuario,
+                    **{campo: linha[campo] for campo in CAMPOS_OPCIONAIS if campo in linha}
+                )
+                agendamento.calcular_campos_derivados(tabela_precos)
+                if agendamento.valor_final < 0:
+                    resultados[indice] = _erro(desconto_aplicado='Desconto maior que o valor do serviço.')
+                    continue
+
+                # Later rows of the batch see this booking (and its interval)
+                agenda.reservar(
+                    linha['funcionario'],
+                    linha['data_hora'],
+                    fim + timedelta(minutes=intervalo)
+                )
+                if linha.get('pacote'):
+                    saldos[saldo] -= 1
+                novos.append((indice, linha.get('chave_idempotencia'), agendamento))
+
+        if novos:
+            criados = Agendamento.objects.bulk_create([agendamento for _, _, agendamento in novos])
+            contar_inseridos(Agendamento, criados)
+            # Balances were checked under lock above, so this covers every row
+            MovimentoPacote.reservar(criados)
+            ChaveIdempotencia.objects.bulk_create([
+                ChaveIdempotencia(usuario=usuario, chave=chave, agendamento=agendamento)
+                for _, chave, agendamento in novos if chave
+            ])
+            for indice, _, agendamento in novos:
+                resultados[indice] = {'status': 'criado', 'id': agendamento.pk, 'erros': {}}
+
+            ids = [agendamento.pk for agendamento in criados]
+            transaction.on_commit(lambda: agendamentos_alterados_em_lote.send(
+                sender=Agendamento, ids=ids, status=None
+            ))
+    return resultados
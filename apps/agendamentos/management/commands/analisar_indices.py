@@ -0,0 +1,136 @@
+"""
+Index advisor for the appointment hot paths.
+
+Runs EXPLAIN on the querysets used by the agenda, client pages and
+dashboard, and lists the most expensive statements recorded by
+pg_stat_statements for the appointment table.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.agendamentos.models import Agendamento
+
+TABELA = Agendamento._meta.db_table
+
+
+class Command(BaseCommand):
+    help = 'Analisa os planos de execução das consultas críticas de agendamentos e sugere índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Executa as consultas (EXPLAIN ANALYZE) para obter tempos reais'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Número de consultas do pg_stat_statements a exibir'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('O analisador de índices requer PostgreSQL.')
+
+        for nome, queryset in self.get_consultas_criticas():
+            self.analisar_plano(nome, queryset, options['analyze'])
+
+        self.listar_pg_stat_statements(options['top'])
+
+    def get_consultas_criticas(self):
+        """Return the hot querysets, bound to sample ids from the database"""
+        amostra = Agendamento.objects.values('cliente_id', 'funcionario_id', 'servico_id').first() or {
+            'cliente_id': 1, 'funcionario_id': 1, 'servico_id': 1,
+        }
+        agora = timezone.now()
+
+        return [
+            ('Agenda do funcionário no dia', Agendamento.objects.no_dia().filter(
+                funcionario_id=amostra['funcionario_id'],
+                is_active=True
+            ).exclude(status='cancelado').order_by('data_hora')),
+            ('Último agendamento do cliente', Agendamento.objects.filter(
+                cliente_id=amostra['cliente_id'],
+                is_active=True
+            ).order_by('-data_hora')[:1]),
+            ('Próximo agendamento do cliente', Agendamento.objects.filter(
+                cliente_id=amostra['cliente_id'],
+                data_hora__gte=agora,
+                is_active=True
+            ).exclude(status='cancelado').order_by('data_hora')[:1]),
+            ('Agendamentos do serviço hoje', Agendamento.objects.no_dia().filter(
+                servico_id=amostra['servico_id'],
+                is_active=True
+            ).exclude(status='cancelado')),
+            ('Agendamentos do mês (dashboard)', Agendamento.objects.no_mes().filter(
+                is_active=True
+            ).values('status')),
+        ]
+
+    def analisar_plano(self, nome, queryset, analyze):
+        """Print the plan summary and index suggestions for a queryset"""
+        plano = json.loads(queryset.explain(format='json', analyze=analyze))[0]['Plan']
+        nos = list(self.percorrer_plano(plano))
+
+        self.stdout.write(self.style.MIGRATE_HEADING(nome))
+        self.stdout.write(f"  Custo total: {plano['Total Cost']}")
+        if analyze:
+            self.stdout.write(f"  Tempo real: {plano['Actual Total Time']} ms")
+
+        for no in nos:
+            if no.get('Index Name'):
+                self.stdout.write(f"  {no['Node Type']} usando {no['Index Name']}")
+
+        seq_scans = [no for no in nos if no['Node Type'] == 'Seq Scan' and no.get('Relation Name') == TABELA]
+        sorts = [no for no in nos if no['Node Type'] in ('Sort', 'Incremental Sort')]
+
+        if seq_scans:
+            self.stdout.write(self.style.WARNING(
+                f"  Seq Scan em {TABELA}; filtro: {seq_scans[0].get('Filter', '-')}"
+            ))
+        if sorts:
+            self.stdout.write(self.style.WARNING(
+                f"  Ordenação explícita por {', '.join(sorts[0].get('Sort Key', []))}; "
+                "considere um índice composto que já entregue a ordem"
+            ))
+        if not seq_scans and not sorts:
+            self.stdout.write(self.style.SUCCESS('  Plano atendido por índices'))
+
+    def percorrer_plano(self, no):
+        """Yield every node of an EXPLAIN (FORMAT JSON) plan"""
+        yield no
+        for filho in no.get('Plans', []):
+            yield from self.percorrer_plano(filho)
+
+    def listar_pg_stat_statements(self, top):
+        """Print the most expensive statements touching the appointment table"""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+            if cursor.fetchone() is None:
+                self.stdout.write(self.style.NOTICE(
+                    'Extensão pg_stat_statements não instalada; estatísticas de produção indisponíveis.'
+                ))
+                return
+
+            cursor.execute(
+                """
+                SELECT calls, total_exec_time, mean_exec_time, rows, query
+                FROM pg_stat_statements
+                WHERE query ILIKE %s
+                ORDER BY total_exec_time DESC
+                LIMIT %s
+                """,
+                [f'%{TABELA}%', top]
+            )
+            linhas = cursor.fetchall()
+
+        self.stdout.write(self.style.MIGRATE_HEADING('pg_stat_statements'))
+        for calls, total, media, rows, query in linhas:
+            self.stdout.write(
+                f"  {calls} chamadas | total {total:.1f} ms | média {media:.2f} ms | {rows} linhas"
+            )
+            self.stdout.write(f"    {' '.join(query.split())[:300]}")
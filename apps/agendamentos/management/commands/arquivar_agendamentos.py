@@ -0,0 +1,29 @@
+"""
+Moves old completed/cancelled appointments to cold storage.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.agendamentos.arquivamento import arquivar_agendamentos, get_agendamentos_arquivaveis
+
+
+class Command(BaseCommand):
+    help = 'Arquiva agendamentos finalizados mais antigos que N anos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anos', type=int, default=2, help='Idade mínima dos agendamentos, em anos')
+        parser.add_argument('--lote', type=int, default=500, help='Agendamentos por transação')
+        parser.add_argument('--limite', type=int, default=None, help='Número máximo de agendamentos a arquivar')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta os agendamentos elegíveis')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            total = get_agendamentos_arquivaveis(options['anos']).count()
+            self.stdout.write(f'{total} agendamento(s) elegível(is) para arquivamento.')
+            return
+
+        total = arquivar_agendamentos(
+            anos=options['anos'],
+            lote=options['lote'],
+            limite=options['limite'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{total} agendamento(s) arquivado(s).'))
@@ -0,0 +1,33 @@
+"""
+Extends every active recurring series up to its horizon (run daily via cron).
+"""
+from django.core.management.base import BaseCommand
+
+from apps.agendamentos.models import RecorrenciaAgendamento
+from apps.agendamentos.recorrencia import materializar_recorrencia
+
+
+class Command(BaseCommand):
+    help = 'Gera os agendamentos das recorrências ativas até o horizonte configurado'
+
+    def handle(self, *args, **options):
+        total_criados = 0
+        recorrencias = RecorrenciaAgendamento.objects.filter(
+            is_active=True
+        ).select_related('cliente', 'funcionario', 'servico')
+
+        for recorrencia in recorrencias:
+            relatorio = materializar_recorrencia(recorrencia)
+            total_criados += len(relatorio['criados'])
+            if relatorio['funcionario_inativo']:
+                self.stdout.write(self.style.WARNING(
+                    f"Recorrência #{recorrencia.pk} ({recorrencia.cliente.nome}): "
+                    f"funcionário {recorrencia.funcionario.nome} inativo, nada gerado"
+                ))
+            for conflito in relatorio['conflitos']:
+                self.stdout.write(self.style.WARNING(
+                    f"Recorrência #{recorrencia.pk} ({recorrencia.cliente.nome}): "
+                    f"conflito em {conflito:%d/%m/%Y %H:%M}"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f'{total_criados} agendamento(s) gerado(s).'))
@@ -0,0 +1,46 @@
+"""
+Partition maintenance for the appointment table.
+
+Without options, creates the partitions for the coming months (run monthly
+via cron). With --converter, converts the existing table first.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.agendamentos import particionamento
+
+
+class Command(BaseCommand):
+    help = 'Cria partições mensais futuras da tabela de agendamentos (e converte a tabela com --converter)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--converter',
+            action='store_true',
+            help='Converte a tabela atual em tabela particionada por mês (requer janela de manutenção)'
+        )
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=3,
+            help='Número de meses futuros com partição garantida'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('O particionamento requer PostgreSQL.')
+
+        if options['converter']:
+            if particionamento.is_particionada():
+                self.stdout.write(self.style.NOTICE('A tabela de agendamentos já está particionada.'))
+            else:
+                particionamento.converter_tabela(meses_futuros=options['meses'])
+                self.stdout.write(self.style.SUCCESS('Tabela de agendamentos convertida para particionamento mensal.'))
+        elif not particionamento.is_particionada():
+            raise CommandError('A tabela de agendamentos não está particionada. Use --converter.')
+
+        criadas = particionamento.criar_particoes_futuras(meses=options['meses'])
+        for nome in criadas:
+            self.stdout.write(f'Partição criada: {nome}')
+        if not criadas:
+            self.stdout.write('Nenhuma partição nova necessária.')
@@ -0,0 +1,54 @@
+"""
+Redistributes an employee's appointments for a date range (vacation, leave).
+"""
+from datetime import date, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.utils import inicio_do_dia
+from apps.funcionarios.models import Funcionario
+from apps.agendamentos.realocacao import realocar_agendamentos
+
+
+class Command(BaseCommand):
+    help = 'Realoca os agendamentos de um funcionário (férias/licença) para outros funcionários habilitados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('matricula', help='Matrícula do funcionário afastado')
+        parser.add_argument('--inicio', type=date.fromisoformat, required=True, help='Primeiro dia (AAAA-MM-DD)')
+        parser.add_argument('--fim', type=date.fromisoformat, required=True, help='Último dia (AAAA-MM-DD)')
+        parser.add_argument('--motivo', default='', help='Motivo registrado nos agendamentos')
+        parser.add_argument('--dias-busca', type=int, default=7, help='Dias à frente para buscar novos horários')
+
+    def handle(self, *args, **options):
+        try:
+            funcionario = Funcionario.objects.get(matricula=options['matricula'])
+        except Funcionario.DoesNotExist:
+            raise CommandError(f"Funcionário com matrícula {options['matricula']} não encontrado.")
+
+        try:
+            relatorio = realocar_agendamentos(
+                funcionario,
+                inicio_do_dia(options['inicio']),
+                inicio_do_dia(options['fim'] + timedelta(days=1)),
+                motivo=options['motivo'] or f'Afastamento de {funcionario.nome}',
+                dias_busca=options['dias_busca'],
+            )
+        except ValidationError as erro:
+            raise CommandError(f"Nenhum agendamento foi realocado: {'; '.join(erro.messages)}")
+
+        for original, novo in relatorio['realocados']:
+            self.stdout.write(
+                f"#{original.pk} {original.data_hora:%d/%m/%Y %H:%M} -> "
+                f"#{novo.pk} {novo.data_hora:%d/%m/%Y %H:%M} (funcionário {novo.funcionario_id})"
+            )
+        for original in relatorio['nao_alocados']:
+            self.stdout.write(self.style.WARNING(
+                f"#{original.pk} {original.data_hora:%d/%m/%Y %H:%M} {original.cliente.nome} - "
+                f"{original.servico.nome}: sem horário disponível"
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(relatorio['realocados'])} realocado(s), {len(relatorio['nao_alocados'])} sem alocação."
+        ))
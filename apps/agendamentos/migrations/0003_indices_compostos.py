@@ -0,0 +1,56 @@
+# Composite indexes aligned with the appointment access patterns.
+# Built concurrently on PostgreSQL so they can be applied to large tables
+# without locking; other databases (SQLite in development) get plain
+# CREATE/DROP INDEX.
+
+from django.db import migrations, models
+
+from apps.core.migracoes import (
+    AddIndexConcurrentlyNoPostgres,
+    RemoveIndexConcurrentlyNoPostgres,
+)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("agendamentos", "0002_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyNoPostgres(
+            model_name="agendamento",
+            index=models.Index(
+                fields=["funcionario", "data_hora"],
+                include=("data_hora_fim", "status"),
+                name="agendamento_func_data_idx",
+            ),
+        ),
+        AddIndexConcurrentlyNoPostgres(
+            model_name="agendamento",
+            index=models.Index(
+                fields=["cliente", "data_hora"], name="agendamento_cli_data_idx"
+            ),
+        ),
+        AddIndexConcurrentlyNoPostgres(
+            model_name="agendamento",
+            index=models.Index(
+                fields=["servico", "data_hora"], name="agendamento_serv_data_idx"
+            ),
+        ),
+        # Single-column duplicates of the foreign key indexes
+        RemoveIndexConcurrentlyNoPostgres(
+            model_name="agendamento",
+            name="agendamento_cliente_f6874f_idx",
+        ),
+        RemoveIndexConcurrentlyNoPostgres(
+            model_name="agendamento",
+            name="agendamento_funcion_55a35e_idx",
+        ),
+        RemoveIndexConcurrentlyNoPostgres(
+            model_name="agendamento",
+            name="agendamento_servico_bdf63b_idx",
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agendamentos", "0003_indices_compostos"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="agendamento",
+            name="agendamento_original",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                help_text="Referência ao agendamento original em caso de reagendamento",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="reagendamentos",
+                to="agendamentos.agendamento",
+                verbose_name="Agendamento Original",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="notificacao",
+            name="agendamento",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="notificacoes",
+                to="agendamentos.agendamento",
+                verbose_name="Agendamento",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="statusagendamento",
+            name="agendamento",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="historico_status",
+                to="agendamentos.agendamento",
+                verbose_name="Agendamento",
+            ),
+        ),
+    ]
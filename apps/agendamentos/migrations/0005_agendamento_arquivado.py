@@ -0,0 +1,107 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:16
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("servicos", "0001_initial"),
+        ("clientes", "0002_initial"),
+        ("agendamentos", "0004_fk_sem_constraint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgendamentoArquivado",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "agendamento_id",
+                    models.BigIntegerField(
+                        unique=True, verbose_name="ID do Agendamento Original"
+                    ),
+                ),
+                (
+                    "data_hora",
+                    models.DateTimeField(verbose_name="Data e Hora do Agendamento"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("agendado", "Agendado"),
+                            ("confirmado", "Confirmado"),
+                            ("em_andamento", "Em Andamento"),
+                            ("concluido", "Concluído"),
+                            ("cancelado", "Cancelado"),
+                            ("nao_compareceu", "Não Compareceu"),
+                            ("reagendado", "Reagendado"),
+                        ],
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "valor_final",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Valor Final"
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="Ativo")),
+                (
+                    "dados",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Agendamento, histórico de status e notificações serializados",
+                        verbose_name="Dados Arquivados",
+                    ),
+                ),
+                (
+                    "data_arquivamento",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Data do Arquivamento"
+                    ),
+                ),
+                (
+                    "cliente",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="agendamentos_arquivados",
+                        to="clientes.cliente",
+                        verbose_name="Cliente",
+                    ),
+                ),
+                (
+                    "servico",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="agendamentos_arquivados",
+                        to="servicos.servico",
+                        verbose_name="Serviço",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Agendamento Arquivado",
+                "verbose_name_plural": "Agendamentos Arquivados",
+                "ordering": ["-data_hora"],
+                "indexes": [
+                    models.Index(
+                        fields=["cliente", "data_hora"],
+                        name="agendamento_cliente_071d80_idx",
+                    )
+                ],
+            },
+        ),
+    ]
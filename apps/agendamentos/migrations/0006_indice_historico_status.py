@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:17
+
+from django.db import migrations, models
+
+from apps.core.migracoes import AddIndexConcurrentlyNoPostgres
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("agendamentos", "0005_agendamento_arquivado"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyNoPostgres(
+            model_name="statusagendamento",
+            index=models.Index(
+                fields=["agendamento", "-data_mudanca"],
+                name="agendamento_agendam_280a53_idx",
+            ),
+        ),
+    ]
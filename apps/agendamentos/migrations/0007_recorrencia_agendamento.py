@@ -0,0 +1,152 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("funcionarios", "0002_initial"),
+        ("servicos", "0001_initial"),
+        ("clientes", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("agendamentos", "0006_indice_historico_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecorrenciaAgendamento",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="Ativo")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Excluído em"
+                    ),
+                ),
+                (
+                    "regra",
+                    models.CharField(
+                        help_text="Regra RRULE (RFC 5545), ex: FREQ=WEEKLY;INTERVAL=2;BYDAY=TU",
+                        max_length=500,
+                        verbose_name="Regra de Recorrência",
+                    ),
+                ),
+                (
+                    "data_inicio",
+                    models.DateTimeField(verbose_name="Primeira Ocorrência"),
+                ),
+                (
+                    "horizonte_semanas",
+                    models.PositiveIntegerField(
+                        default=12,
+                        help_text="Quantas semanas à frente manter agendamentos gerados",
+                        verbose_name="Horizonte (semanas)",
+                    ),
+                ),
+                (
+                    "gerado_ate",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Limite até onde as ocorrências já foram criadas",
+                        null=True,
+                        verbose_name="Gerado Até",
+                    ),
+                ),
+                (
+                    "origem",
+                    models.CharField(
+                        choices=[
+                            ("presencial", "Presencial"),
+                            ("telefone", "Telefone"),
+                            ("whatsapp", "WhatsApp"),
+                            ("online", "Site/App"),
+                            ("indicacao", "Indicação"),
+                        ],
+                        default="presencial",
+                        max_length=20,
+                        verbose_name="Origem",
+                    ),
+                ),
+                (
+                    "observacoes",
+                    models.TextField(blank=True, verbose_name="Observações"),
+                ),
+                (
+                    "cliente",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="recorrencias",
+                        to="clientes.cliente",
+                        verbose_name="Cliente",
+                    ),
+                ),
+                (
+                    "funcionario",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="recorrencias",
+                        to="funcionarios.funcionario",
+                        verbose_name="Funcionário",
+                    ),
+                ),
+                (
+                    "servico",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="recorrencias",
+                        to="servicos.servico",
+                        verbose_name="Serviço",
+                    ),
+                ),
+                (
+                    "usuario_criou",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="recorrencias_criadas",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário que Criou",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Recorrência de Agendamento",
+                "verbose_name_plural": "Recorrências de Agendamento",
+                "ordering": ["cliente__nome", "data_inicio"],
+            },
+        ),
+        migrations.AddField(
+            model_name="agendamento",
+            name="recorrencia",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Série recorrente que gerou este agendamento",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="agendamentos",
+                to="agendamentos.recorrenciaagendamento",
+                verbose_name="Recorrência",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+from apps.core.migracoes import AddIndexConcurrentlyNoPostgres
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("agendamentos", "0007_recorrencia_agendamento"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyNoPostgres(
+            model_name="notificacao",
+            index=models.Index(
+                fields=["cliente", "data_agendamento"], name="notificacao_cli_data_idx"
+            ),
+        ),
+    ]
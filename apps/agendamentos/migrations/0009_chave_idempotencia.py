@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("agendamentos", "0008_indice_timeline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChaveIdempotencia",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chave", models.CharField(max_length=100, verbose_name="Chave")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "agendamento",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="agendamentos.agendamento",
+                        verbose_name="Agendamento",
+                    ),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chaves_idempotencia",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Chave de Idempotência",
+                "verbose_name_plural": "Chaves de Idempotência",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="chaveidempotencia",
+            constraint=models.UniqueConstraint(
+                fields=("usuario", "chave"), name="chave_idempotencia_unica"
+            ),
+        ),
+    ]
@@ -1,10 +1,115 @@
 """
 Appointment models for JT Sistemas.
 """
-from django.db import models
+from django.db import models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from apps.core.contadores import contar_atualizados
 from apps.core.models import BaseModel
+from apps.core.utils import intervalo_dia, intervalo_mes
+
+
+# Statuses that give a reserved package session back to the client
+STATUS_LIBERAM_PACOTE = ['cancelado', 'nao_compareceu', 'reagendado']
+
+
+def atualizar_saldo_pacote(status_novo, agendamento_ids):
+    """Consume or release the package reservations of appointments moved to `status_novo`"""
+    from apps.clientes.models import MovimentoPacote
+
+    if not agendamento_ids:
+        return 0
+    if status_novo == 'concluido':
+        return MovimentoPacote.consumir(agendamento_ids)
+    if status_novo in STATUS_LIBERAM_PACOTE:
+        return MovimentoPacote.liberar(agendamento_ids)
+    return 0
+
+
+class AgendamentoQuerySet(models.QuerySet):
+    """
+    QuerySet for appointments.
+    Date filters use half-open ranges on `data_hora` so the index can be used.
+    """
+
+    def no_periodo(self, inicio, fim):
+        """Appointments starting in the [inicio, fim) range"""
+        return self.filter(data_hora__gte=inicio, data_hora__lt=fim)
+
+    def no_dia(self, dia=None):
+        """Appointments on a given day (today by default)"""
+        return self.no_periodo(*intervalo_dia(dia or timezone.localdate()))
+
+    def no_mes(self, ano=None, mes=None):
+        """Appointments in a given month (current month by default)"""
+        hoje = timezone.localdate()
+        return self.no_periodo(*intervalo_mes(ano or hoje.year, mes or hoje.month))
+
+    def transicionar_em_lote(self, status_novo, valores, usuario=None, observacoes=''):
+        """
+        Move every appointment in the queryset to `status_novo` with a single
+        UPDATE touching only the given columns, and record the status trail.
+        Returns the number of updated appointments.
+        """
+        from .signals import agendamentos_alterados_em_lote
+
+        with transaction.atomic(using=self.db):
+            elegiveis = list(
+                self.filter(is_active=True).select_for_update().values_list('pk', 'status', 'pacote_id')
+            )
+            if not elegiveis:
+                return 0
+
+            ids = [pk for pk, _, _ in elegiveis]
+            contar_atualizados(self.model.objects.filter(pk__in=ids), status=status_novo, **valores)
+            self.model.objects.filter(pk__in=ids).update(
+                status=status_novo,
+                updated_at=timezone.now(),
+                **valores
+            )
+            StatusAgendamento.registrar_em_lote([
+                StatusAgendamento(
+                    agendamento_id=pk,
+                    status_anterior=status_anterior,
+                    status_novo=status_novo,
+                    usuario=usuario,
+                    observacoes=observacoes,
+                )
+                for pk, status_anterior, _ in elegiveis
+            ])
+            atualizar_saldo_pacote(status_novo, [pk for pk, _, pacote_id in elegiveis if pacote_id])
+            transaction.on_commit(lambda: agendamentos_alterados_em_lote.send(
+                sender=self.model, ids=ids, status=status_novo
+            ))
+        return len(ids)
+
+    def confirmar_em_lote(self, usuario=None):
+        """Confirm every future appointment still in 'agendado' status"""
+        valores = {'data_confirmacao': timezone.now()}
+        if usuario:
+            valores['usuario_confirmou'] = usuario
+        return self.filter(
+            status='agendado',
+            data_hora__gte=timezone.now()
+        ).transicionar_em_lote('confirmado', valores, usuario=usuario)
+
+    def cancelar_em_lote(self, motivo='', usuario=None):
+        """Cancel every future appointment that can still be cancelled"""
+        valores = {'data_cancelamento': timezone.now(), 'motivo_cancelamento': motivo}
+        if usuario:
+            valores['usuario_cancelou'] = usuario
+        return self.filter(
+            status__in=['agendado', 'confirmado'],
+            data_hora__gte=timezone.now()
+        ).transicionar_em_lote('cancelado', valores, usuario=usuario, observacoes=motivo)
+
+    def marcar_nao_compareceu(self, usuario=None):
+        """Mark past appointments that were never started as no-shows"""
+        return self.filter(
+            status__in=['agendado', 'confirmado'],
+            data_hora__lt=timezone.now()
+        ).transicionar_em_lote('nao_compareceu', {}, usuario=usuario)
 
 
 class Agendamento(BaseModel):
@@ -241,11 +346,15 @@ class Agendamento(BaseModel):
     )
 
     # Rescheduling
+    # Foreign keys to Agendamento are not enforced by the database: once the
+    # table is partitioned by data_hora (see particionamento.py) `id` alone
+    # can no longer back a foreign key constraint.
     agendamento_original = models.ForeignKey(
         'self',
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_constraint=False,
         related_name='reagendamentos',
         verbose_name='Agendamento Original',
         help_text='Referência ao agendamento original em caso de reagendamento'
@@ -255,6 +364,19 @@ class Agendamento(BaseModel):
         verbose_name='Número de Reagendamentos'
     )
 
+    # Recurrence
+    recorrencia = models.ForeignKey(
+        'RecorrenciaAgendamento',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='agendamentos',
+        verbose_name='Recorrência',
+        help_text='Série recorrente que gerou este agendamento'
+    )
+
+    objects = AgendamentoQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Agendamento'
         verbose_name_plural = 'Agendamentos'
@@ -262,28 +384,99 @@ class Agendamento(BaseModel):
         indexes = [
             models.Index(fields=['data_hora']),
             models.Index(fields=['status']),
-            models.Index(fields=['cliente']),
-            models.Index(fields=['funcionario']),
-            models.Index(fields=['servico']),
             models.Index(fields=['data_hora', 'status']),
+            # Employee's agenda for a day (covers the slot overlap check)
+            models.Index(
+                fields=['funcionario', 'data_hora'],
+                include=['data_hora_fim', 'status'],
+                name='agendamento_func_data_idx'
+            ),
+            # Client's last/next appointment
+            models.Index(fields=['cliente', 'data_hora'], name='agendamento_cli_data_idx'),
+            # Service appointments for a day
+            models.Index(fields=['servico', 'data_hora'], name='agendamento_serv_data_idx'),
         ]
 
     def __str__(self):
         return f"{self.cliente.nome} - {self.servico.nome} - {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
 
+    # Derived fields that may change when each field is written
+    CAMPOS_DERIVADOS = {
+        'data_hora': ['data_hora_fim'],
+        'duracao_prevista': ['data_hora_fim'],
+        'servico': ['valor_servico', 'duracao_prevista', 'data_hora_fim', 'valor_final'],
+        'valor_servico': ['valor_final'],
+        'desconto_aplicado': ['valor_final'],
+        'status': [
+            'data_confirmacao', 'data_cancelamento', 'data_inicio_atendimento',
+            'data_fim_atendimento', 'duracao_real',
+        ],
+    }
+
     def save(self, *args, **kwargs):
-        # Calculate end time based on service duration
-        if not self.data_hora_fim and self.data_hora and self.duracao_prevista:
-            from datetime import timedelta
-            self.data_hora_fim = self.data_hora + timedelta(minutes=self.duracao_prevista)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.calcular_campos_derivados()
+        else:
+            # Narrow save: only recompute when an input of a derived field is
+            # written, and only write the derived fields that actually changed
+            # so a stale instance does not overwrite the others
+            derivados = {
+                campo
+                for nome in update_fields
+                for campo in self.CAMPOS_DERIVADOS.get(nome, [])
+            }
+            if derivados:
+                anteriores = {campo: getattr(self, campo) for campo in derivados}
+                # The end time is only filled when empty: recompute it when
+                # its inputs are written and the caller did not set it
+                if 'data_hora_fim' in derivados and 'data_hora_fim' not in update_fields:
+                    self.data_hora_fim = None
+                self.calcular_campos_derivados()
+                kwargs['update_fields'] = set(update_fields) | {
+                    campo for campo in derivados if getattr(self, campo) != anteriores[campo]
+                }
         
+        if not (self._state.adding and self.pacote_id):
+            super().save(*args, **kwargs)
+            return
+
+        # Reserve a session from the client's package balance; without one
+        # the booking is rolled back
+        from django.core.exceptions import ValidationError
+        from apps.clientes.models import MovimentoPacote
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                MovimentoPacote.reservar([self])
+        except ValidationError:
+            self.pk = None
+            self._state.adding = True
+            raise
+
+    def calcular_campos_derivados(self, tabela_precos=None):
+        """
+        Fill the fields derived from the service, duration, price and status.
+        The price comes from the day's price table, at the package price for
+        package sessions (pass `tabela_precos` to keep a batch on one
+        snapshot); `self.servico` is only loaded when the duration is missing.
+        """
         # Set service values if not set
-        if not self.valor_servico:
-            self.valor_servico = self.servico.preco_atual
+        if self.valor_servico is None:
+            from apps.servicos.precos import get_tabela_precos
+            tabela_precos = tabela_precos or get_tabela_precos()
+            servico = self.servico if Agendamento.servico.is_cached(self) else self.servico_id
+            pacote = self.pacote if Agendamento.pacote.is_cached(self) else self.pacote_id
+            self.valor_servico = tabela_precos.preco(servico, pacote)
         
-        if not self.duracao_prevista:
+        if self.duracao_prevista is None:
             self.duracao_prevista = self.servico.duracao_em_minutos
         
+        # Calculate end time based on service duration
+        if not self.data_hora_fim and self.data_hora and self.duracao_prevista:
+            from datetime import timedelta
+            self.data_hora_fim = self.data_hora + timedelta(minutes=self.duracao_prevista)
+        
         # Calculate final value
         self.valor_final = self.valor_servico - self.desconto_aplicado
         
@@ -305,8 +498,6 @@ class Agendamento(BaseModel):
             if self.data_inicio_atendimento:
                 delta = self.data_fim_atendimento - self.data_inicio_atendimento
                 self.duracao_real = int(delta.total_seconds() / 60)
-        
-        super().save(*args, **kwargs)
 
     @property
     def is_hoje(self):
@@ -382,38 +573,49 @@ class Agendamento(BaseModel):
     def confirmar(self, usuario=None):
         """Confirm the appointment"""
         if self.pode_ser_confirmado:
+            status_anterior = self.status
             self.status = 'confirmado'
             self.data_confirmacao = timezone.now()
             if usuario:
                 self.usuario_confirmou = usuario
-            self.save()
+            self.save(update_fields=['status', 'data_confirmacao', 'usuario_confirmou', 'updated_at'])
+            StatusAgendamento.registrar(self, status_anterior, usuario=usuario)
             return True
         return False
 
     def cancelar(self, motivo='', usuario=None):
         """Cancel the appointment"""
         if self.pode_ser_cancelado:
+            status_anterior = self.status
             self.status = 'cancelado'
             self.data_cancelamento = timezone.now()
             self.motivo_cancelamento = motivo
             if usuario:
                 self.usuario_cancelou = usuario
-            self.save()
+            self.save(update_fields=[
+                'status', 'data_cancelamento', 'motivo_cancelamento', 'usuario_cancelou', 'updated_at'
+            ])
+            StatusAgendamento.registrar(self, status_anterior, usuario=usuario, observacoes=motivo)
+            if self.pacote_id:
+                atualizar_saldo_pacote(self.status, [self.pk])
             return True
         return False
 
-    def iniciar_atendimento(self):
+    def iniciar_atendimento(self, usuario=None):
         """Start the service"""
         if self.pode_iniciar_atendimento:
+            status_anterior = self.status
             self.status = 'em_andamento'
             self.data_inicio_atendimento = timezone.now()
-            self.save()
+            self.save(update_fields=['status', 'data_inicio_atendimento', 'updated_at'])
+            StatusAgendamento.registrar(self, status_anterior, usuario=usuario)
             return True
         return False
 
-    def concluir_atendimento(self, observacoes_funcionario=''):
+    def concluir_atendimento(self, observacoes_funcionario='', usuario=None):
         """Complete the service"""
         if self.pode_ser_concluido:
+            status_anterior = self.status
             self.status = 'concluido'
             self.data_fim_atendimento = timezone.now()
             if observacoes_funcionario:
@@ -427,13 +629,32 @@ class Agendamento(BaseModel):
             # Update client's last service date
             self.cliente.atualizar_ultimo_atendimento()
             
-            self.save()
+            self.save(update_fields=[
+                'status', 'data_fim_atendimento', 'duracao_real', 'observacoes_funcionario', 'updated_at'
+            ])
+            StatusAgendamento.registrar(self, status_anterior, usuario=usuario)
+            if self.pacote_id:
+                atualizar_saldo_pacote(self.status, [self.pk])
             return True
         return False
 
     def reagendar(self, nova_data_hora, motivo='', usuario=None):
         """Reschedule the appointment"""
-        if self.pode_ser_cancelado:
+        if not self.pode_ser_cancelado:
+            return None
+
+        with transaction.atomic():
+            # Mark current appointment as rescheduled (releasing its package
+            # session before the new appointment reserves one)
+            status_anterior = self.status
+            self.status = 'reagendado'
+            self.motivo_cancelamento = f"Reagendado: {motivo}"
+            if usuario:
+                self.usuario_cancelou = usuario
+            self.save(update_fields=['status', 'motivo_cancelamento', 'usuario_cancelou', 'updated_at'])
+            if self.pacote_id:
+                atualizar_saldo_pacote(self.status, [self.pk])
+
             # Create new appointment
             novo_agendamento = Agendamento.objects.create(
                 cliente=self.cliente,
@@ -452,16 +673,12 @@ class Agendamento(BaseModel):
                 numero_reagendamentos=self.numero_reagendamentos + 1,
                 usuario_agendou=usuario
             )
+            StatusAgendamento.registrar(
+                self, status_anterior, usuario=usuario,
+                observacoes=f"Reagendado para o agendamento #{novo_agendamento.pk}. {motivo}".strip()
+            )
             
-            # Mark current appointment as rescheduled
-            self.status = 'reagendado'
-            self.motivo_cancelamento = f"Reagendado: {motivo}"
-            if usuario:
-                self.usuario_cancelou = usuario
-            self.save()
-            
-            return novo_agendamento
-        return None
+        return novo_agendamento
 
     def avaliar(self, nota, comentario=''):
         """Rate the service"""
@@ -469,7 +686,7 @@ class Agendamento(BaseModel):
             self.avaliacao = nota
             self.comentario_avaliacao = comentario
             self.data_avaliacao = timezone.now()
-            self.save()
+            self.save(update_fields=['avaliacao', 'comentario_avaliacao', 'data_avaliacao', 'updated_at'])
             return True
         return False
 
@@ -479,14 +696,27 @@ class Agendamento(BaseModel):
         self.data_pagamento = timezone.now()
         if forma_pagamento:
             self.forma_pagamento = forma_pagamento
-        self.save()
+        self.save(update_fields=['pago', 'data_pagamento', 'forma_pagamento', 'updated_at'])
 
     def get_historico_status(self):
-        """Get status change history (would need a separate model for full implementation)"""
-        # This is a simplified version - in a real app, you'd want a separate StatusHistory model
+        """Get status change history from the StatusAgendamento trail"""
         historico = []
         if self.created_at:
             historico.append({'status': 'agendado', 'data': self.created_at})
+        
+        mudancas = self.historico_status.filter(is_active=True).select_related('usuario').order_by('data_mudanca')
+        for mudanca in mudancas:
+            historico.append({
+                'status': mudanca.status_novo,
+                'data': mudanca.data_mudanca,
+                'status_anterior': mudanca.status_anterior,
+                'usuario': mudanca.usuario,
+                'observacoes': mudanca.observacoes,
+            })
+        if len(historico) > 1:
+            return historico
+        
+        # Appointments from before the trail existed: rebuild from timestamps
         if self.data_confirmacao:
             historico.append({'status': 'confirmado', 'data': self.data_confirmacao})
         if self.data_inicio_atendimento:
@@ -498,6 +728,88 @@ class Agendamento(BaseModel):
         return historico
 
 
+class RecorrenciaAgendamento(BaseModel):
+    """
+    Model for recurring appointment series (e.g. weekly haircut).
+    Occurrences are materialized as Agendamento rows up to a rolling horizon.
+    """
+    cliente = models.ForeignKey(
+        'clientes.Cliente',
+        on_delete=models.PROTECT,
+        related_name='recorrencias',
+        verbose_name='Cliente'
+    )
+    funcionario = models.ForeignKey(
+        'funcionarios.Funcionario',
+        on_delete=models.PROTECT,
+        related_name='recorrencias',
+        verbose_name='Funcionário'
+    )
+    servico = models.ForeignKey(
+        'servicos.Servico',
+        on_delete=models.PROTECT,
+        related_name='recorrencias',
+        verbose_name='Serviço'
+    )
+    regra = models.CharField(
+        max_length=500,
+        verbose_name='Regra de Recorrência',
+        help_text='Regra RRULE (RFC 5545), ex: FREQ=WEEKLY;INTERVAL=2;BYDAY=TU'
+    )
+    data_inicio = models.DateTimeField(
+        verbose_name='Primeira Ocorrência'
+    )
+    horizonte_semanas = models.PositiveIntegerField(
+        default=12,
+        verbose_name='Horizonte (semanas)',
+        help_text='Quantas semanas à frente manter agendamentos gerados'
+    )
+    gerado_ate = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Gerado Até',
+        help_text='Limite até onde as ocorrências já foram criadas'
+    )
+    origem = models.CharField(
+        max_length=20,
+        choices=Agendamento.ORIGEM_CHOICES,
+        default='presencial',
+        verbose_name='Origem'
+    )
+    observacoes = models.TextField(
+        blank=True,
+        verbose_name='Observações'
+    )
+    usuario_criou = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='recorrencias_criadas',
+        verbose_name='Usuário que Criou'
+    )
+
+    class Meta:
+        verbose_name = 'Recorrência de Agendamento'
+        verbose_name_plural = 'Recorrências de Agendamento'
+        ordering = ['cliente__nome', 'data_inicio']
+
+    def __str__(self):
+        return f"{self.cliente} - {self.servico.nome} ({self.regra})"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        try:
+            self.get_regra()
+        except (ValueError, TypeError) as erro:
+            raise ValidationError({'regra': f'Regra de recorrência inválida: {erro}'})
+
+    def get_regra(self):
+        """Return the dateutil rrule anchored at the first occurrence (local time)"""
+        from dateutil.rrule import rrulestr
+        return rrulestr(self.regra, dtstart=timezone.localtime(self.data_inicio))
+
+
 class StatusAgendamento(BaseModel):
     """
     Model to track status changes in appointments (audit trail).
@@ -505,6 +817,7 @@ class StatusAgendamento(BaseModel):
     agendamento = models.ForeignKey(
         Agendamento,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='historico_status',
         verbose_name='Agendamento'
     )
@@ -539,10 +852,33 @@ class StatusAgendamento(BaseModel):
         verbose_name = 'Histórico de Status'
         verbose_name_plural = 'Históricos de Status'
         ordering = ['-data_mudanca']
+        indexes = [
+            models.Index(fields=['agendamento', '-data_mudanca']),
+        ]
 
     def __str__(self):
         return f"{self.agendamento} - {self.status_anterior} → {self.status_novo}"
 
+    @classmethod
+    def registrar(cls, agendamento, status_anterior, usuario=None, observacoes=''):
+        """Record a single status transition of an appointment"""
+        cls.registrar_em_lote([cls(
+            agendamento=agendamento,
+            status_anterior=status_anterior,
+            status_novo=agendamento.status,
+            usuario=usuario,
+            observacoes=observacoes,
+        )])
+
+    @classmethod
+    def registrar_em_lote(cls, registros):
+        """
+        Insert status transitions with a single bulk_create, deferred until
+        the current transaction commits so it stays off the transition path.
+        """
+        if registros:
+            transaction.on_commit(lambda: cls.objects.bulk_create(registros))
+
 
 class Notificacao(BaseModel):
     """
@@ -575,6 +911,7 @@ class Notificacao(BaseModel):
     agendamento = models.ForeignKey(
         Agendamento,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='notificacoes',
         verbose_name='Agendamento'
     )
@@ -643,6 +980,10 @@ class Notificacao(BaseModel):
         verbose_name = 'Notificação'
         verbose_name_plural = 'Notificações'
         ordering = ['-data_agendamento']
+        indexes = [
+            # Client timeline
+            models.Index(fields=['cliente', 'data_agendamento'], name='notificacao_cli_data_idx'),
+        ]
 
     def __str__(self):
         return f"{self.cliente.nome} - {self.get_tipo_display()} - {self.get_canal_display()}"
@@ -651,23 +992,151 @@ class Notificacao(BaseModel):
         """Mark notification as sent"""
         self.status = 'enviada'
         self.data_envio = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'data_envio', 'updated_at'])
 
     def marcar_como_entregue(self):
         """Mark notification as delivered"""
         self.status = 'entregue'
         self.data_entrega = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'data_entrega', 'updated_at'])
 
     def marcar_como_lida(self):
         """Mark notification as read"""
         self.status = 'lida'
         self.data_leitura = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'data_leitura', 'updated_at'])
 
     def marcar_erro(self, detalhes_erro):
         """Mark notification as failed"""
         self.status = 'erro'
         self.erro_detalhes = detalhes_erro
         self.tentativas += 1
-        self.save()
\ No newline at end of file
+        self.save(update_fields=['status', 'erro_detalhes', 'tentativas', 'updated_at'])
+
+
+class AgendamentoArquivado(models.Model):
+    """
+    Cold storage for old completed/cancelled appointments.
+    Keeps the columns used by client counters plus the full serialized
+    appointment, status history, notifications and idempotency keys.
+    """
+    agendamento_id = models.BigIntegerField(
+        unique=True,
+        verbose_name='ID do Agendamento Original'
+    )
+    cliente = models.ForeignKey(
+        'clientes.Cliente',
+        on_delete=models.PROTECT,
+        related_name='agendamentos_arquivados',
+        verbose_name='Cliente'
+    )
+    servico = models.ForeignKey(
+        'servicos.Servico',
+        on_delete=models.PROTECT,
+        related_name='agendamentos_arquivados',
+        verbose_name='Serviço'
+    )
+    data_hora = models.DateTimeField(
+        verbose_name='Data e Hora do Agendamento'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Agendamento.STATUS_CHOICES,
+        verbose_name='Status'
+    )
+    valor_final = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Valor Final'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name='Ativo'
+    )
+    dados = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        verbose_name='Dados Arquivados',
+        help_text='Agendamento, histórico de status e notificações serializados'
+    )
+    data_arquivamento = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data do Arquivamento'
+    )
+
+    class Meta:
+        verbose_name = 'Agendamento Arquivado'
+        verbose_name_plural = 'Agendamentos Arquivados'
+        ordering = ['-data_hora']
+        indexes = [
+            models.Index(fields=['cliente', 'data_hora']),
+        ]
+
+    def __str__(self):
+        return f"Agendamento #{self.agendamento_id} (arquivado) - {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
+
+    @staticmethod
+    def _restaurar(model, valores):
+        """Build an unsaved model instance from serialized column values"""
+        instancia = model(**{
+            field.attname: field.to_python(valores.get(field.attname))
+            for field in model._meta.concrete_fields
+        })
+        instancia.arquivado = True
+        return instancia
+
+    def como_agendamento(self):
+        """Return the archived appointment as a read-only Agendamento instance"""
+        return self._restaurar(Agendamento, self.dados['agendamento'])
+
+    def get_historico_status(self):
+        """Return the archived status history as StatusAgendamento instances"""
+        return [self._restaurar(StatusAgendamento, valores) for valores in self.dados.get('historico_status', [])]
+
+    def get_notificacoes(self):
+        """Return the archived notifications as Notificacao instances"""
+        return [self._restaurar(Notificacao, valores) for valores in self.dados.get('notificacoes', [])]
+
+    def get_movimentos_pacote(self):
+        """Package movements of the archived appointment (kept in the ledger)"""
+        from apps.clientes.models import MovimentoPacote
+        return MovimentoPacote.objects.filter(agendamento_id=self.agendamento_id)
+
+
+class ChaveIdempotencia(models.Model):
+    """
+    Idempotency key of an appointment created through the bulk API, scoped
+    to the API user, so a retried batch returns the existing appointment
+    instead of booking it twice.
+    """
+    usuario = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.CASCADE,
+        related_name='chaves_idempotencia',
+        verbose_name='Usuário'
+    )
+    chave = models.CharField(
+        max_length=100,
+        verbose_name='Chave'
+    )
+    agendamento = models.ForeignKey(
+        Agendamento,
+        on_delete=models.DO_NOTHING,
+        # Agendamento may be partitioned, see apps.agendamentos.particionamento
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Agendamento'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Criado em'
+    )
+
+    class Meta:
+        verbose_name = 'Chave de Idempotência'
+        verbose_name_plural = 'Chaves de Idempotência'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'chave'], name='chave_idempotencia_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.chave} → Agendamento #{self.agendamento_id}"
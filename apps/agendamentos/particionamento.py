@@ -0,0 +1,190 @@
+"""
+Monthly range partitioning of the appointment table (PostgreSQL).
+
+`agendamentos_agendamento` is partitioned by `data_hora`, one partition per
+month in the project timezone plus a default partition for rows outside the
+known ranges. Time-bounded queries (see `AgendamentoQuerySet.no_periodo`)
+are pruned to the partitions they touch.
+
+The primary key becomes (id, data_hora); `id` is still generated by a single
+sequence, so it remains unique and the ORM keeps using it as the pk. Foreign
+keys pointing to Agendamento are declared with `db_constraint=False`.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.core.utils import intervalo_mes
+from .models import Agendamento
+
+TABELA = Agendamento._meta.db_table
+TABELA_LEGADO = f'{TABELA}_legado'
+PARTICAO_PADRAO = f'{TABELA}_padrao'
+SEQUENCIA = f'{TABELA}_id_seq'
+
+
+def qn(nome):
+    return connection.ops.quote_name(nome)
+
+
+def nome_particao(ano, mes):
+    """Return the table name of a monthly partition"""
+    return f'{TABELA}_p{ano}{mes:02d}'
+
+
+def proximo_mes(ano, mes):
+    """Return (ano, mes) for the month after the given one"""
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+def tabela_existe(cursor, nome):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [nome])
+    return cursor.fetchone()[0]
+
+
+def is_particionada():
+    """Check if the appointment table is already partitioned"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+            [TABELA]
+        )
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def criar_particao(cursor, ano, mes):
+    """
+    Create the partition for a month if it does not exist.
+    Returns the partition name when it was created, None otherwise.
+
+    Rows of the month already in the default partition (bookings made
+    beyond the partition horizon) would make CREATE TABLE ... PARTITION OF
+    fail, so the default partition is detached while they are moved to the
+    new partition, and attached back afterwards.
+    """
+    nome = nome_particao(ano, mes)
+    if tabela_existe(cursor, nome):
+        return None
+
+    inicio, fim = intervalo_mes(ano, mes)
+    mover = False
+    if tabela_existe(cursor, PARTICAO_PADRAO):
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {qn(PARTICAO_PADRAO)} WHERE data_hora >= %s AND data_hora < %s)',
+            [inicio, fim]
+        )
+        mover = cursor.fetchone()[0]
+
+    if mover:
+        cursor.execute(f'ALTER TABLE {qn(TABELA)} DETACH PARTITION {qn(PARTICAO_PADRAO)}')
+    cursor.execute(
+        f'CREATE TABLE {qn(nome)} PARTITION OF {qn(TABELA)} FOR VALUES FROM (%s) TO (%s)',
+        [inicio, fim]
+    )
+    if mover:
+        cursor.execute(
+            f'INSERT INTO {qn(TABELA)} SELECT * FROM {qn(PARTICAO_PADRAO)} WHERE data_hora >= %s AND data_hora < %s',
+            [inicio, fim]
+        )
+        cursor.execute(
+            f'DELETE FROM {qn(PARTICAO_PADRAO)} WHERE data_hora >= %s AND data_hora < %s',
+            [inicio, fim]
+        )
+        cursor.execute(f'ALTER TABLE {qn(TABELA)} ATTACH PARTITION {qn(PARTICAO_PADRAO)} DEFAULT')
+    return nome
+
+
+def criar_particoes_futuras(meses=3, a_partir_de=None):
+    """
+    Create the partitions for the current month and the next `meses` months.
+
+    Each month runs in its own transaction (a savepoint when called inside
+    one), so a month that fails does not undo the ones already created.
+    Rows that landed in the default partition are moved to their month.
+    """
+    dia = a_partir_de or timezone.localdate()
+    ano, mes = dia.year, dia.month
+    criadas = []
+
+    for _ in range(meses + 1):
+        with transaction.atomic(), connection.cursor() as cursor:
+            nome = criar_particao(cursor, ano, mes)
+        if nome:
+            criadas.append(nome)
+        ano, mes = proximo_mes(ano, mes)
+
+    return criadas
+
+
+def converter_tabela(meses_futuros=3):
+    """
+    Convert the regular appointment table into a partitioned table.
+
+    Runs in a single transaction holding an ACCESS EXCLUSIVE lock on the
+    table, so it should be executed in a maintenance window. Indexes and
+    outgoing foreign keys are recreated on the partitioned table after the
+    data is copied.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {qn(TABELA)} IN ACCESS EXCLUSIVE MODE')
+
+        # Definitions to recreate once the data is in the new table
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes
+            WHERE tablename = %s AND indexname NOT IN (
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype IN ('p', 'u')
+            )
+            """,
+            [TABELA, TABELA]
+        )
+        indices = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f' AND confrelid <> conrelid
+            """,
+            [TABELA]
+        )
+        chaves_estrangeiras = cursor.fetchall()
+
+        cursor.execute(f'SELECT min(data_hora), max(id) FROM {qn(TABELA)}')
+        data_minima, id_maximo = cursor.fetchone()
+
+        # New partitioned table with the same columns, defaults and checks
+        cursor.execute(f'ALTER TABLE {qn(TABELA)} RENAME TO {qn(TABELA_LEGADO)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(TABELA)} (LIKE {qn(TABELA_LEGADO)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            'PARTITION BY RANGE (data_hora)'
+        )
+        cursor.execute(f'CREATE TABLE {qn(PARTICAO_PADRAO)} PARTITION OF {qn(TABELA)} DEFAULT')
+
+        hoje = timezone.localdate()
+        inicio = timezone.localtime(data_minima).date() if data_minima else hoje
+        ano, mes = inicio.year, inicio.month
+        ano_final, mes_final = hoje.year, hoje.month
+        for _ in range(meses_futuros):
+            ano_final, mes_final = proximo_mes(ano_final, mes_final)
+        while (ano, mes) <= (ano_final, mes_final):
+            criar_particao(cursor, ano, mes)
+            ano, mes = proximo_mes(ano, mes)
+
+        cursor.execute(f'INSERT INTO {qn(TABELA)} SELECT * FROM {qn(TABELA_LEGADO)}')
+        # Fails (and rolls everything back) if a database-level foreign key
+        # still references the table: apply the migrations first.
+        cursor.execute(f'DROP TABLE {qn(TABELA_LEGADO)}')
+
+        # Single sequence shared by every partition
+        cursor.execute(f'CREATE SEQUENCE {qn(SEQUENCIA)} OWNED BY {qn(TABELA)}.id')
+        cursor.execute(f"ALTER TABLE {qn(TABELA)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", [SEQUENCIA])
+        cursor.execute('SELECT setval(%s, %s, %s)', [SEQUENCIA, id_maximo or 1, id_maximo is not None])
+
+        cursor.execute(
+            f'ALTER TABLE {qn(TABELA)} ADD CONSTRAINT {qn(TABELA + "_pkey")} PRIMARY KEY (id, data_hora)'
+        )
+        for indexdef in indices:
+            cursor.execute(indexdef)
+        for nome, definicao in chaves_estrangeiras:
+            cursor.execute(f'ALTER TABLE {qn(TABELA)} ADD CONSTRAINT {qn(nome)} {definicao}')
@@ -0,0 +1,158 @@
+"""
+Mass rescheduling of an employee's appointments (vacation, leave...).
+
+Each affected appointment is moved to another qualified employee at the
+same time or, failing that, to the earliest free slot in the following
+days. The search and the writes run in one transaction holding locks on
+the employees involved and on the originals, so concurrent bookings cannot
+take the chosen slots. Replacements are created with bulk_create and the
+originals are marked as 'reagendado'.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.clientes.models import MovimentoPacote
+from apps.core.contadores import contar_inseridos
+from .disponibilidade import AgendaFuncionarios, get_funcionarios_habilitados, intervalo_dias
+from .models import Agendamento
+from .signals import agendamentos_alterados_em_lote
+
+
+def copiar_para_reagendamento(agendamento, funcionario_id, data_hora, usuario=None):
+    """Build the unsaved replacement of an appointment (same fields as `reagendar`)"""
+    return Agendamento(
+        cliente_id=agendamento.cliente_id,
+        funcionario_id=funcionario_id,
+        servico_id=agendamento.servico_id,
+        pacote_id=agendamento.pacote_id,
+        data_hora=data_hora,
+        duracao_prevista=agendamento.duracao_prevista,
+        valor_servico=agendamento.valor_servico,
+        desconto_aplicado=agendamento.desconto_aplicado,
+        forma_pagamento=agendamento.forma_pagamento,
+        origem=agendamento.origem,
+        observacoes=agendamento.observacoes,
+        observacoes_cliente=agendamento.observacoes_cliente,
+        agendamento_original_id=agendamento.agendamento_original_id or agendamento.pk,
+        numero_reagendamentos=agendamento.numero_reagendamentos + 1,
+        usuario_agendou=usuario,
+    )
+
+
+def realocar_agendamentos(funcionario, inicio, fim, usuario=None, motivo='', dias_busca=7):
+    """
+    Redistribute the appointments of `funcionario` starting in [inicio, fim).
+
+    Returns a report dict:
+        'realocados': list of (original, replacement) pairs
+        'nao_alocados': list of originals that could not be placed
+    Raises ValidationError, writing nothing, when a package balance no
+    longer covers a replacement.
+    """
+    from apps.funcionarios.models import Funcionario
+
+    relatorio = {'realocados': [], 'nao_alocados': []}
+    with transaction.atomic():
+        afetados = Agendamento.objects.no_periodo(inicio, fim).filter(
+            funcionario=funcionario,
+            status__in=['agendado', 'confirmado'],
+            is_active=True
+        )
+        servico_ids = set(afetados.values_list('servico_id', flat=True))
+        if not servico_ids:
+            return relatorio
+
+        habilitados = get_funcionarios_habilitados(servico_ids)
+        # Employees locked in pk order (as every booking path does), then the
+        # originals, so the calendars read below cannot change until commit
+        bloqueados = {
+            outro.pk: outro
+            for outro in Funcionario.objects.select_for_update().filter(
+                pk__in={outro.pk for funcionarios in habilitados.values() for outro in funcionarios} | {funcionario.pk}
+            ).order_by('pk')
+        }
+        candidatos = {
+            pk: outro
+            for pk, outro in bloqueados.items()
+            if pk != funcionario.pk and outro.status == 'ativo' and outro.is_active
+        }
+        afetados = sorted(
+            afetados.select_related('cliente', 'servico').select_for_update(of=('self',)).order_by('pk'),
+            key=lambda agendamento: (agendamento.data_hora, agendamento.pk)
+        )
+        if not afetados:
+            return relatorio
+
+        primeiro_dia = timezone.localtime(afetados[0].data_hora).date()
+        ultimo_dia = timezone.localtime(afetados[-1].data_hora).date()
+        agenda = AgendaFuncionarios(
+            candidatos.values(),
+            *intervalo_dias(primeiro_dia, (ultimo_dia - primeiro_dia).days + dias_busca + 1)
+        )
+
+        for agendamento in afetados:
+            duracao = agendamento.duracao_prevista
+            intervalo = agendamento.servico.intervalo_entre_servicos or 0
+            ids_habilitados = [
+                outro.pk for outro in habilitados.get(agendamento.servico_id, []) if outro.pk in candidatos
+            ]
+            destino = None
+
+            # Same time with another qualified employee
+            termino = agendamento.data_hora + timedelta(minutes=duracao)
+            for funcionario_id in ids_habilitados:
+                if agenda.esta_livre(funcionario_id, agendamento.data_hora, termino, intervalo):
+                    destino = (funcionario_id, agendamento.data_hora)
+                    break
+
+            # Earliest free slot from the original time onwards
+            dia = timezone.localtime(agendamento.data_hora).date()
+            for deslocamento in range(dias_busca + 1):
+                if destino:
+                    break
+                destino = agenda.primeiro_horario(
+                    ids_habilitados,
+                    dia + timedelta(days=deslocamento),
+                    duracao,
+                    a_partir_de=agendamento.data_hora if deslocamento == 0 else None,
+                    intervalo=intervalo
+                )
+
+            if destino is None:
+                relatorio['nao_alocados'].append(agendamento)
+                continue
+
+            # Later appointments of the run see this booking and its interval
+            funcionario_id, data_hora = destino
+            agenda.reservar(
+                funcionario_id,
+                data_hora,
+                data_hora + timedelta(minutes=duracao + intervalo)
+            )
+            novo = copiar_para_reagendamento(agendamento, funcionario_id, data_hora, usuario=usuario)
+            novo.calcular_campos_derivados()
+            relatorio['realocados'].append((agendamento, novo))
+
+        if relatorio['realocados']:
+            # Originals first, so their package sessions are released before
+            # the replacements reserve them again
+            Agendamento.objects.filter(
+                pk__in=[original.pk for original, _ in relatorio['realocados']],
+                status__in=['agendado', 'confirmado']
+            ).transicionar_em_lote(
+                'reagendado',
+                {'motivo_cancelamento': f"Reagendado: {motivo}", 'usuario_cancelou': usuario},
+                usuario=usuario,
+                observacoes=motivo
+            )
+            novos = Agendamento.objects.bulk_create([novo for _, novo in relatorio['realocados']])
+            contar_inseridos(Agendamento, novos)
+            MovimentoPacote.reservar(novos)
+            ids = [novo.pk for novo in novos]
+            transaction.on_commit(lambda: agendamentos_alterados_em_lote.send(
+                sender=Agendamento, ids=ids, status=None
+            ))
+
+    return relatorio
@@ -0,0 +1,98 @@
+"""
+Materialization of recurring appointment series.
+
+Occurrences are generated in bulk up to the series horizon, checked against
+the employee's existing bookings with a single query, and the horizon is
+extended incrementally by the `estender_recorrencias` periodic job.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.contadores import contar_inseridos
+from apps.servicos.precos import get_tabela_precos
+from .disponibilidade import AgendaFuncionarios
+from .models import Agendamento, RecorrenciaAgendamento
+from .signals import agendamentos_alterados_em_lote
+
+
+def materializar_recorrencia(recorrencia, ate=None):
+    """
+    Create the occurrences of a series up to `ate` (default: now + horizon).
+    The employee and the series are locked while occurrences are checked and
+    written, so concurrent runs and bookings cannot overlap them. A series
+    whose employee is no longer active is left untouched.
+
+    Returns a report dict:
+        'criados': list of created Agendamento
+        'conflitos': list of occurrence datetimes that were skipped
+        'funcionario_inativo': True when nothing was generated for that reason
+    """
+    from apps.funcionarios.models import Funcionario
+
+    ate = ate or timezone.now() + timedelta(weeks=recorrencia.horizonte_semanas)
+    relatorio = {'criados': [], 'conflitos': [], 'funcionario_inativo': False}
+
+    with transaction.atomic():
+        # Employee first, as every booking path locks it, then the series
+        funcionario = Funcionario.objects.select_for_update().get(pk=recorrencia.funcionario_id)
+        gerado_ate = RecorrenciaAgendamento.objects.select_for_update().values_list(
+            'gerado_ate', flat=True
+        ).get(pk=recorrencia.pk)
+        recorrencia.gerado_ate = gerado_ate
+        if funcionario.status != 'ativo' or not funcionario.is_active:
+            relatorio['funcionario_inativo'] = True
+            return relatorio
+
+        regra = recorrencia.get_regra()
+        if gerado_ate:
+            ocorrencias = regra.between(gerado_ate, ate, inc=False)
+        else:
+            ocorrencias = regra.between(recorrencia.data_inicio, ate, inc=True)
+        ocorrencias = [ocorrencia for ocorrencia in ocorrencias if ocorrencia > timezone.now()]
+
+        if ocorrencias:
+            servico = recorrencia.servico
+            duracao = timedelta(minutes=servico.duracao_em_minutos)
+            intervalo = timedelta(minutes=servico.intervalo_entre_servicos or 0)
+            agenda = AgendaFuncionarios(
+                [funcionario],
+                ocorrencias[0] - timedelta(days=1),
+                ocorrencias[-1] + duracao
+            )
+
+            tabela_precos = get_tabela_precos()
+            novos = []
+            for ocorrencia in ocorrencias:
+                if not agenda.esta_livre(
+                    funcionario.pk, ocorrencia, ocorrencia + duracao, servico.intervalo_entre_servicos or 0
+                ):
+                    relatorio['conflitos'].append(ocorrencia)
+                    continue
+                agenda.reservar(funcionario.pk, ocorrencia, ocorrencia + duracao + intervalo)
+                agendamento = Agendamento(
+                    cliente_id=recorrencia.cliente_id,
+                    funcionario_id=funcionario.pk,
+                    servico=servico,
+                    data_hora=ocorrencia,
+                    origem=recorrencia.origem,
+                    observacoes=recorrencia.observacoes,
+                    usuario_agendou_id=recorrencia.usuario_criou_id,
+                    recorrencia=recorrencia,
+                )
+                agendamento.calcular_campos_derivados(tabela_precos)
+                novos.append(agendamento)
+
+            relatorio['criados'] = Agendamento.objects.bulk_create(novos)
+            contar_inseridos(Agendamento, relatorio['criados'])
+            ids = [agendamento.pk for agendamento in relatorio['criados']]
+            if ids:
+                transaction.on_commit(lambda: agendamentos_alterados_em_lote.send(
+                    sender=Agendamento, ids=ids, status=None
+                ))
+
+        recorrencia.gerado_ate = ate
+        recorrencia.save(update_fields=['gerado_ate', 'updated_at'])
+
+    return relatorio
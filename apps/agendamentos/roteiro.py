@@ -0,0 +1,141 @@
+"""
+Itinerary planner for service packages.
+
+Booking a PacoteServico schedules every ItemPacote session (by `ordem`,
+repeated `quantidade` times), each one starting after the previous session
+plus its service interval, possibly with different employees. Calendars are
+searched in memory through AgendaFuncionarios.
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.clientes.models import MovimentoPacote
+from apps.core.contadores import contar_inseridos
+from apps.servicos.precos import get_tabela_precos
+from .disponibilidade import AgendaFuncionarios, get_funcionarios_habilitados, intervalo_dias
+from .models import Agendamento
+from .signals import agendamentos_alterados_em_lote
+
+
+def get_sessoes(pacote):
+    """Return the services of a package in execution order, one entry per session"""
+    itens = pacote.itens_pacote.select_related('servico').order_by('ordem', 'servico__nome')
+    return [item.servico for item in itens for _ in range(item.quantidade)]
+
+
+def _encadear(agenda, sessoes, habilitados, dia, ultimo_dia, a_partir_de=None):
+    """
+    Chain the sessions starting on `dia`, each at the earliest free slot after
+    the previous one. Returns a list of (servico, funcionario_id, inicio) or
+    None if a session does not fit until `ultimo_dia`.
+    """
+    roteiro = []
+    cursor = a_partir_de
+    for servico in sessoes:
+        ids = [funcionario.pk for funcionario in habilitados[servico.pk]]
+        destino = None
+        dia_sessao = timezone.localtime(cursor).date() if cursor else dia
+        while destino is None and dia_sessao <= ultimo_dia:
+            destino = agenda.primeiro_horario(
+                ids, dia_sessao, servico.duracao_em_minutos, a_partir_de=cursor,
+                intervalo=servico.intervalo_entre_servicos or 0
+            )
+            dia_sessao += timedelta(days=1)
+        if destino is None:
+            return None
+
+        funcionario_id, inicio = destino
+        roteiro.append((servico, funcionario_id, inicio))
+        cursor = inicio + timedelta(minutes=servico.duracao_em_minutos + (servico.intervalo_entre_servicos or 0))
+    return roteiro
+
+
+def planejar_pacote(pacote, dia, dias_busca=7, mesmo_dia=True, a_partir_de=None):
+    """
+    Find the earliest feasible itinerary for a package from `dia` on.
+
+    With `mesmo_dia` every session must fit on a single day (the first day
+    that allows it within `dias_busca`); otherwise sessions may spill over to
+    the following days. Returns a list of (servico, funcionario_id, inicio)
+    or None.
+    """
+    sessoes = get_sessoes(pacote)
+    if not sessoes:
+        return None
+
+    habilitados = get_funcionarios_habilitados({servico.pk for servico in sessoes})
+    funcionarios = {funcionario.pk: funcionario for lista in habilitados.values() for funcionario in lista}
+    agenda = AgendaFuncionarios(funcionarios.values(), *intervalo_dias(dia, dias_busca + 1))
+    ultimo_dia = dia + timedelta(days=dias_busca)
+
+    for deslocamento in range(dias_busca + 1):
+        inicio = dia + timedelta(days=deslocamento)
+        roteiro = _encadear(
+            agenda,
+            sessoes,
+            habilitados,
+            inicio,
+            inicio if mesmo_dia else ultimo_dia,
+            a_partir_de=a_partir_de if deslocamento == 0 else None
+        )
+        if roteiro:
+            return roteiro
+    return None
+
+
+def agendar_pacote(pacote, cliente, roteiro, usuario=None, origem='presencial', observacoes=''):
+    """
+    Create the appointments of an itinerary atomically, linked via `pacote`.
+
+    Availability is checked again inside the transaction (with the employees
+    locked) so a slot taken meanwhile aborts the whole package. Each session
+    is reserved from the client's package balance; a balance that does not
+    cover every session also aborts it.
+    """
+    from apps.funcionarios.models import Funcionario
+
+    if not roteiro:
+        raise ValidationError('Roteiro vazio para o pacote.')
+
+    fins = [inicio + timedelta(minutes=servico.duracao_em_minutos) for servico, _, inicio in roteiro]
+    with transaction.atomic():
+        funcionarios = Funcionario.objects.select_for_update().filter(
+            pk__in={funcionario_id for _, funcionario_id, _ in roteiro}
+        ).order_by('pk')
+        agenda = AgendaFuncionarios(list(funcionarios), roteiro[0][2], max(fins))
+
+        tabela_precos = get_tabela_precos()
+        novos = []
+        for (servico, funcionario_id, inicio), fim in zip(roteiro, fins):
+            if not agenda.esta_livre(funcionario_id, inicio, fim, servico.intervalo_entre_servicos or 0):
+                raise ValidationError(
+                    f'O horário de {timezone.localtime(inicio):%d/%m/%Y %H:%M} para '
+                    f'{servico.nome} não está mais disponível.'
+                )
+            agenda.reservar(
+                funcionario_id, inicio, fim + timedelta(minutes=servico.intervalo_entre_servicos or 0)
+            )
+            agendamento = Agendamento(
+                cliente=cliente,
+                funcionario_id=funcionario_id,
+                servico=servico,
+                pacote=pacote,
+                data_hora=inicio,
+                origem=origem,
+                observacoes=observacoes,
+                usuario_agendou=usuario,
+            )
+            agendamento.calcular_campos_derivados(tabela_precos)
+            novos.append(agendamento)
+
+        criados = Agendamento.objects.bulk_create(novos)
+        contar_inseridos(Agendamento, criados)
+        MovimentoPacote.reservar(criados)
+        ids = [agendamento.pk for agendamento in criados]
+        transaction.on_commit(lambda: agendamentos_alterados_em_lote.send(
+            sender=Agendamento, ids=ids, status=None
+        ))
+    return criados
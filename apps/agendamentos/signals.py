@@ -0,0 +1,117 @@
+"""
+Signals for agendamentos app.
+"""
+from datetime import timedelta
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from apps.core.sinais import linha_anterior, registrar_colunas_anteriores
+from apps.funcionarios.models import Funcionario
+from apps.servicos.catalogo import get_catalogo
+from .cache import invalidar_agendas, invalidar_funcionarios
+from .disponibilidade import STATUS_OCUPADOS
+from .models import Agendamento
+
+# Sent after queryset-level operations that bypass post_save (bulk UPDATEs
+# and bulk_create). Arguments: `ids` (list of appointment pks) and `status`
+# (new status, or None when rows were created).
+agendamentos_alterados_em_lote = Signal()
+
+# Fields that decide whether and when an appointment keeps its employee busy
+CAMPOS_OCUPACAO = {'funcionario', 'data_hora', 'data_hora_fim', 'duracao_prevista', 'status', 'is_active'}
+
+COLUNAS_OCUPACAO = ['funcionario_id', 'servico_id', 'data_hora', 'data_hora_fim', 'duracao_prevista']
+
+registrar_colunas_anteriores(Agendamento, [*COLUNAS_OCUPACAO, 'status', 'is_active'])
+
+
+def ocupacao(funcionario_id, servico_id, data_hora, data_hora_fim, duracao_prevista,
+             status='agendado', is_active=True, intervalo=0):
+    """
+    Return the (funcionario_id, inicio, fim) busy interval of an appointment,
+    including the service's `intervalo` in minutes, or None
+    """
+    if not is_active or status not in STATUS_OCUPADOS or data_hora is None:
+        return None
+    fim = data_hora_fim or data_hora + timedelta(minutes=duracao_prevista or 0)
+    return funcionario_id, data_hora, fim + timedelta(minutes=intervalo or 0)
+
+
+def _intervalo_do_servico(instance, servico_id=None):
+    """
+    Interval after a service, from the instance's loaded `servico` when it
+    is the one asked for, otherwise from the catalog snapshot (no query)
+    """
+    servico_id = servico_id or instance.servico_id
+    if Agendamento.servico.is_cached(instance) and instance.servico.pk == servico_id:
+        return instance.servico.intervalo_entre_servicos
+    servico = get_catalogo().servicos.get(servico_id)
+    return servico.intervalo_entre_servicos if servico else 0
+
+
+def _ocupacao_da_instancia(instance):
+    return ocupacao(
+        *(getattr(instance, coluna) for coluna in COLUNAS_OCUPACAO),
+        status=instance.status,
+        is_active=instance.is_active,
+        intervalo=_intervalo_do_servico(instance)
+    )
+
+
+@receiver(pre_save, sender=Agendamento)
+def guardar_ocupacao_anterior(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Remember the busy interval being replaced, to invalidate its agenda"""
+    instance._ocupacao_anterior = None
+    instance._ocupacao_alterada = not raw and (update_fields is None or bool(CAMPOS_OCUPACAO & set(update_fields)))
+    if instance._ocupacao_alterada and not instance._state.adding:
+        anterior = linha_anterior(sender, instance)
+        instance._ocupacao_anterior = ocupacao(
+            *(anterior[coluna] for coluna in COLUNAS_OCUPACAO),
+            status=anterior['status'],
+            is_active=anterior['is_active'],
+            intervalo=_intervalo_do_servico(instance, anterior['servico_id'])
+        ) if anterior else None
+
+
+@receiver(post_save, sender=Agendamento)
+def invalidar_agenda(sender, instance, **kwargs):
+    """Invalidate the cached availability when an appointment is created, moved or cancelled"""
+    if not getattr(instance, '_ocupacao_alterada', False):
+        return
+    anterior = instance._ocupacao_anterior
+    atual = _ocupacao_da_instancia(instance)
+    if anterior != atual:
+        invalidar_agendas([intervalo for intervalo in (anterior, atual) if intervalo])
+
+
+@receiver(post_delete, sender=Agendamento)
+def invalidar_agenda_excluida(sender, instance, **kwargs):
+    intervalo = _ocupacao_da_instancia(instance)
+    if intervalo:
+        invalidar_agendas([intervalo])
+
+
+@receiver(agendamentos_alterados_em_lote, sender=Agendamento)
+def invalidar_agendas_em_lote(sender, ids, status=None, **kwargs):
+    """
+    Invalidate the agendas of appointments created or released in bulk.
+    Bulk transitions into a busy status (confirmations) always start from a
+    busy status, so they leave the agendas untouched.
+    """
+    if status in STATUS_OCUPADOS:
+        return
+    # Released rows no longer occupy: invalidate the interval they held
+    invalidar_agendas([
+        ocupacao(*linha[:-1], intervalo=linha[-1])
+        for linha in Agendamento.objects.filter(pk__in=ids).values_list(
+            *COLUNAS_OCUPACAO, 'servico__intervalo_entre_servicos'
+        ).iterator()
+    ])
+
+
+@receiver(post_save, sender=Funcionario)
+@receiver(post_delete, sender=Funcionario)
+def invalidar_expedientes(sender, **kwargs):
+    """Shifts, working days or status of an employee changed"""
+    invalidar_funcionarios()
@@ -0,0 +1,800 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.clientes.models import Cliente, ClientePacote, MovimentoPacote, SaldoPacote
+from apps.core.cache import bump_version
+from apps.funcionarios.models import Cargo, Funcionario
+from apps.servicos.catalogo import CATALOGO_VERSION_KEY
+from apps.servicos.models import CategoriaServico, ItemPacote, PacoteServico, Servico
+from apps.usuarios.models import Usuario
+from . import particionamento
+from .arquivamento import arquivar_agendamentos
+from .disponibilidade import AgendaFuncionarios
+from .models import (
+    Agendamento, AgendamentoArquivado, ChaveIdempotencia, RecorrenciaAgendamento, StatusAgendamento
+)
+from .realocacao import realocar_agendamentos
+from .recorrencia import materializar_recorrencia
+from .roteiro import agendar_pacote
+from .signals import agendamentos_alterados_em_lote
+
+
+def criar_funcionario(nome, cpf, **kwargs):
+    cargo, _ = Cargo.objects.get_or_create(nome='Cabeleireiro')
+    dados = dict(
+        nome=nome, telefone='11999999999', cpf=cpf, data_nascimento=date(1990, 1, 1),
+        endereco='Rua A', cidade='São Paulo', estado='SP', cep='01000-000', cargo=cargo,
+        data_admissao=date(2020, 1, 1), salario_atual=Decimal('2000'),
+        horario_entrada=time(9), horario_saida=time(18), dias_trabalho='seg-sab'
+    )
+    dados.update(kwargs)
+    return Funcionario.objects.create(**dados)
+
+
+def criar_servico(nome, duracao, **kwargs):
+    categoria, _ = CategoriaServico.objects.get_or_create(nome='Cabelo')
+    return Servico.objects.create(
+        nome=nome, descricao=nome, categoria=categoria, preco=Decimal('50'), duracao=duracao, **kwargs
+    )
+
+
+def proxima_segunda(hora, minuto=0, semanas=1):
+    """A Monday at least a week ahead, at the given local time"""
+    hoje = timezone.localdate()
+    dia = hoje + timedelta(days=7 * semanas - hoje.weekday())
+    return timezone.make_aware(datetime.combine(dia, time(hora, minuto)))
+
+
+class AgendamentosTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = criar_funcionario('Ana', '111.111.111-11')
+        cls.bia = criar_funcionario('Bia', '222.222.222-22')
+        cls.cliente = Cliente.objects.create(nome='João', telefone='11988887777')
+        cls.corte = criar_servico('Corte', 30)
+        cls.escova = criar_servico('Escova', 60, intervalo_entre_servicos=10)
+        cls.usuario = Usuario.objects.create(username='adm', nome='Administrador')
+
+    def agendar(self, data_hora, funcionario=None, servico=None, **kwargs):
+        return Agendamento.objects.create(
+            cliente=self.cliente,
+            funcionario=funcionario or self.ana,
+            servico=servico or self.corte,
+            data_hora=data_hora,
+            **kwargs
+        )
+
+
+class AgendamentosApiTestCase(AgendamentosTestCase):
+
+    def setUp(self):
+        self.api = APIClient(SERVER_NAME='localhost')
+        self.api.force_authenticate(self.usuario)
+
+    def linha(self, data_hora, **kwargs):
+        dados = {
+            'cliente': self.cliente.pk,
+            'funcionario': self.ana.pk,
+            'servico': self.corte.pk,
+            'data_hora': data_hora.isoformat(),
+        }
+        dados.update(kwargs)
+        return dados
+
+
+class DisponibilidadeTests(AgendamentosTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.hidratacao = criar_servico('Hidratação', 30, intervalo_entre_servicos=15)
+
+    def test_intervalo_de_agendamento_anterior_a_janela(self):
+        self.agendar(proxima_segunda(10), servico=self.hidratacao)
+        inicio = proxima_segunda(10, 30)
+        agenda = AgendaFuncionarios([self.ana], inicio, inicio + timedelta(minutes=30))
+
+        self.assertFalse(agenda.esta_livre(self.ana.pk, inicio, inicio + timedelta(minutes=30)))
+        self.assertTrue(agenda.esta_livre(self.ana.pk, proxima_segunda(10, 45), proxima_segunda(11, 15)))
+
+    def test_intervalo_do_novo_agendamento(self):
+        self.agendar(proxima_segunda(10))
+        inicio = proxima_segunda(9, 30)
+        agenda = AgendaFuncionarios([self.ana], inicio, inicio + timedelta(minutes=30))
+
+        self.assertTrue(agenda.esta_livre(self.ana.pk, inicio, proxima_segunda(10)))
+        self.assertFalse(agenda.esta_livre(self.ana.pk, inicio, proxima_segunda(10), 15))
+        self.assertNotIn(
+            inicio, agenda.horarios_livres(self.ana.pk, inicio.date(), 30, a_partir_de=inicio, intervalo=15)
+        )
+
+
+class DisponibilidadeCacheTests(AgendamentosApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        bump_version(CATALOGO_VERSION_KEY)
+        self.dia = proxima_segunda(10).date()
+
+    def horarios(self):
+        """Free times per employee name, and the queries that read appointments"""
+        tabela = f'FROM "{Agendamento._meta.db_table}"'
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.api.get('/api/disponibilidade/', {'servico': self.corte.pk, 'data': self.dia})
+        self.assertEqual(resposta.status_code, 200)
+        livres = {
+            funcionario['nome']: {timezone.localtime(inicio).strftime('%H:%M') for inicio in funcionario['horarios']}
+            for funcionario in resposta.data['funcionarios']
+        }
+        return livres, len([consulta for consulta in consultas if tabela in consulta['sql']])
+
+    def test_cache_invalidado_apenas_pela_agenda_alterada(self):
+        livres, consultas = self.horarios()
+        self.assertIn('10:00', livres['Ana'])
+        self.assertEqual(consultas, 1)
+        self.assertEqual(self.horarios(), (livres, 0))
+
+        # A booking on another day leaves this day's entry in the cache
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agendar(proxima_segunda(10, semanas=3))
+        self.assertEqual(self.horarios(), (livres, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento = self.agendar(proxima_segunda(10))
+        livres, consultas = self.horarios()
+        self.assertEqual(consultas, 1)
+        self.assertNotIn('10:00', livres['Ana'])
+        self.assertIn('10:00', livres['Bia'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento.data_hora = proxima_segunda(14)
+            agendamento.save(update_fields=['data_hora'])
+        livres, consultas = self.horarios()
+        self.assertEqual(consultas, 1)
+        self.assertIn('10:00', livres['Ana'])
+        self.assertNotIn('14:00', livres['Ana'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(agendamento.cancelar('Cliente desistiu'))
+        livres, consultas = self.horarios()
+        self.assertEqual(consultas, 1)
+        self.assertIn('14:00', livres['Ana'])
+
+    def test_cancelamento_em_lote_invalida(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agendar(proxima_segunda(10), funcionario=self.bia)
+        livres, _ = self.horarios()
+        self.assertNotIn('10:00', livres['Bia'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Agendamento.objects.cancelar_em_lote('Feriado'), 1)
+        livres, consultas = self.horarios()
+        self.assertEqual(consultas, 1)
+        self.assertIn('10:00', livres['Bia'])
+
+
+class SinaisTests(AgendamentosTestCase):
+
+    def consultas_da_linha(self, agendamento, **kwargs):
+        tabela = f'FROM "{Agendamento._meta.db_table}"'
+        with CaptureQueriesContext(connection) as consultas:
+            agendamento.save(**kwargs)
+        return [consulta['sql'] for consulta in consultas if tabela in consulta['sql']]
+
+    def test_linha_anterior_lida_uma_vez_por_save(self):
+        agendamento = self.agendar(proxima_segunda(10))
+        agendamento.status = 'confirmado'
+        self.assertEqual(len(self.consultas_da_linha(agendamento)), 1)
+        self.assertEqual(len(self.consultas_da_linha(agendamento)), 1)
+
+    def test_save_parcial_sem_campos_observados(self):
+        agendamento = self.agendar(proxima_segunda(10))
+        agendamento.observacoes = 'Cliente pediu lembrete'
+        self.assertEqual(self.consultas_da_linha(agendamento, update_fields=['observacoes']), [])
+
+
+class CamposDerivadosTests(AgendamentosTestCase):
+
+    def test_save_de_status_grava_apenas_a_data_da_transicao(self):
+        agendamento = self.agendar(proxima_segunda(10))
+        desatualizado = Agendamento.objects.get(pk=agendamento.pk)
+
+        agendamento.status = 'confirmado'
+        agendamento.save(update_fields=['status'])
+        desatualizado.status = 'cancelado'
+        desatualizado.save(update_fields=['status'])
+
+        agendamento.refresh_from_db()
+        self.assertEqual(agendamento.status, 'cancelado')
+        self.assertIsNotNone(agendamento.data_confirmacao)
+        self.assertIsNotNone(agendamento.data_cancelamento)
+
+    def test_save_de_horario_recalcula_o_fim(self):
+        agendamento = self.agendar(proxima_segunda(10))
+
+        agendamento.data_hora = proxima_segunda(14)
+        agendamento.save(update_fields=['data_hora'])
+        agendamento.duracao_prevista = 45
+        agendamento.save(update_fields=['duracao_prevista'])
+        agendamento.refresh_from_db()
+        self.assertEqual(agendamento.data_hora_fim, proxima_segunda(14, 45))
+
+        agendamento.data_hora = proxima_segunda(16)
+        agendamento.data_hora_fim = proxima_segunda(17)
+        agendamento.save(update_fields=['data_hora', 'data_hora_fim'])
+        agendamento.refresh_from_db()
+        self.assertEqual(agendamento.data_hora_fim, proxima_segunda(17))
+
+
+class PeriodoTests(AgendamentosTestCase):
+
+    def local(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def pks(self, queryset):
+        return set(queryset.values_list('pk', flat=True))
+
+    def test_limites_do_dia_no_fuso_local(self):
+        antes = self.agendar(self.local(2026, 3, 1, 23, 59))
+        meia_noite = self.agendar(self.local(2026, 3, 2, 0, 0))
+        fim_do_dia = self.agendar(self.local(2026, 3, 2, 23, 59), funcionario=self.bia)
+        depois = self.agendar(self.local(2026, 3, 3, 0, 0), funcionario=self.bia)
+
+        self.assertEqual(self.pks(Agendamento.objects.no_dia(date(2026, 3, 2))), {meia_noite.pk, fim_do_dia.pk})
+        self.assertEqual(self.pks(Agendamento.objects.no_dia(date(2026, 3, 1))), {antes.pk})
+        self.assertEqual(self.pks(Agendamento.objects.no_dia(date(2026, 3, 3))), {depois.pk})
+
+        # 22:00 in São Paulo is already the next day in UTC
+        with mock.patch('django.utils.timezone.now', return_value=self.local(2026, 3, 2, 22)):
+            self.assertEqual(self.pks(Agendamento.objects.no_dia()), {meia_noite.pk, fim_do_dia.pk})
+
+    def test_limites_do_mes_no_fuso_local(self):
+        ultimo_dia = self.agendar(self.local(2026, 3, 31, 23, 30))
+        primeiro_dia = self.agendar(self.local(2026, 4, 1, 0, 0))
+        self.agendar(self.local(2026, 2, 28, 23, 30))
+
+        self.assertEqual(self.pks(Agendamento.objects.no_mes(2026, 3)), {ultimo_dia.pk})
+        self.assertEqual(self.pks(Agendamento.objects.no_mes(2026, 4)), {primeiro_dia.pk})
+
+        dezembro = self.agendar(self.local(2026, 12, 31, 23, 30))
+        janeiro = self.agendar(self.local(2027, 1, 1, 0, 0))
+        self.assertEqual(self.pks(Agendamento.objects.no_mes(2026, 12)), {dezembro.pk})
+        self.assertEqual(self.pks(Agendamento.objects.no_mes(2027, 1)), {janeiro.pk})
+
+
+class HistoricoStatusTests(AgendamentosTestCase):
+
+    def trilha(self, agendamento):
+        return list(
+            agendamento.historico_status.order_by('data_mudanca')
+            .values_list('status_anterior', 'status_novo', 'usuario_id', 'observacoes')
+        )
+
+    def test_transicoes_gravadas_no_commit(self):
+        agendamento = self.agendar(proxima_segunda(10))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(agendamento.confirmar(usuario=self.usuario))
+            self.assertEqual(self.trilha(agendamento), [])
+
+        Agendamento.objects.filter(pk=agendamento.pk).update(status='em_andamento')
+        agendamento.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(agendamento.concluir_atendimento(usuario=self.usuario))
+
+        self.assertEqual(self.trilha(agendamento), [
+            ('agendado', 'confirmado', self.usuario.pk, ''),
+            ('em_andamento', 'concluido', self.usuario.pk, ''),
+        ])
+        self.assertEqual(
+            [item['status'] for item in agendamento.get_historico_status()], ['agendado', 'confirmado', 'concluido']
+        )
+
+    def test_transicao_desfeita_nao_grava(self):
+        agendamento = self.agendar(proxima_segunda(10))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    agendamento.cancelar('Cliente desistiu')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(StatusAgendamento.objects.exists())
+
+    def test_reagendamento(self):
+        agendamento = self.agendar(proxima_segunda(10))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            novo = agendamento.reagendar(proxima_segunda(11), motivo='Imprevisto', usuario=self.usuario)
+
+        self.assertEqual(self.trilha(agendamento), [
+            ('agendado', 'reagendado', self.usuario.pk, f'Reagendado para o agendamento #{novo.pk}. Imprevisto'),
+        ])
+        self.assertEqual(self.trilha(novo), [])
+
+    def test_agendamento_sem_trilha_usa_as_datas(self):
+        agendamento = self.agendar(proxima_segunda(10))
+        Agendamento.objects.filter(pk=agendamento.pk).update(
+            status='cancelado', data_cancelamento=timezone.now()
+        )
+        agendamento.refresh_from_db()
+
+        self.assertEqual([item['status'] for item in agendamento.get_historico_status()], ['agendado', 'cancelado'])
+
+
+class TransicaoEmLoteTests(AgendamentosTestCase):
+
+    def setUp(self):
+        self.enviados = []
+        agendamentos_alterados_em_lote.connect(self.receber, sender=Agendamento)
+        self.addCleanup(agendamentos_alterados_em_lote.disconnect, self.receber, sender=Agendamento)
+
+    def receber(self, sender, ids, status, **kwargs):
+        self.enviados.append((sorted(ids), status))
+
+    def test_confirma_apenas_os_elegiveis(self):
+        futuro = self.agendar(proxima_segunda(10))
+        outro = self.agendar(proxima_segunda(11))
+        cancelado = self.agendar(proxima_segunda(12), status='cancelado')
+        passado = self.agendar(timezone.now() - timedelta(days=1))
+        inativo = self.agendar(proxima_segunda(13), is_active=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Agendamento.objects.confirmar_em_lote(usuario=self.usuario), 2)
+            self.assertEqual(self.enviados, [])
+
+        self.assertEqual(self.enviados, [(sorted([futuro.pk, outro.pk]), 'confirmado')])
+        status = dict(Agendamento.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [status[pk] for pk in (futuro.pk, outro.pk, cancelado.pk, passado.pk, inativo.pk)],
+            ['confirmado', 'confirmado', 'cancelado', 'agendado', 'agendado']
+        )
+        futuro.refresh_from_db()
+        self.assertEqual(futuro.usuario_confirmou, self.usuario)
+        self.assertIsNotNone(futuro.data_confirmacao)
+        self.assertEqual(
+            sorted(StatusAgendamento.objects.values_list('agendamento_id', 'status_anterior', 'status_novo')),
+            sorted([(futuro.pk, 'agendado', 'confirmado'), (outro.pk, 'agendado', 'confirmado')])
+        )
+
+    def test_cancela_e_marca_nao_compareceu(self):
+        confirmado = self.agendar(proxima_segunda(10), status='confirmado')
+        passado = self.agendar(timezone.now() - timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Agendamento.objects.cancelar_em_lote('Feriado'), 1)
+            self.assertEqual(Agendamento.objects.marcar_nao_compareceu(), 1)
+
+        confirmado.refresh_from_db()
+        self.assertEqual((confirmado.status, confirmado.motivo_cancelamento), ('cancelado', 'Feriado'))
+        self.assertEqual(Agendamento.objects.get(pk=passado.pk).status, 'nao_compareceu')
+        self.assertEqual(self.enviados, [([confirmado.pk], 'cancelado'), ([passado.pk], 'nao_compareceu')])
+        self.assertEqual(StatusAgendamento.objects.get(agendamento=confirmado).observacoes, 'Feriado')
+
+    def test_nada_a_transicionar(self):
+        self.agendar(proxima_segunda(10), status='cancelado')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Agendamento.objects.confirmar_em_lote(), 0)
+        self.assertEqual(self.enviados, [])
+        self.assertFalse(StatusAgendamento.objects.exists())
+
+
+class ArquivamentoTests(AgendamentosTestCase):
+
+    def agendar_antigo(self, dias, **kwargs):
+        data_hora = timezone.now() - timedelta(days=3 * 365 + dias)
+        return self.agendar(data_hora.replace(minute=0, second=0, microsecond=0), **kwargs)
+
+    def test_arquiva_reagendamento_antes_do_original(self):
+        original = self.agendar_antigo(2, status='reagendado')
+        novo = self.agendar_antigo(1, status='concluido', agendamento_original=original)
+
+        self.assertEqual(arquivar_agendamentos(anos=2), 2)
+
+        arquivado = AgendamentoArquivado.objects.get(agendamento_id=novo.pk)
+        self.assertEqual(arquivado.como_agendamento().agendamento_original_id, original.pk)
+        self.assertTrue(AgendamentoArquivado.objects.filter(agendamento_id=original.pk).exists())
+
+    def test_movimentos_de_pacote_apontam_para_o_arquivado(self):
+        pacote = PacoteServico.objects.create(nome='Cortes', descricao='Um corte', preco_total=Decimal('40'))
+        ItemPacote.objects.create(pacote=pacote, servico=self.corte, quantidade=1)
+        ClientePacote.objects.create(cliente=self.cliente, pacote=pacote)
+        agendamento = self.agendar_antigo(1, pacote=pacote)
+        Agendamento.objects.filter(pk=agendamento.pk).update(status='concluido')
+
+        self.assertEqual(arquivar_agendamentos(anos=2), 1)
+
+        arquivado = AgendamentoArquivado.objects.get(agendamento_id=agendamento.pk)
+        self.assertEqual(list(arquivado.get_movimentos_pacote().values_list('tipo', flat=True)), ['reserva'])
+        self.assertFalse(MovimentoPacote.objects.filter(tipo='reserva', agendamento_id__isnull=True).exists())
+
+    def test_arquiva_chaves_de_idempotencia(self):
+        agendamento = self.agendar_antigo(1, status='cancelado')
+        ChaveIdempotencia.objects.create(usuario=self.usuario, chave='lote-1', agendamento=agendamento)
+
+        self.assertEqual(arquivar_agendamentos(anos=2), 1)
+
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+        arquivado = AgendamentoArquivado.objects.get(agendamento_id=agendamento.pk)
+        self.assertEqual([chave['chave'] for chave in arquivado.dados['chaves_idempotencia']], ['lote-1'])
+
+
+class RealocacaoTests(AgendamentosTestCase):
+
+    def realocar(self, **kwargs):
+        inicio = proxima_segunda(0)
+        return realocar_agendamentos(self.ana, inicio, inicio + timedelta(days=1), usuario=self.usuario, **kwargs)
+
+    def test_move_para_outro_funcionario_no_mesmo_horario(self):
+        original = self.agendar(proxima_segunda(10))
+
+        relatorio = self.realocar(motivo='Férias')
+
+        self.assertEqual(relatorio['nao_alocados'], [])
+        (realocado, novo), = relatorio['realocados']
+        self.assertEqual(realocado.pk, original.pk)
+        self.assertEqual((novo.funcionario_id, novo.data_hora), (self.bia.pk, original.data_hora))
+        self.assertEqual(novo.agendamento_original_id, original.pk)
+        original.refresh_from_db()
+        self.assertEqual(original.status, 'reagendado')
+
+    def test_respeita_intervalo_entre_servicos(self):
+        self.agendar(proxima_segunda(10), servico=self.escova)
+        self.agendar(proxima_segunda(11), servico=self.escova)
+
+        relatorio = self.realocar()
+
+        horarios = sorted(novo.data_hora for _, novo in relatorio['realocados'])
+        # 10:00-11:00 plus the 10 minute interval pushes the second one to
+        # the next 15 minute slot
+        self.assertEqual(horarios, [proxima_segunda(10), proxima_segunda(11, 15)])
+        self.assertTrue(all(novo.funcionario_id == self.bia.pk for _, novo in relatorio['realocados']))
+
+    def test_nao_usa_funcionario_inativo(self):
+        self.bia.status = 'ferias'
+        self.bia.save()
+        self.agendar(proxima_segunda(10))
+
+        relatorio = self.realocar()
+
+        self.assertEqual(relatorio['realocados'], [])
+        self.assertEqual(len(relatorio['nao_alocados']), 1)
+        self.assertEqual(Agendamento.objects.filter(funcionario=self.bia).count(), 0)
+
+    def test_ignora_cancelados(self):
+        cancelado = self.agendar(proxima_segunda(10), status='cancelado')
+
+        relatorio = self.realocar()
+
+        self.assertEqual(relatorio, {'realocados': [], 'nao_alocados': []})
+        cancelado.refresh_from_db()
+        self.assertEqual(cancelado.status, 'cancelado')
+
+
+class RecorrenciaTests(AgendamentosTestCase):
+
+    def setUp(self):
+        self.recorrencia = RecorrenciaAgendamento.objects.create(
+            cliente=self.cliente, funcionario=self.ana, servico=self.corte,
+            regra='FREQ=WEEKLY;COUNT=3', data_inicio=proxima_segunda(10)
+        )
+        self.ate = proxima_segunda(0, semanas=5)
+
+    def test_gera_as_ocorrencias_uma_vez(self):
+        relatorio = materializar_recorrencia(self.recorrencia, ate=self.ate)
+        self.assertEqual(len(relatorio['criados']), 3)
+
+        # A stale copy of the series must not generate the occurrences again
+        copia = RecorrenciaAgendamento.objects.get(pk=self.recorrencia.pk)
+        copia.gerado_ate = None
+        relatorio = materializar_recorrencia(copia, ate=self.ate)
+        self.assertEqual(relatorio['criados'], [])
+        self.assertEqual(self.recorrencia.agendamentos.count(), 3)
+
+    def test_pula_horarios_ocupados(self):
+        self.agendar(proxima_segunda(10, semanas=2))
+
+        relatorio = materializar_recorrencia(self.recorrencia, ate=self.ate)
+
+        self.assertEqual(len(relatorio['criados']), 2)
+        self.assertEqual(relatorio['conflitos'], [proxima_segunda(10, semanas=2)])
+
+    def test_funcionario_inativo(self):
+        Funcionario.objects.filter(pk=self.ana.pk).update(status='licenca')
+
+        relatorio = materializar_recorrencia(self.recorrencia, ate=self.ate)
+
+        self.assertTrue(relatorio['funcionario_inativo'])
+        self.assertEqual(relatorio['criados'], [])
+        self.recorrencia.refresh_from_db()
+        self.assertIsNone(self.recorrencia.gerado_ate)
+
+
+class SaldoPacoteTests(AgendamentosApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.pacote = PacoteServico.objects.create(nome='Cortes', descricao='Um corte', preco_total=Decimal('40'))
+        ItemPacote.objects.create(pacote=cls.pacote, servico=cls.corte, quantidade=1)
+        ClientePacote.objects.create(cliente=cls.cliente, pacote=cls.pacote)
+
+    def saldo(self):
+        return SaldoPacote.objects.get(cliente=self.cliente, servico=self.corte)
+
+    def test_saldo_insuficiente_desfaz_o_agendamento(self):
+        self.agendar(proxima_segunda(10), pacote=self.pacote)
+        self.assertEqual(self.saldo().quantidade_reservada, 1)
+
+        agendamento = Agendamento(
+            cliente=self.cliente, funcionario=self.ana, servico=self.corte,
+            pacote=self.pacote, data_hora=proxima_segunda(11)
+        )
+        with self.assertRaises(ValidationError):
+            agendamento.save()
+        self.assertIsNone(agendamento.pk)
+        self.assertEqual(Agendamento.objects.filter(pacote=self.pacote).count(), 1)
+        self.assertEqual(self.saldo().quantidade_reservada, 1)
+
+    def test_api_recusa_pacote_sem_saldo(self):
+        resposta = self.api.post('/api/agendamentos/', self.linha(proxima_segunda(10), pacote=self.pacote.pk))
+        self.assertEqual(resposta.status_code, 201)
+
+        resposta = self.api.post('/api/agendamentos/', self.linha(proxima_segunda(11), pacote=self.pacote.pk))
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('pacote', resposta.data)
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+    def test_api_recusa_pacote_de_outro_cliente(self):
+        outro = Cliente.objects.create(nome='Maria', telefone='11977776666')
+        resposta = self.api.post('/api/agendamentos/', self.linha(
+            proxima_segunda(10), cliente=outro.pk, pacote=self.pacote.pk
+        ))
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('pacote', resposta.data)
+
+    def test_lote_reserva_ate_o_saldo(self):
+        resposta = self.api.post('/api/agendamentos/lote/', [
+            self.linha(proxima_segunda(10), pacote=self.pacote.pk),
+            self.linha(proxima_segunda(11), pacote=self.pacote.pk),
+        ], format='json')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual((resposta.data['criados'], resposta.data['erros']), (1, 1))
+        self.assertIn('pacote', resposta.data['resultados'][1]['erros'])
+        self.assertEqual(self.saldo().quantidade_reservada, 1)
+
+
+class RoteiroTests(AgendamentosTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.pacote = PacoteServico.objects.create(nome='Escova e corte', descricao='Dia', preco_total=Decimal('80'))
+        ItemPacote.objects.create(pacote=cls.pacote, servico=cls.escova, quantidade=1, ordem=1)
+        ItemPacote.objects.create(pacote=cls.pacote, servico=cls.corte, quantidade=1, ordem=2)
+        ClientePacote.objects.create(cliente=cls.cliente, pacote=cls.pacote)
+
+    def test_respeita_intervalo_entre_sessoes(self):
+        roteiro = [(self.escova, self.ana.pk, proxima_segunda(10)), (self.corte, self.ana.pk, proxima_segunda(11))]
+        with self.assertRaises(ValidationError):
+            agendar_pacote(self.pacote, self.cliente, roteiro)
+        self.assertEqual(Agendamento.objects.count(), 0)
+
+        roteiro[1] = (self.corte, self.ana.pk, proxima_segunda(11, 15))
+        criados = agendar_pacote(self.pacote, self.cliente, roteiro)
+        self.assertEqual(len(criados), 2)
+
+
+class AgendamentoApiTests(AgendamentosApiTestCase):
+
+    def test_criacao_respeita_intervalo_entre_servicos(self):
+        self.agendar(proxima_segunda(10), servico=self.escova)
+        self.agendar(proxima_segunda(14))
+
+        # Inside the interval after the 10:00 one, then after it
+        resposta = self.api.post('/api/agendamentos/', self.linha(proxima_segunda(11)))
+        self.assertEqual(resposta.status_code, 400)
+        resposta = self.api.post('/api/agendamentos/', self.linha(proxima_segunda(11, 15)))
+        self.assertEqual(resposta.status_code, 201)
+
+        # Its own interval would run into the 14:00 one
+        resposta = self.api.post('/api/agendamentos/', self.linha(proxima_segunda(13), servico=self.escova.pk))
+        self.assertEqual(resposta.status_code, 400)
+        resposta = self.api.post('/api/agendamentos/', self.linha(proxima_segunda(12, 45), servico=self.escova.pk))
+        self.assertEqual(resposta.status_code, 201)
+
+    def test_reagendar_respeita_intervalo_entre_servicos(self):
+        self.agendar(proxima_segunda(10), servico=self.escova)
+        agendamento = self.agendar(proxima_segunda(15))
+        url = f'/api/agendamentos/{agendamento.pk}/reagendar/'
+
+        resposta = self.api.post(url, {'data_hora': proxima_segunda(11).isoformat()})
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = self.api.post(url, {'data_hora': proxima_segunda(11, 15).isoformat()})
+        self.assertEqual(resposta.status_code, 201)
+        novo = Agendamento.objects.get(pk=resposta.data['id'])
+        self.assertEqual(novo.agendamento_original_id, agendamento.pk)
+        agendamento.refresh_from_db()
+        self.assertEqual(agendamento.status, 'reagendado')
+
+    def test_campos_esparsos(self):
+        self.agendar(proxima_segunda(10))
+
+        resposta = self.api.get('/api/agendamentos/', {'fields': 'id,data_hora,cliente_nome'})
+        self.assertEqual(resposta.status_code, 200)
+        item, = resposta.data['results']
+        self.assertEqual(set(item), {'id', 'data_hora', 'cliente_nome'})
+        self.assertEqual(item['cliente_nome'], 'João')
+
+        resposta = self.api.get('/api/agendamentos/', {'fields': 'id,senha'})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('fields', resposta.data)
+
+    def test_filtros(self):
+        primeiro = self.agendar(proxima_segunda(10))
+        segundo = self.agendar(proxima_segunda(10, semanas=2), funcionario=self.bia, status='confirmado')
+        dia = timezone.localdate(primeiro.data_hora)
+
+        def ids(**parametros):
+            resposta = self.api.get('/api/agendamentos/', parametros)
+            self.assertEqual(resposta.status_code, 200)
+            return [item['id'] for item in resposta.data['results']]
+
+        self.assertEqual(ids(data_inicio=dia.isoformat(), data_fim=dia.isoformat()), [primeiro.pk])
+        self.assertEqual(ids(funcionario=self.bia.pk), [segundo.pk])
+        self.assertEqual(ids(status='agendado,cancelado'), [primeiro.pk])
+        self.assertEqual(ids(), [segundo.pk, primeiro.pk])
+
+        for parametros in ({'data_inicio': '02/03/2026'}, {'cliente': 'x'}, {'status': 'pendente'}):
+            with self.subTest(parametros=parametros):
+                resposta = self.api.get('/api/agendamentos/', parametros)
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn(next(iter(parametros)), resposta.data)
+
+    def test_transicoes(self):
+        agendamento = self.agendar(proxima_segunda(10))
+        url = f'/api/agendamentos/{agendamento.pk}'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.api.post(f'{url}/confirmar/')
+        self.assertEqual((resposta.status_code, resposta.data['status']), (200, 'confirmado'))
+        resposta = self.api.post(f'{url}/confirmar/')
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = self.api.post(f'{url}/nao-compareceu/')
+        self.assertEqual(resposta.status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.api.post(f'{url}/cancelar/', {'motivo': 'Imprevisto'})
+        self.assertEqual((resposta.status_code, resposta.data['status']), (200, 'cancelado'))
+        agendamento.refresh_from_db()
+        self.assertEqual(agendamento.motivo_cancelamento, 'Imprevisto')
+        self.assertEqual(
+            list(agendamento.historico_status.order_by('data_mudanca').values_list('status_anterior', 'status_novo')),
+            [('agendado', 'confirmado'), ('confirmado', 'cancelado')]
+        )
+
+    def test_nao_compareceu_e_atendimento(self):
+        passado = self.agendar(timezone.now() - timedelta(hours=2))
+        resposta = self.api.post(f'/api/agendamentos/{passado.pk}/nao-compareceu/')
+        self.assertEqual((resposta.status_code, resposta.data['status']), (200, 'nao_compareceu'))
+
+        hoje = self.agendar(timezone.now(), status='confirmado')
+        resposta = self.api.post(f'/api/agendamentos/{hoje.pk}/iniciar/')
+        self.assertEqual((resposta.status_code, resposta.data['status']), (200, 'em_andamento'))
+        resposta = self.api.post(f'/api/agendamentos/{hoje.pk}/concluir/')
+        self.assertEqual((resposta.status_code, resposta.data['status']), (200, 'concluido'))
+
+
+class LoteTests(AgendamentosApiTestCase):
+
+    def enviar(self, linhas):
+        resposta = self.api.post('/api/agendamentos/lote/', linhas, format='json')
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.data
+
+    def test_chave_de_idempotencia_devolve_o_existente(self):
+        linhas = [self.linha(proxima_segunda(10), chave_idempotencia='pedido-1')]
+        primeira = self.enviar(linhas)
+        self.assertEqual(primeira['criados'], 1)
+
+        segunda = self.enviar(linhas)
+
+        self.assertEqual((segunda['criados'], segunda['existentes']), (0, 1))
+        resultado, = segunda['resultados']
+        self.assertEqual((resultado['status'], resultado['id']), ('existente', primeira['resultados'][0]['id']))
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+    def test_chave_repetida_no_mesmo_lote(self):
+        dados = self.enviar([
+            self.linha(proxima_segunda(10), chave_idempotencia='pedido-1'),
+            self.linha(proxima_segunda(11), chave_idempotencia='pedido-1'),
+        ])
+        self.assertEqual([resultado['status'] for resultado in dados['resultados']], ['criado', 'erro'])
+        self.assertIn('chave_idempotencia', dados['resultados'][1]['erros'])
+
+    def test_conflito_de_horario_dentro_do_lote(self):
+        dados = self.enviar([
+            self.linha(proxima_segunda(10), servico=self.escova.pk),
+            # Inside the 10 minute interval after the first one
+            self.linha(proxima_segunda(11, 5)),
+            self.linha(proxima_segunda(11, 5), funcionario=self.bia.pk),
+        ])
+        self.assertEqual(
+            [resultado['status'] for resultado in dados['resultados']], ['criado', 'erro', 'criado']
+        )
+        self.assertIn('data_hora', dados['resultados'][1]['erros'])
+
+    def test_intervalo_antes_de_agendamento_existente(self):
+        self.agendar(proxima_segunda(11))
+        dados = self.enviar([
+            # 10:00-11:00 plus the 10 minute interval runs into the 11:00 booking
+            self.linha(proxima_segunda(10), servico=self.escova.pk),
+            self.linha(proxima_segunda(9, 45), servico=self.escova.pk),
+        ])
+        self.assertEqual([resultado['status'] for resultado in dados['resultados']], ['erro', 'criado'])
+        self.assertIn('data_hora', dados['resultados'][0]['erros'])
+
+    def test_erros_por_linha(self):
+        ontem = timezone.now() - timedelta(days=1)
+        dados = self.enviar([
+            self.linha(proxima_segunda(10)),
+            self.linha(proxima_segunda(11), cliente=999999),
+            self.linha(ontem),
+            self.linha(proxima_segunda(12), servico='x'),
+            self.linha(proxima_segunda(13), desconto_aplicado='100'),
+        ])
+
+        self.assertEqual((dados['criados'], dados['erros']), (1, 4))
+        erros = [set(resultado['erros']) for resultado in dados['resultados']]
+        self.assertEqual(erros, [set(), {'cliente'}, {'data_hora'}, {'servico'}, {'desconto_aplicado'}])
+        self.assertEqual([resultado['indice'] for resultado in dados['resultados']], [0, 1, 2, 3, 4])
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+
+class ParticionamentoTests(AgendamentosTestCase):
+
+    def particao_de(self, agendamento):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text FROM {particionamento.qn(particionamento.TABELA)} WHERE id = %s',
+                [agendamento.pk]
+            )
+            return cursor.fetchone()[0]
+
+    @skipUnless(connection.vendor != 'postgresql', 'Only without PostgreSQL')
+    def test_comando_exige_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('particionar_agendamentos', stdout=StringIO())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+    def test_move_linhas_da_particao_padrao(self):
+        particionamento.converter_tabela(meses_futuros=0)
+        # Beyond the partition horizon: lands in the default partition
+        distante = self.agendar(proxima_segunda(10, semanas=20))
+        self.assertEqual(self.particao_de(distante), particionamento.PARTICAO_PADRAO)
+
+        saida = StringIO()
+        call_command('particionar_agendamentos', meses=6, stdout=saida)
+
+        dia = timezone.localtime(distante.data_hora)
+        self.assertEqual(self.particao_de(distante), particionamento.nome_particao(dia.year, dia.month))
+        self.assertIn(particionamento.nome_particao(dia.year, dia.month), saida.getvalue())
+        self.assertTrue(Agendamento.objects.filter(pk=distante.pk).exists())
@@ -0,0 +1,34 @@
+"""
+API views for clients.
+"""
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Cliente
+from .timeline import LIMITE_PADRAO, get_timeline
+
+
+class TimelineClienteView(APIView):
+    """
+    Client history (appointments, status changes, contacts, notifications),
+    most recent first, paginated with the `cursor` returned as `next_cursor`.
+    """
+
+    def get(self, request, pk):
+        cliente = get_object_or_404(Cliente, pk=pk)
+        try:
+            limite = int(request.query_params.get('limite', LIMITE_PADRAO))
+        except ValueError:
+            raise ValidationError({'limite': 'Informe um número inteiro.'})
+        try:
+            eventos, proximo = get_timeline(cliente, cursor=request.query_params.get('cursor'), limite=limite)
+        except ValueError as erro:
+            raise ValidationError({'cursor': str(erro)})
+
+        return Response({
+            'next_cursor': proximo,
+            'next': request.build_absolute_uri(f'?cursor={proximo}&limite={limite}') if proximo else None,
+            'results': eventos,
+        })
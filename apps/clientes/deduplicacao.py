@@ -0,0 +1,174 @@
+"""
+Duplicate client detection and merge.
+
+Clients are grouped by blocking keys (document digits, national phone
+digits and a phonetic key of the name); only clients sharing a block are
+compared, so the job scales with the block sizes instead of n². Candidate
+pairs are scored and the front desk picks which ones to merge.
+"""
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.contadores import contar_atualizados
+from .models import Cliente
+from .normalizacao import chave_documento, chave_fonetica_nome, chave_telefone, normalizar_nome
+
+# Blocks larger than this (e.g. a shared company phone) are ignored
+TAMANHO_MAXIMO_BLOCO = 50
+
+LIMIAR_PADRAO = 0.6
+
+# Fields filled in the main client from the duplicates when blank
+CAMPOS_COMPLEMENTARES = [
+    'email', 'whatsapp', 'telefone_secundario', 'cpf', 'rg', 'data_nascimento',
+    'sexo', 'cnpj', 'endereco', 'numero', 'complemento', 'bairro', 'cidade',
+    'estado', 'cep',
+]
+
+
+def _chaves_bloqueio(cliente):
+    documento = chave_documento(cliente['cpf'], cliente['cnpj'])
+    if documento:
+        yield f'doc:{documento}'
+    for telefone in {chave_telefone(cliente['telefone']), chave_telefone(cliente['whatsapp'])}:
+        if telefone:
+            yield f'tel:{telefone}'
+    nome = chave_fonetica_nome(cliente['nome'])
+    if nome:
+        yield f'nome:{nome}'
+
+
+def pontuar(cliente_a, cliente_b):
+    """Score in [0, 1] of two clients being the same person"""
+    pontos = 0.0
+    documento_a = chave_documento(cliente_a['cpf'], cliente_a['cnpj'])
+    documento_b = chave_documento(cliente_b['cpf'], cliente_b['cnpj'])
+    if documento_a and documento_b:
+        if documento_a != documento_b:
+            # Different documents: different people
+            return 0.0
+        pontos += 0.6
+
+    telefones_a = {chave_telefone(cliente_a['telefone']), chave_telefone(cliente_a['whatsapp'])} - {''}
+    telefones_b = {chave_telefone(cliente_b['telefone']), chave_telefone(cliente_b['whatsapp'])} - {''}
+    if telefones_a & telefones_b:
+        pontos += 0.3
+
+    email_a = (cliente_a['email'] or '').strip().lower()
+    if email_a and email_a == (cliente_b['email'] or '').strip().lower():
+        pontos += 0.2
+
+    pontos += 0.4 * SequenceMatcher(
+        None, normalizar_nome(cliente_a['nome']), normalizar_nome(cliente_b['nome'])
+    ).ratio()
+    return min(pontos, 1.0)
+
+
+def encontrar_duplicados(limiar=LIMIAR_PADRAO, queryset=None):
+    """
+    Return the candidate duplicate pairs as (score, id_a, id_b), best first.
+    Only active clients are considered by default.
+    """
+    queryset = queryset if queryset is not None else Cliente.objects.filter(is_active=True)
+    clientes = {
+        cliente['id']: cliente
+        for cliente in queryset.values('id', 'nome', 'cpf', 'cnpj', 'telefone', 'whatsapp', 'email').iterator()
+    }
+
+    blocos = defaultdict(list)
+    for cliente in clientes.values():
+        for chave in _chaves_bloqueio(cliente):
+            blocos[chave].append(cliente['id'])
+
+    pares = set()
+    for ids in blocos.values():
+        if 1 < len(ids) <= TAMANHO_MAXIMO_BLOCO:
+            pares.update(combinations(sorted(ids), 2))
+
+    candidatos = []
+    for id_a, id_b in pares:
+        pontos = pontuar(clientes[id_a], clientes[id_b])
+        if pontos >= limiar:
+            candidatos.append((round(pontos, 3), id_a, id_b))
+    candidatos.sort(key=lambda candidato: (-candidato[0], candidato[1], candidato[2]))
+    return candidatos
+
+
+def mesclar_clientes(principal, duplicados, usuario=None):
+    """
+    Merge `duplicados` into `principal`: every row referencing a duplicate
+    (appointments, notifications, contacts, packages...) is repointed with
+    one UPDATE per table, blank fields of the main client are completed from
+    the locked rows (the latest service date is kept) and the duplicates
+    are soft deleted. Returns {model label: rows moved}.
+    """
+    from apps.agendamentos.models import Agendamento
+    from apps.agendamentos.signals import agendamentos_alterados_em_lote
+
+    ids = [duplicado.pk for duplicado in duplicados if duplicado.pk != principal.pk]
+    if not ids:
+        return {}
+
+    movidos = {}
+    with transaction.atomic():
+        # Work on the locked rows: the instances passed in may be stale
+        bloqueados = {
+            cliente.pk: cliente
+            for cliente in Cliente.objects.select_for_update().filter(pk__in=[principal.pk, *ids]).order_by('pk')
+        }
+        atual = bloqueados[principal.pk]
+        agendamento_ids = list(Agendamento.objects.filter(cliente_id__in=ids).values_list('pk', flat=True))
+
+        for relacao in Cliente._meta.related_objects:
+            if not relacao.one_to_many:
+                continue
+            total = relacao.related_model._base_manager.filter(
+                **{f'{relacao.field.name}__in': ids}
+            ).update(**{relacao.field.name: principal})
+            if total:
+                movidos[relacao.related_model._meta.label] = total
+
+        alterados = set()
+        mesclados = sorted(
+            (bloqueados[pk] for pk in ids if pk in bloqueados), key=lambda cliente: cliente.created_at
+        )
+        for duplicado in mesclados:
+            for campo in CAMPOS_COMPLEMENTARES:
+                if not getattr(atual, campo) and getattr(duplicado, campo):
+                    setattr(atual, campo, getattr(duplicado, campo))
+                    alterados.add(campo)
+        ultimo_atendimento = max(
+            (cliente.data_ultimo_atendimento for cliente in [atual, *mesclados] if cliente.data_ultimo_atendimento),
+            default=None
+        )
+        if ultimo_atendimento != atual.data_ultimo_atendimento:
+            atual.data_ultimo_atendimento = ultimo_atendimento
+            alterados.add('data_ultimo_atendimento')
+        if alterados:
+            atual.save(update_fields=[*alterados, 'updated_at'])
+            for campo in [*alterados, 'updated_at']:
+                setattr(principal, campo, getattr(atual, campo))
+
+        contar_atualizados(Cliente.objects.filter(pk__in=ids), is_active=False, status='inativo')
+        Cliente.objects.filter(pk__in=ids).update(
+            is_active=False,
+            deleted_at=timezone.now(),
+            status='inativo',
+            updated_at=timezone.now(),
+        )
+        principal.historico_contatos.create(
+            tipo_contato='presencial',
+            assunto='Mesclagem de cadastros',
+            descricao=f"Cadastros mesclados neste cliente: {', '.join(f'#{pk}' for pk in ids)}",
+            data_contato=timezone.now(),
+            usuario_responsavel=usuario,
+        )
+        if agendamento_ids:
+            transaction.on_commit(lambda: agendamentos_alterados_em_lote.send(
+                sender=Agendamento, ids=agendamento_ids, status=None
+            ))
+    return movidos
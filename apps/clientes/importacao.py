@@ -0,0 +1,280 @@
+"""
+Bulk client import from CSV or XLSX files.
+
+The file is streamed in batches: each batch is normalized and validated
+column by column with precompiled patterns, deduplicated against the
+existing clients (and the previous rows of the file) by document and phone
+with set lookups, and inserted with bulk_create. Rows that are not imported
+end up in the error report with their line number.
+"""
+import csv
+import os
+import unicodedata
+from collections import defaultdict
+from datetime import date, datetime
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.contadores import contar_inseridos
+from .models import Cliente
+from .normalizacao import (
+    PADRAO_CEP,
+    PADRAO_CNPJ,
+    PADRAO_CPF,
+    PADRAO_EMAIL,
+    PADRAO_TELEFONE,
+    UFS,
+    chave_documento,
+    chave_telefone,
+    formatar_cep,
+    formatar_cnpj,
+    formatar_cpf,
+    formatar_telefone,
+)
+
+# Client fields accepted as columns (matched by field name or verbose name)
+CAMPOS_IMPORTAVEIS = [
+    'nome', 'nome_fantasia', 'tipo_cliente', 'email', 'telefone', 'whatsapp',
+    'telefone_secundario', 'cpf', 'rg', 'data_nascimento', 'sexo', 'cnpj',
+    'inscricao_estadual', 'inscricao_municipal', 'endereco', 'numero',
+    'complemento', 'bairro', 'cidade', 'estado', 'cep', 'observacoes',
+    'preferencias', 'como_conheceu',
+]
+
+CAMPOS_OBRIGATORIOS = ['nome', 'telefone']
+
+# Normalization and format check of the fields with a fixed format
+FORMATOS = {
+    'telefone': (formatar_telefone, PADRAO_TELEFONE, 'Telefone inválido'),
+    'whatsapp': (formatar_telefone, PADRAO_TELEFONE, 'WhatsApp inválido'),
+    'telefone_secundario': (formatar_telefone, PADRAO_TELEFONE, 'Telefone secundário inválido'),
+    'cpf': (formatar_cpf, PADRAO_CPF, 'CPF inválido'),
+    'cnpj': (formatar_cnpj, PADRAO_CNPJ, 'CNPJ inválido'),
+    'cep': (formatar_cep, PADRAO_CEP, 'CEP inválido'),
+    'email': (lambda valor: valor.lower(), PADRAO_EMAIL, 'Email inválido'),
+}
+
+FORMATOS_DATA = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y']
+
+# Digits of the documents read from numeric spreadsheet cells, which lose
+# their leading zeros
+DIGITOS_NUMERICOS = {'cpf': 11, 'cnpj': 14, 'cep': 8}
+
+# Fields limited to the model choices (matched by value or label)
+CAMPOS_ESCOLHA = ['tipo_cliente', 'sexo']
+
+TAMANHO_LOTE = 1000
+
+
+def _normalizar_cabecalho(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return texto.strip().lower().replace(' ', '_').replace('/', '_')
+
+
+def mapear_colunas(cabecalho):
+    """Return {column index: field name} for the recognized header columns"""
+    nomes = {}
+    for campo in CAMPOS_IMPORTAVEIS:
+        field = Cliente._meta.get_field(campo)
+        nomes[_normalizar_cabecalho(campo)] = campo
+        nomes[_normalizar_cabecalho(field.verbose_name)] = campo
+    return {
+        indice: nomes[_normalizar_cabecalho(coluna)]
+        for indice, coluna in enumerate(cabecalho)
+        if _normalizar_cabecalho(coluna) in nomes
+    }
+
+
+def _ler_csv(caminho):
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+        except csv.Error:
+            dialeto = csv.excel
+        yield from csv.reader(arquivo, dialeto)
+
+
+def _ler_xlsx(caminho):
+    from openpyxl import load_workbook
+
+    planilha = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        yield from planilha.active.iter_rows(values_only=True)
+    finally:
+        planilha.close()
+
+
+def ler_linhas(caminho):
+    """
+    Stream the rows of a CSV or XLSX file as (line number, {field: value}),
+    skipping blank rows.
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+    linhas = _ler_xlsx(caminho) if extensao in ('.xlsx', '.xlsm') else _ler_csv(caminho)
+
+    colunas = mapear_colunas(next(linhas, []))
+    for numero, linha in enumerate(linhas, start=2):
+        dados = {
+            campo: linha[indice]
+            for indice, campo in colunas.items()
+            if indice < len(linha) and linha[indice] not in (None, '')
+        }
+        if dados:
+            yield numero, dados
+
+
+def _texto_celula(valor, digitos=0):
+    """
+    Text of a cell value. Numbers from XLSX cells (12345678901.0) lose the
+    decimal part and are zero-padded to `digitos`.
+    """
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return str(valor).zfill(digitos)
+    return str(valor).strip()
+
+
+def _opcoes(campo):
+    """Return {normalized value or label: value} for a choice field of Cliente"""
+    opcoes = {}
+    for valor, rotulo in Cliente._meta.get_field(campo).choices:
+        opcoes[_normalizar_cabecalho(valor)] = valor
+        opcoes[_normalizar_cabecalho(rotulo)] = valor
+    return opcoes
+
+
+def _converter_data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(str(valor).strip(), formato).date()
+        except ValueError:
+            continue
+    raise ValueError(valor)
+
+
+def validar_lote(linhas):
+    """
+    Normalize and validate a batch of rows, one field at a time over the
+    whole batch. Returns (valid rows, {line number: [messages]}).
+    """
+    erros = defaultdict(list)
+
+    for campo in CAMPOS_IMPORTAVEIS:
+        coluna = [(numero, dados) for numero, dados in linhas if campo in dados]
+        if not coluna:
+            continue
+
+        if campo in FORMATOS:
+            formatar, padrao, mensagem = FORMATOS[campo]
+            digitos = DIGITOS_NUMERICOS.get(campo, 0)
+            for numero, dados in coluna:
+                dados[campo] = formatar(_texto_celula(dados[campo], digitos))
+                if not padrao.match(dados[campo]):
+                    erros[numero].append(f'{mensagem}: {dados[campo]}')
+        elif campo == 'data_nascimento':
+            for numero, dados in coluna:
+                try:
+                    dados[campo] = _converter_data(dados[campo])
+                except ValueError:
+                    erros[numero].append(f'Data de nascimento inválida: {dados[campo]}')
+        elif campo in CAMPOS_ESCOLHA:
+            opcoes = _opcoes(campo)
+            for numero, dados in coluna:
+                valor = opcoes.get(_normalizar_cabecalho(_texto_celula(dados[campo])))
+                if valor is None:
+                    erros[numero].append(f'{campo} inválido: {dados[campo]}')
+                else:
+                    dados[campo] = valor
+        elif campo == 'estado':
+            for numero, dados in coluna:
+                dados[campo] = _texto_celula(dados[campo]).upper()
+                if dados[campo] not in UFS:
+                    erros[numero].append(f'Estado inválido: {dados[campo]}')
+        else:
+            max_length = Cliente._meta.get_field(campo).max_length
+            for numero, dados in coluna:
+                dados[campo] = _texto_celula(dados[campo])
+                if max_length and len(dados[campo]) > max_length:
+                    erros[numero].append(f'{campo} excede {max_length} caracteres')
+
+    for numero, dados in linhas:
+        for campo in CAMPOS_OBRIGATORIOS:
+            if not dados.get(campo):
+                erros[numero].append(f'Campo obrigatório ausente: {campo}')
+        if 'tipo_cliente' not in dados:
+            dados['tipo_cliente'] = 'pessoa_juridica' if dados.get('cnpj') else 'pessoa_fisica'
+
+    return [(numero, dados) for numero, dados in linhas if numero not in erros], erros
+
+
+def carregar_chaves_existentes():
+    """Return the sets of document and phone keys of the existing clients"""
+    documentos = set()
+    telefones = set()
+    for cpf, cnpj, telefone, whatsapp in Cliente.objects.values_list('cpf', 'cnpj', 'telefone', 'whatsapp').iterator():
+        documento = chave_documento(cpf, cnpj)
+        if documento:
+            documentos.add(documento)
+        telefones.update(chave for chave in (chave_telefone(telefone), chave_telefone(whatsapp)) if chave)
+    return documentos, telefones
+
+
+def importar_clientes(caminho, lote=TAMANHO_LOTE, dry_run=False):
+    """
+    Import the clients of a CSV/XLSX file.
+
+    Returns a report dict:
+        'importados': number of created clients
+        'duplicados': number of rows matching an existing client
+        'erros': list of (line number, message), duplicates included
+    """
+    relatorio = {'importados': 0, 'duplicados': 0, 'erros': []}
+    documentos, telefones = carregar_chaves_existentes()
+    linhas = ler_linhas(caminho)
+
+    while True:
+        bloco = list(islice(linhas, lote))
+        if not bloco:
+            break
+
+        validos, erros = validar_lote(bloco)
+        for numero in sorted(erros):
+            relatorio['erros'].extend((numero, mensagem) for mensagem in erros[numero])
+
+        novos = []
+        agora = timezone.now()
+        for numero, dados in validos:
+            documento = chave_documento(dados.get('cpf'), dados.get('cnpj'))
+            telefone = chave_telefone(dados['telefone'])
+            if documento and documento in documentos:
+                relatorio['erros'].append((numero, f'Cliente já cadastrado com o documento {documento}'))
+                relatorio['duplicados'] += 1
+                continue
+            if telefone in telefones:
+                relatorio['erros'].append((numero, f'Cliente já cadastrado com o telefone {telefone}'))
+                relatorio['duplicados'] += 1
+                continue
+
+            if documento:
+                documentos.add(documento)
+            telefones.add(telefone)
+            # bulk_create skips Cliente.save()
+            novos.append(Cliente(data_primeiro_atendimento=agora, **dados))
+
+        if novos and not dry_run:
+            with transaction.atomic():
+                Cliente.objects.bulk_create(novos, batch_size=lote)
+                contar_inseridos(Cliente, novos)
+        relatorio['importados'] += len(novos)
+
+    relatorio['erros'].sort(key=lambda erro: erro[0])
+    return relatorio
@@ -0,0 +1,48 @@
+"""
+Lists probable duplicate clients and merges the ones chosen by the user.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clientes.deduplicacao import LIMIAR_PADRAO, encontrar_duplicados, mesclar_clientes
+from apps.clientes.models import Cliente
+
+
+class Command(BaseCommand):
+    help = 'Lista clientes possivelmente duplicados ou mescla cadastros'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limiar', type=float, default=LIMIAR_PADRAO, help='Pontuação mínima (0 a 1)')
+        parser.add_argument(
+            '--mesclar',
+            nargs='+',
+            type=int,
+            metavar='ID',
+            help='ID do cliente principal seguido dos IDs dos duplicados a mesclar nele'
+        )
+
+    def handle(self, *args, **options):
+        if options['mesclar']:
+            self.mesclar(*options['mesclar'])
+            return
+
+        nomes = {}
+        candidatos = encontrar_duplicados(limiar=options['limiar'])
+        if candidatos:
+            ids = {pk for _, id_a, id_b in candidatos for pk in (id_a, id_b)}
+            nomes = dict(Cliente.objects.filter(pk__in=ids).values_list('pk', 'nome'))
+        for pontos, id_a, id_b in candidatos:
+            self.stdout.write(f'{pontos:.2f}  #{id_a} {nomes[id_a]}  <->  #{id_b} {nomes[id_b]}')
+        self.stdout.write(self.style.SUCCESS(f'{len(candidatos)} par(es) candidato(s).'))
+
+    def mesclar(self, principal_id, *duplicado_ids):
+        if not duplicado_ids:
+            raise CommandError('Informe ao menos um cliente duplicado.')
+        clientes = Cliente.objects.in_bulk([principal_id, *duplicado_ids])
+        faltando = {principal_id, *duplicado_ids} - set(clientes)
+        if faltando:
+            raise CommandError(f"Cliente(s) não encontrado(s): {', '.join(map(str, sorted(faltando)))}")
+
+        movidos = mesclar_clientes(clientes[principal_id], [clientes[pk] for pk in duplicado_ids])
+        for modelo, total in movidos.items():
+            self.stdout.write(f'{modelo}: {total} registro(s) transferido(s)')
+        self.stdout.write(self.style.SUCCESS(f'{len(duplicado_ids)} cadastro(s) mesclado(s) em #{principal_id}.'))
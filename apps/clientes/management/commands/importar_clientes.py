@@ -0,0 +1,39 @@
+"""
+Imports clients from a CSV or XLSX file (new unit onboarding).
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clientes.importacao import TAMANHO_LOTE, importar_clientes
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes de um arquivo CSV ou XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo CSV ou XLSX (primeira linha com os cabeçalhos)')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas processadas por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Valida o arquivo sem gravar clientes')
+        parser.add_argument('--relatorio', help='Caminho do CSV com as linhas não importadas')
+
+    def handle(self, *args, **options):
+        try:
+            relatorio = importar_clientes(options['arquivo'], lote=options['lote'], dry_run=options['dry_run'])
+        except OSError as erro:
+            raise CommandError(f'Não foi possível ler o arquivo: {erro}')
+
+        if options['relatorio']:
+            with open(options['relatorio'], 'w', newline='', encoding='utf-8') as arquivo:
+                escritor = csv.writer(arquivo)
+                escritor.writerow(['linha', 'erro'])
+                escritor.writerows(relatorio['erros'])
+        else:
+            for numero, mensagem in relatorio['erros']:
+                self.stdout.write(self.style.WARNING(f'Linha {numero}: {mensagem}'))
+
+        acao = 'válido(s)' if options['dry_run'] else 'importado(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['importados']} cliente(s) {acao}, {relatorio['duplicados']} duplicado(s), "
+            f"{len({numero for numero, _ in relatorio['erros']})} linha(s) com erro."
+        ))
@@ -0,0 +1,270 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agendamentos", "0007_recorrencia_agendamento"),
+        ("servicos", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("clientes", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClientePacote",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="Ativo")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Excluído em"
+                    ),
+                ),
+                (
+                    "data_compra",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Data da Compra"
+                    ),
+                ),
+                (
+                    "data_validade",
+                    models.DateField(blank=True, verbose_name="Válido Até"),
+                ),
+                (
+                    "valor_pago",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=10,
+                        verbose_name="Valor Pago",
+                    ),
+                ),
+                (
+                    "cliente",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="pacotes_comprados",
+                        to="clientes.cliente",
+                        verbose_name="Cliente",
+                    ),
+                ),
+                (
+                    "pacote",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="vendas",
+                        to="servicos.pacoteservico",
+                        verbose_name="Pacote",
+                    ),
+                ),
+                (
+                    "usuario_vendeu",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="pacotes_vendidos",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário que Vendeu",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pacote do Cliente",
+                "verbose_name_plural": "Pacotes dos Clientes",
+                "ordering": ["-data_compra"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SaldoPacote",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="Ativo")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Excluído em"
+                    ),
+                ),
+                ("data_validade", models.DateField(verbose_name="Válido Até")),
+                (
+                    "quantidade_total",
+                    models.PositiveIntegerField(verbose_name="Quantidade Comprada"),
+                ),
+                (
+                    "quantidade_reservada",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Sessões agendadas ainda não realizadas",
+                        verbose_name="Quantidade Reservada",
+                    ),
+                ),
+                (
+                    "quantidade_consumida",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Quantidade Consumida"
+                    ),
+                ),
+                (
+                    "cliente",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="saldos_pacote",
+                        to="clientes.cliente",
+                        verbose_name="Cliente",
+                    ),
+                ),
+                (
+                    "cliente_pacote",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="saldos",
+                        to="clientes.clientepacote",
+                        verbose_name="Pacote do Cliente",
+                    ),
+                ),
+                (
+                    "servico",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="saldos_pacote",
+                        to="servicos.servico",
+                        verbose_name="Serviço",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Saldo de Pacote",
+                "verbose_name_plural": "Saldos de Pacote",
+                "ordering": ["data_validade"],
+            },
+        ),
+        migrations.CreateModel(
+            name="MovimentoPacote",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="Ativo")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Excluído em"
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("compra", "Compra"),
+                            ("reserva", "Reserva"),
+                            ("consumo", "Consumo"),
+                            ("liberacao", "Liberação"),
+                        ],
+                        max_length=20,
+                        verbose_name="Tipo de Movimento",
+                    ),
+                ),
+                (
+                    "quantidade",
+                    models.PositiveIntegerField(default=1, verbose_name="Quantidade"),
+                ),
+                (
+                    "agendamento",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="movimentos_pacote",
+                        to="agendamentos.agendamento",
+                        verbose_name="Agendamento",
+                    ),
+                ),
+                (
+                    "saldo",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="movimentos",
+                        to="clientes.saldopacote",
+                        verbose_name="Saldo",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Movimento de Pacote",
+                "verbose_name_plural": "Movimentos de Pacote",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="saldopacote",
+            index=models.Index(
+                fields=["cliente", "servico", "data_validade"],
+                name="saldo_cli_serv_validade_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="saldopacote",
+            unique_together={("cliente_pacote", "servico")},
+        ),
+        migrations.AddIndex(
+            model_name="movimentopacote",
+            index=models.Index(
+                fields=["agendamento", "tipo"], name="clientes_mo_agendam_f3909b_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+from apps.core.migracoes import AddIndexConcurrentlyNoPostgres
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("clientes", "0003_pacotes_cliente"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyNoPostgres(
+            model_name="historicocontato",
+            index=models.Index(
+                fields=["cliente", "data_contato"],
+                name="historico_contato_cli_data_idx",
+            ),
+        ),
+    ]
@@ -1,8 +1,14 @@
 """
 Client models for JT Sistemas.
 """
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from apps.core.models import BaseModel
 
 
@@ -326,38 +332,61 @@ class Cliente(BaseModel):
         return self.status == 'vip'
 
     def get_total_agendamentos(self):
-        """Get total number of appointments"""
+        """Get total number of appointments (including archived ones)"""
         from apps.agendamentos.models import Agendamento
         return Agendamento.objects.filter(
             cliente=self,
             is_active=True
-        ).count()
+        ).count() + self.agendamentos_arquivados.filter(is_active=True).count()
 
     def get_agendamentos_concluidos(self):
-        """Get total number of completed appointments"""
+        """Get total number of completed appointments (including archived ones)"""
         from apps.agendamentos.models import Agendamento
         return Agendamento.objects.filter(
             cliente=self,
             status='concluido',
             is_active=True
-        ).count()
+        ).count() + self.agendamentos_arquivados.filter(status='concluido', is_active=True).count()
 
     def get_agendamentos_cancelados(self):
-        """Get total number of cancelled appointments"""
+        """Get total number of cancelled appointments (including archived ones)"""
         from apps.agendamentos.models import Agendamento
         return Agendamento.objects.filter(
             cliente=self,
             status='cancelado',
             is_active=True
-        ).count()
+        ).count() + self.agendamentos_arquivados.filter(status='cancelado', is_active=True).count()
 
     def get_ultimo_agendamento(self):
-        """Get the last appointment"""
+        """Get the last appointment (falls back to the archive)"""
         from apps.agendamentos.models import Agendamento
-        return Agendamento.objects.filter(
+        ultimo = Agendamento.objects.filter(
             cliente=self,
             is_active=True
         ).order_by('-data_hora').first()
+        if ultimo is None:
+            arquivado = self.agendamentos_arquivados.filter(is_active=True).order_by('-data_hora').first()
+            if arquivado:
+                ultimo = arquivado.como_agendamento()
+        return ultimo
+
+    def get_historico_agendamentos(self, incluir_arquivados=True):
+        """
+        Get the full appointment history, newest first.
+        Archived appointments are returned as read-only Agendamento
+        instances with `arquivado = True`.
+        """
+        from apps.agendamentos.models import Agendamento
+        historico = list(Agendamento.objects.filter(
+            cliente=self,
+            is_active=True
+        ).select_related('funcionario', 'servico').order_by('-data_hora'))
+        if incluir_arquivados:
+            historico.extend(
+                arquivado.como_agendamento()
+                for arquivado in self.agendamentos_arquivados.filter(is_active=True).order_by('-data_hora')
+            )
+        return historico
 
     def get_proximo_agendamento(self):
         """Get the next appointment"""
@@ -380,15 +409,29 @@ class Cliente(BaseModel):
         from django.db.models import Count
         from apps.agendamentos.models import Agendamento
         
-        return Agendamento.objects.filter(
-            cliente=self,
-            status='concluido',
-            is_active=True
-        ).values(
-            'servico__nome'
-        ).annotate(
-            total=Count('servico')
-        ).order_by('-total')[:limit]
+        totais = Counter()
+        for queryset in (
+            Agendamento.objects.filter(cliente=self),
+            self.agendamentos_arquivados.all(),
+        ):
+            for item in queryset.filter(
+                status='concluido',
+                is_active=True
+            ).values(
+                'servico__nome'
+            ).annotate(
+                total=Count('servico')
+            ):
+                totais[item['servico__nome']] += item['total']
+        
+        return [
+            {'servico__nome': nome, 'total': total}
+            for nome, total in totais.most_common(limit)
+        ]
+
+    def get_saldo_pacote(self, servico):
+        """Get how many package sessions of a service the client can still book"""
+        return SaldoPacote.objects.disponivel(self, servico)
 
 
 class HistoricoContato(BaseModel):
@@ -441,6 +484,343 @@ class HistoricoContato(BaseModel):
         verbose_name = 'Histórico de Contato'
         verbose_name_plural = 'Históricos de Contato'
         ordering = ['-data_contato']
+        indexes = [
+            # Client timeline
+            models.Index(fields=['cliente', 'data_contato'], name='historico_contato_cli_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente.nome} - {self.assunto} ({self.data_contato})"
+
+
+class ClientePacote(BaseModel):
+    """
+    Model for packages bought by clients.
+    The purchase opens one SaldoPacote per service included in the package.
+    """
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.PROTECT,
+        related_name='pacotes_comprados',
+        verbose_name='Cliente'
+    )
+    pacote = models.ForeignKey(
+        'servicos.PacoteServico',
+        on_delete=models.PROTECT,
+        related_name='vendas',
+        verbose_name='Pacote'
+    )
+    data_compra = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Data da Compra'
+    )
+    data_validade = models.DateField(
+        blank=True,
+        verbose_name='Válido Até'
+    )
+    valor_pago = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        verbose_name='Valor Pago'
+    )
+    usuario_vendeu = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pacotes_vendidos',
+        verbose_name='Usuário que Vendeu'
+    )
+
+    class Meta:
+        verbose_name = 'Pacote do Cliente'
+        verbose_name_plural = 'Pacotes dos Clientes'
+        ordering = ['-data_compra']
+
+    def __str__(self):
+        return f"{self.cliente.nome} - {self.pacote.nome} (até {self.data_validade:%d/%m/%Y})"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not self.data_validade:
+            self.data_validade = (
+                timezone.localtime(self.data_compra).date() + timedelta(days=self.pacote.validade_dias)
+            )
+        if self.valor_pago is None:
+            self.valor_pago = self.pacote.preco_total
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self.abrir_saldos()
+
+    def abrir_saldos(self):
+        """Create the balance of every service in the package and the purchase movements"""
+        saldos = SaldoPacote.objects.bulk_create([
+            SaldoPacote(
+                cliente_id=self.cliente_id,
+                cliente_pacote=self,
+                servico_id=item.servico_id,
+                data_validade=self.data_validade,
+                quantidade_total=item.quantidade,
+            )
+            for item in self.pacote.itens_pacote.all()
+        ])
+        MovimentoPacote.objects.bulk_create([
+            MovimentoPacote(saldo=saldo, tipo='compra', quantidade=saldo.quantidade_total)
+            for saldo in saldos
+        ])
+        return saldos
+
+    @property
+    def is_valido(self):
+        """Check if the package can still be used"""
+        return self.is_active and self.data_validade >= timezone.localdate()
+
+
+class SaldoPacoteQuerySet(models.QuerySet):
+    """QuerySet for package balances"""
+
+    def validos(self):
+        """Balances of active packages that have not expired"""
+        return self.filter(is_active=True, data_validade__gte=timezone.localdate())
+
+    def disponivel(self, cliente, servico, pacote=None):
+        """Number of sessions of a service the client can still book (indexed lookup)"""
+        saldos = self.validos().filter(cliente=cliente, servico=servico)
+        if pacote is not None:
+            saldos = saldos.filter(cliente_pacote__pacote=pacote)
+        total = saldos.aggregate(
+            disponivel=models.Sum(
+                F('quantidade_total') - F('quantidade_reservada') - F('quantidade_consumida')
+            )
+        )['disponivel']
+        return total or 0
+
+
+class SaldoPacote(BaseModel):
+    """
+    Materialized remaining balance of a service within a bought package.
+    Kept up to date by the MovimentoPacote ledger operations.
+    """
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.PROTECT,
+        related_name='saldos_pacote',
+        verbose_name='Cliente'
+    )
+    cliente_pacote = models.ForeignKey(
+        ClientePacote,
+        on_delete=models.CASCADE,
+        related_name='saldos',
+        verbose_name='Pacote do Cliente'
+    )
+    servico = models.ForeignKey(
+        'servicos.Servico',
+        on_delete=models.PROTECT,
+        related_name='saldos_pacote',
+        verbose_name='Serviço'
+    )
+    data_validade = models.DateField(
+        verbose_name='Válido Até'
+    )
+    quantidade_total = models.PositiveIntegerField(
+        verbose_name='Quantidade Comprada'
+    )
+    quantidade_reservada = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Quantidade Reservada',
+        help_text='Sessões agendadas ainda não realizadas'
+    )
+    quantidade_consumida = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Quantidade Consumida'
+    )
+
+    objects = SaldoPacoteQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Saldo de Pacote'
+        verbose_name_plural = 'Saldos de Pacote'
+        ordering = ['data_validade']
+        unique_together = ['cliente_pacote', 'servico']
+        indexes = [
+            # Balance check at booking time
+            models.Index(fields=['cliente', 'servico', 'data_validade'], name='saldo_cli_serv_validade_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente_pacote} - {self.servico.nome}: {self.quantidade_disponivel}/{self.quantidade_total}"
+
+    @property
+    def quantidade_disponivel(self):
+        """Sessions that can still be booked"""
+        return self.quantidade_total - self.quantidade_reservada - self.quantidade_consumida
+
+
+class MovimentoPacote(BaseModel):
+    """
+    Ledger of package balance movements.
+    Reservations are made when a package appointment is booked and later
+    consumed (appointment completed) or released (cancelled, no-show or
+    rescheduled).
+    """
+    TIPO_CHOICES = [
+        ('compra', 'Compra'),
+        ('reserva', 'Reserva'),
+        ('consumo', 'Consumo'),
+        ('liberacao', 'Liberação'),
+    ]
+
+    saldo = models.ForeignKey(
+        SaldoPacote,
+        on_delete=models.CASCADE,
+        related_name='movimentos',
+        verbose_name='Saldo'
+    )
+    agendamento = models.ForeignKey(
+        'agendamentos.Agendamento',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        # Agendamento may be partitioned, see apps.agendamentos.particionamento
+        db_constraint=False,
+        related_name='movimentos_pacote',
+        verbose_name='Agendamento'
+    )
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPO_CHOICES,
+        verbose_name='Tipo de Movimento'
+    )
+    quantidade = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Quantidade'
+    )
+
+    class Meta:
+        verbose_name = 'Movimento de Pacote'
+        verbose_name_plural = 'Movimentos de Pacote'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['agendamento', 'tipo']),
+        ]
 
     def __str__(self):
-        return f"{self.cliente.nome} - {self.assunto} ({self.data_contato})"
\ No newline at end of file
+        return f"{self.get_tipo_display()} ({self.quantidade}) - {self.saldo}"
+
+    @classmethod
+    def saldos_disponiveis(cls, chaves):
+        """
+        Lock the valid balances of the given (cliente_id, servico_id, pacote_id)
+        keys and return a Counter of the sessions still available per key.
+        Must run inside the transaction that books them.
+        """
+        disponiveis = Counter()
+        if not chaves:
+            return disponiveis
+
+        filtro = Q()
+        for cliente_id, servico_id, pacote_id in chaves:
+            filtro |= Q(cliente_id=cliente_id, servico_id=servico_id, cliente_pacote__pacote_id=pacote_id)
+        for saldo in SaldoPacote.objects.validos().select_for_update(of=('self',)).filter(filtro).select_related(
+            'cliente_pacote'
+        ).order_by('pk'):
+            chave = (saldo.cliente_id, saldo.servico_id, saldo.cliente_pacote.pacote_id)
+            disponiveis[chave] += max(saldo.quantidade_disponivel, 0)
+        return disponiveis
+
+    @classmethod
+    def reservar(cls, agendamentos):
+        """
+        Reserve one session for each package appointment, from the client's
+        valid balance that expires first. Raises ValidationError when an
+        appointment cannot be covered by any balance; the caller's
+        transaction must then be rolled back with the bookings.
+        """
+        pendentes = defaultdict(list)
+        for agendamento in agendamentos:
+            if agendamento.pacote_id:
+                pendentes[(agendamento.cliente_id, agendamento.servico_id, agendamento.pacote_id)].append(agendamento)
+        if not pendentes:
+            return []
+
+        sem_saldo = []
+        movimentos = []
+        with transaction.atomic():
+            for (cliente_id, servico_id, pacote_id), grupo in pendentes.items():
+                saldos = SaldoPacote.objects.validos().select_for_update().filter(
+                    cliente_id=cliente_id,
+                    servico_id=servico_id,
+                    cliente_pacote__pacote_id=pacote_id
+                ).order_by('data_validade', 'pk')
+
+                fila = iter(grupo)
+                for saldo in saldos:
+                    if saldo.quantidade_disponivel <= 0:
+                        continue
+                    quantidade = 0
+                    for agendamento in fila:
+                        movimentos.append(cls(saldo=saldo, agendamento_id=agendamento.pk, tipo='reserva'))
+                        quantidade += 1
+                        if quantidade == saldo.quantidade_disponivel:
+                            break
+                    if quantidade:
+                        SaldoPacote.objects.filter(pk=saldo.pk).update(
+                            quantidade_reservada=F('quantidade_reservada') + quantidade,
+                            updated_at=timezone.now()
+                        )
+                sem_saldo.extend(fila)
+
+            if sem_saldo:
+                raise ValidationError({
+                    'pacote': f'Saldo insuficiente no pacote para {len(sem_saldo)} agendamento(s).'
+                })
+            cls.objects.bulk_create(movimentos)
+
+    @classmethod
+    def consumir(cls, agendamento_ids):
+        """Turn the reservations of completed appointments into consumption"""
+        return cls._baixar_reservas(agendamento_ids, 'consumo', 'quantidade_consumida')
+
+    @classmethod
+    def liberar(cls, agendamento_ids):
+        """Give back the reservations of cancelled, missed or rescheduled appointments"""
+        return cls._baixar_reservas(agendamento_ids, 'liberacao')
+
+    @classmethod
+    def _baixar_reservas(cls, agendamento_ids, tipo, campo_destino=None):
+        """Close the open reservations of the given appointments with a `tipo` movement"""
+        if not agendamento_ids:
+            return 0
+
+        with transaction.atomic():
+            abertas = {}
+            for agendamento_id, saldo_id, tipo_movimento in cls.objects.filter(
+                agendamento_id__in=list(agendamento_ids),
+                tipo__in=['reserva', 'consumo', 'liberacao']
+            ).order_by('created_at', 'pk').values_list('agendamento_id', 'saldo_id', 'tipo'):
+                if tipo_movimento == 'reserva':
+                    abertas[agendamento_id] = saldo_id
+                else:
+                    abertas.pop(agendamento_id, None)
+            if not abertas:
+                return 0
+
+            por_saldo = Counter(abertas.values())
+            saldos = SaldoPacote.objects.select_for_update().filter(pk__in=por_saldo)
+            for saldo in saldos:
+                valores = {
+                    'quantidade_reservada': F('quantidade_reservada') - por_saldo[saldo.pk],
+                    'updated_at': timezone.now(),
+                }
+                if campo_destino:
+                    valores[campo_destino] = F(campo_destino) + por_saldo[saldo.pk]
+                SaldoPacote.objects.filter(pk=saldo.pk).update(**valores)
+
+            cls.objects.bulk_create([
+                cls(saldo_id=saldo_id, agendamento_id=agendamento_id, tipo=tipo)
+                for agendamento_id, saldo_id in abertas.items()
+            ])
+        return len(abertas)
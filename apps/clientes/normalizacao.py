@@ -0,0 +1,130 @@
+"""
+Normalization of client identifiers.
+
+Documents, phones and CEP are reduced to digits for comparisons (duplicate
+detection, imports) and rebuilt in the formats enforced by the Cliente
+validators.
+"""
+import re
+import unicodedata
+
+NAO_DIGITOS = re.compile(r'\D')
+
+# Same formats as the Cliente field validators
+PADRAO_TELEFONE = re.compile(r'^\+?1?\d{9,15}$')
+PADRAO_CPF = re.compile(r'^\d{3}\.\d{3}\.\d{3}-\d{2}$')
+PADRAO_CNPJ = re.compile(r'^\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}$')
+PADRAO_CEP = re.compile(r'^\d{5}-\d{3}$')
+PADRAO_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+CODIGO_PAIS = '55'
+
+# Brazilian states (Cliente.estado)
+UFS = {
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO',
+}
+
+
+def somente_digitos(valor):
+    """Return only the digits of a value ('' for None)"""
+    return NAO_DIGITOS.sub('', str(valor)) if valor not in (None, '') else ''
+
+
+def formatar_cpf(valor):
+    """Return the CPF as 000.000.000-00, or the original value if it has not 11 digits"""
+    digitos = somente_digitos(valor)
+    if len(digitos) != 11:
+        return valor
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def formatar_cnpj(valor):
+    """Return the CNPJ as 00.000.000/0000-00, or the original value if it has not 14 digits"""
+    digitos = somente_digitos(valor)
+    if len(digitos) != 14:
+        return valor
+    return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+
+
+def formatar_cep(valor):
+    """Return the CEP as 00000-000, or the original value if it has not 8 digits"""
+    digitos = somente_digitos(valor)
+    if len(digitos) != 8:
+        return valor
+    return f'{digitos[:5]}-{digitos[5:]}'
+
+
+def formatar_telefone(valor):
+    """Return the phone as digits (keeping a leading '+'), as stored in Cliente"""
+    if valor in (None, ''):
+        return ''
+    texto = str(valor).strip()
+    return ('+' if texto.startswith('+') else '') + somente_digitos(texto)
+
+
+def chave_telefone(valor):
+    """
+    Comparison key of a phone: national digits (area code + number),
+    without the country code.
+    """
+    digitos = somente_digitos(valor)
+    if len(digitos) > 11 and digitos.startswith(CODIGO_PAIS):
+        digitos = digitos[len(CODIGO_PAIS):]
+    return digitos
+
+
+def chave_documento(cpf='', cnpj=''):
+    """Comparison key of a client's document (CPF or CNPJ digits)"""
+    return somente_digitos(cpf) or somente_digitos(cnpj)
+
+
+# Portuguese spelling variants reduced before the Soundex code
+SUBSTITUICOES_FONETICAS = [
+    ('PH', 'F'), ('LH', 'L'), ('NH', 'N'), ('CH', 'X'), ('SH', 'X'),
+    ('SS', 'S'), ('SC', 'S'), ('QU', 'C'), ('GU', 'G'),
+    ('Y', 'I'), ('W', 'V'), ('K', 'C'), ('Q', 'C'), ('Z', 'S'), ('H', ''),
+]
+
+CODIGOS_SOUNDEX = {
+    **dict.fromkeys('BFPV', '1'),
+    **dict.fromkeys('CGJKQSXZ', '2'),
+    **dict.fromkeys('DT', '3'),
+    'L': '4',
+    **dict.fromkeys('MN', '5'),
+    'R': '6',
+}
+
+
+def normalizar_nome(nome):
+    """Return the name in upper case, without accents, punctuation or extra spaces"""
+    texto = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode().upper()
+    return ' '.join(re.sub(r'[^A-Z ]', ' ', texto).split())
+
+
+def soundex(palavra):
+    """Soundex code of a word, after reducing common Portuguese spelling variants"""
+    palavra = normalizar_nome(palavra).replace(' ', '')
+    if not palavra:
+        return ''
+    for origem, destino in SUBSTITUICOES_FONETICAS:
+        palavra = palavra.replace(origem, destino)
+    if not palavra:
+        return ''
+
+    codigo = palavra[0]
+    anterior = CODIGOS_SOUNDEX.get(palavra[0], '')
+    for letra in palavra[1:]:
+        digito = CODIGOS_SOUNDEX.get(letra, '')
+        if digito and digito != anterior:
+            codigo += digito
+        anterior = digito
+    return (codigo + '000')[:4]
+
+
+def chave_fonetica_nome(nome):
+    """Phonetic key of a full name: Soundex of the first and last names"""
+    partes = [parte for parte in normalizar_nome(nome).split() if len(parte) > 2] or normalizar_nome(nome).split()
+    if not partes:
+        return ''
+    return f'{soundex(partes[0])}{soundex(partes[-1])}'
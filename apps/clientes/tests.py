@@ -0,0 +1,212 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.agendamentos.models import Agendamento, Notificacao
+from apps.core.paginacao import codificar_cursor
+from apps.funcionarios.models import Cargo, Funcionario
+from apps.servicos.models import CategoriaServico, Servico
+from apps.usuarios.models import Usuario
+from .deduplicacao import encontrar_duplicados, mesclar_clientes, pontuar
+from .importacao import validar_lote
+from .models import Cliente, HistoricoContato
+from .timeline import get_timeline
+
+
+def criar_funcionario(nome='Ana', cpf='111.111.111-11'):
+    cargo, _ = Cargo.objects.get_or_create(nome='Cabeleireiro')
+    return Funcionario.objects.create(
+        nome=nome, telefone='11999999999', cpf=cpf, data_nascimento=date(1990, 1, 1),
+        endereco='Rua A', cidade='São Paulo', estado='SP', cep='01000-000', cargo=cargo,
+        data_admissao=date(2020, 1, 1), salario_atual=Decimal('2000'),
+        horario_entrada=time(9), horario_saida=time(18), dias_trabalho='seg-sab'
+    )
+
+
+def criar_servico(nome='Corte', duracao=30, **kwargs):
+    categoria, _ = CategoriaServico.objects.get_or_create(nome='Cabelo')
+    return Servico.objects.create(
+        nome=nome, descricao=nome, categoria=categoria, preco=Decimal('50'), duracao=duracao, **kwargs
+    )
+
+
+class TimelineClienteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nome='João', telefone='11988887777')
+        funcionario = criar_funcionario()
+        servico = criar_servico()
+        base = timezone.make_aware(datetime(2026, 3, 2, 10))
+        for dia in range(3):
+            Agendamento.objects.create(
+                cliente=cls.cliente, funcionario=funcionario, servico=servico,
+                data_hora=base + timedelta(days=dia)
+            )
+            HistoricoContato.objects.create(
+                cliente=cls.cliente, tipo_contato='telefone', assunto=f'Contato {dia}',
+                descricao='Retorno', data_contato=base + timedelta(days=dia, hours=1)
+            )
+        cls.usuario = Usuario.objects.create(username='adm', nome='Administrador')
+
+    def test_paginas_cobrem_todos_os_eventos_em_ordem(self):
+        completos, proximo = get_timeline(self.cliente, limite=100)
+        self.assertIsNone(proximo)
+
+        eventos, cursor = [], None
+        while True:
+            pagina, cursor = get_timeline(self.cliente, cursor=cursor, limite=2)
+            eventos.extend(pagina)
+            if cursor is None:
+                break
+        self.assertEqual(
+            [(evento['tipo'], evento['id']) for evento in eventos],
+            [(evento['tipo'], evento['id']) for evento in completos]
+        )
+        datas = [evento['data'] for evento in eventos]
+        self.assertEqual(datas, sorted(datas, reverse=True))
+
+    def test_cursor_invalido(self):
+        agora = timezone.now()
+        cursores = [
+            codificar_cursor(['x', 'agendamento', 1]),
+            codificar_cursor([1, 'agendamento', 1]),
+            codificar_cursor([agora, 'agendamento', 'x']),
+            codificar_cursor([agora, 'agendamento']),
+        ]
+        for cursor in cursores:
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                get_timeline(self.cliente, cursor=cursor)
+
+    def test_api_responde_400_para_cursor_invalido(self):
+        api = APIClient(SERVER_NAME='localhost')
+        api.force_authenticate(self.usuario)
+        url = f'/api/clientes/{self.cliente.pk}/timeline/'
+
+        resposta = api.get(url, {'limite': 2})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.data['results']), 2)
+
+        resposta = api.get(url, {'cursor': codificar_cursor(['x', 'agendamento', 1])})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('cursor', resposta.data)
+
+
+class ValidacaoImportacaoTests(TestCase):
+
+    def test_celulas_numericas_do_xlsx(self):
+        validos, erros = validar_lote([
+            (2, {'nome': 'Ana', 'telefone': 11988887777.0, 'cpf': 1234567890.0, 'cep': 1310100.0}),
+        ])
+        self.assertEqual(dict(erros), {})
+        (_, dados), = validos
+        self.assertEqual(dados['telefone'], '11988887777')
+        self.assertEqual(dados['cpf'], '012.345.678-90')
+        self.assertEqual(dados['cep'], '01310-100')
+
+    def test_campos_de_escolha(self):
+        validos, erros = validar_lote([
+            (2, {'nome': 'Ana', 'telefone': '11988887777', 'sexo': 'feminino', 'estado': 'sp',
+                 'tipo_cliente': 'Pessoa Física'}),
+            (3, {'nome': 'Bia', 'telefone': '11977776666', 'sexo': 'x'}),
+            (4, {'nome': 'Caio', 'telefone': '11966665555', 'estado': 'XX'}),
+            (5, {'nome': 'Duda', 'telefone': '11955554444', 'tipo_cliente': 'empresa'}),
+        ])
+        (_, dados), = validos
+        self.assertEqual(
+            (dados['sexo'], dados['estado'], dados['tipo_cliente']),
+            ('F', 'SP', 'pessoa_fisica')
+        )
+        self.assertEqual(sorted(erros), [3, 4, 5])
+
+
+class DeduplicacaoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.joao = Cliente.objects.create(nome='João da Silva', telefone='(11) 98888-7777')
+        cls.joao_dup = Cliente.objects.create(
+            nome='Joao Silva', telefone='11988887777', email='joao@exemplo.com', cidade='Santos'
+        )
+        cls.maria = Cliente.objects.create(nome='Maria Souza', telefone='11977776666')
+        cls.funcionario = criar_funcionario()
+        cls.servico = criar_servico()
+
+    def test_blocos_e_pontuacao(self):
+        candidatos = encontrar_duplicados()
+        self.assertEqual([(id_a, id_b) for _, id_a, id_b in candidatos], [(self.joao.pk, self.joao_dup.pk)])
+        self.assertGreaterEqual(candidatos[0][0], 0.6)
+
+        campos = ('nome', 'cpf', 'cnpj', 'telefone', 'whatsapp', 'email')
+        cliente_a = dict.fromkeys(campos, '') | {'nome': 'Ana Lima', 'cpf': '111.111.111-11'}
+        cliente_b = cliente_a | {'cpf': '222.222.222-22'}
+        self.assertEqual(pontuar(cliente_a, cliente_b), 0.0)
+        self.assertEqual(pontuar(cliente_a, dict(cliente_a)), 1.0)
+
+    def test_mescla_transfere_registros_e_inativa_duplicado(self):
+        data_hora = timezone.make_aware(datetime(2026, 3, 2, 10))
+        agendamento = Agendamento.objects.create(
+            cliente=self.joao_dup, funcionario=self.funcionario, servico=self.servico, data_hora=data_hora
+        )
+        Notificacao.objects.create(
+            agendamento=agendamento, cliente=self.joao_dup, tipo='lembrete', canal='whatsapp',
+            destinatario='11988887777', assunto='Lembrete', mensagem='Até amanhã', data_agendamento=data_hora
+        )
+        HistoricoContato.objects.create(
+            cliente=self.joao_dup, tipo_contato='telefone', assunto='Retorno', descricao='Retorno',
+            data_contato=data_hora
+        )
+        # The instances passed in are stale: the rows changed after they were read
+        principal = Cliente.objects.get(pk=self.joao.pk)
+        duplicado = Cliente.objects.get(pk=self.joao_dup.pk)
+        Cliente.objects.filter(pk=self.joao.pk).update(cidade='São Paulo', data_ultimo_atendimento=data_hora)
+        Cliente.objects.filter(pk=self.joao_dup.pk).update(
+            whatsapp='11955554444', data_ultimo_atendimento=data_hora + timedelta(days=30)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movidos = mesclar_clientes(principal, [duplicado])
+
+        self.assertEqual(movidos['agendamentos.Agendamento'], 1)
+        self.assertEqual(movidos['agendamentos.Notificacao'], 1)
+        self.assertEqual(movidos['clientes.HistoricoContato'], 1)
+        self.assertEqual(Agendamento.objects.get(pk=agendamento.pk).cliente_id, self.joao.pk)
+        self.assertEqual(Notificacao.objects.get().cliente_id, self.joao.pk)
+        self.assertEqual(
+            list(HistoricoContato.objects.filter(cliente=self.joao).values_list('assunto', flat=True)
+                 .order_by('assunto')),
+            ['Mesclagem de cadastros', 'Retorno']
+        )
+
+        joao = Cliente.objects.get(pk=self.joao.pk)
+        self.assertEqual(
+            (joao.email, joao.whatsapp, joao.cidade, joao.data_ultimo_atendimento),
+            ('joao@exemplo.com', '11955554444', 'São Paulo', data_hora + timedelta(days=30))
+        )
+        self.assertEqual(principal.whatsapp, '11955554444')
+        duplicado.refresh_from_db()
+        self.assertEqual((duplicado.is_active, duplicado.status), (False, 'inativo'))
+        self.assertIsNotNone(duplicado.deleted_at)
+        self.assertEqual(encontrar_duplicados(), [])
+
+    def test_comando_lista_e_mescla(self):
+        saida = StringIO()
+        call_command('clientes_duplicados', stdout=saida)
+        self.assertIn(f'#{self.joao.pk} João da Silva  <->  #{self.joao_dup.pk} Joao Silva', saida.getvalue())
+        self.assertIn('1 par(es) candidato(s).', saida.getvalue())
+
+        with self.assertRaisesMessage(CommandError, 'Cliente(s) não encontrado(s): 0'):
+            call_command('clientes_duplicados', '--mesclar', str(self.joao.pk), '0')
+        with self.assertRaises(CommandError):
+            call_command('clientes_duplicados', '--mesclar', str(self.joao.pk))
+
+        saida = StringIO()
+        call_command('clientes_duplicados', '--mesclar', str(self.joao.pk), str(self.joao_dup.pk), stdout=saida)
+        self.assertIn(f'1 cadastro(s) mesclado(s) em #{self.joao.pk}.', saida.getvalue())
+        self.assertFalse(Cliente.objects.get(pk=self.joao_dup.pk).is_active)
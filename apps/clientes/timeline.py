@@ -0,0 +1,139 @@
+"""
+Unified client timeline.
+
+Appointments (live and archived), status changes, contacts and
+notifications are read as separate streams, each one already sorted by
+(date, id) and limited to one page through its own index, and combined with
+a k-way merge. Pages are addressed by a keyset cursor on (date, type, id),
+so loading an old page costs the same as loading the first one.
+"""
+import heapq
+from datetime import datetime
+
+from django.db.models import Q
+
+from apps.core.paginacao import codificar_cursor, decodificar_cursor, filtro_apos
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+def _agendamentos(cliente):
+    from apps.agendamentos.models import Agendamento
+    return 'agendamento', 'data_hora', 'id', Agendamento.objects.filter(cliente=cliente, is_active=True).values(
+        'id', 'data_hora', 'status', 'servico__nome', 'funcionario__nome', 'valor_final'
+    ), lambda linha: {
+        'resumo': f"{linha['servico__nome']} com {linha['funcionario__nome']}",
+        'status': linha['status'],
+        'valor': linha['valor_final'],
+    }
+
+
+def _agendamentos_arquivados(cliente):
+    from apps.agendamentos.models import AgendamentoArquivado
+    return 'agendamento', 'data_hora', 'agendamento_id', AgendamentoArquivado.objects.filter(
+        cliente=cliente, is_active=True
+    ).values(
+        'agendamento_id', 'data_hora', 'status', 'servico__nome', 'valor_final'
+    ), lambda linha: {
+        'resumo': linha['servico__nome'],
+        'status': linha['status'],
+        'valor': linha['valor_final'],
+        'arquivado': True,
+    }
+
+
+def _mudancas_status(cliente):
+    # StatusAgendamento has no client column, so this stream is not a pure
+    # index seek: the client's appointments come from agendamento_cli_data_idx
+    # and their changes from the (agendamento, -data_mudanca) index, and the
+    # page is sorted over that client's status history
+    from apps.agendamentos.models import StatusAgendamento
+    return 'status', 'data_mudanca', 'id', StatusAgendamento.objects.filter(
+        agendamento__cliente=cliente, is_active=True
+    ).values(
+        'id', 'data_mudanca', 'agendamento_id', 'status_anterior', 'status_novo', 'observacoes'
+    ), lambda linha: {
+        'resumo': f"Agendamento #{linha['agendamento_id']}: {linha['status_anterior']} → {linha['status_novo']}",
+        'agendamento_id': linha['agendamento_id'],
+        'observacoes': linha['observacoes'],
+    }
+
+
+def _contatos(cliente):
+    return 'contato', 'data_contato', 'id', cliente.historico_contatos.filter(is_active=True).values(
+        'id', 'data_contato', 'tipo_contato', 'assunto', 'descricao'
+    ), lambda linha: {
+        'resumo': linha['assunto'],
+        'canal': linha['tipo_contato'],
+        'descricao': linha['descricao'],
+    }
+
+
+def _notificacoes(cliente):
+    from apps.agendamentos.models import Notificacao
+    return 'notificacao', 'data_agendamento', 'id', Notificacao.objects.filter(cliente=cliente, is_active=True).values(
+        'id', 'data_agendamento', 'tipo', 'canal', 'status', 'assunto'
+    ), lambda linha: {
+        'resumo': linha['assunto'] or linha['tipo'],
+        'canal': linha['canal'],
+        'status': linha['status'],
+    }
+
+
+# Each source returns (type, date field, id field, values() queryset, detail function)
+FONTES = [_agendamentos, _agendamentos_arquivados, _mudancas_status, _contatos, _notificacoes]
+
+
+def _apos_cursor(tipo, campo_data, campo_id, cursor):
+    """Rows of a source that come after the cursor in (date, type, id) descending order"""
+    data, tipo_cursor, id_cursor = cursor
+    if tipo < tipo_cursor:
+        return Q(**{f'{campo_data}__lte': data})
+    if tipo > tipo_cursor:
+        return Q(**{f'{campo_data}__lt': data})
+    return filtro_apos([campo_data, campo_id], [data, id_cursor])
+
+
+def _fluxo(tipo, campo_data, campo_id, linhas, detalhar):
+    for linha in linhas:
+        yield (linha[campo_data], tipo, linha[campo_id]), {
+            'tipo': tipo,
+            'id': linha[campo_id],
+            'data': linha[campo_data],
+            **detalhar(linha),
+        }
+
+
+def get_timeline(cliente, cursor=None, limite=LIMITE_PADRAO):
+    """
+    Return (events, next cursor or None) for a page of the client's timeline,
+    most recent first. Raises ValueError for an invalid cursor.
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    posicao = decodificar_cursor(cursor) if cursor else None
+    if posicao is not None and not (
+        len(posicao) == 3
+        and isinstance(posicao[0], datetime)
+        and isinstance(posicao[1], str)
+        and isinstance(posicao[2], int)
+        and not isinstance(posicao[2], bool)
+    ):
+        raise ValueError('Cursor inválido')
+
+    fluxos = []
+    for fonte in FONTES:
+        tipo, campo_data, campo_id, queryset, detalhar = fonte(cliente)
+        if posicao is not None:
+            queryset = queryset.filter(_apos_cursor(tipo, campo_data, campo_id, posicao))
+        linhas = queryset.order_by(f'-{campo_data}', f'-{campo_id}')[:limite + 1]
+        fluxos.append(_fluxo(tipo, campo_data, campo_id, linhas, detalhar))
+
+    eventos = []
+    chave = None
+    for chave_evento, evento in heapq.merge(*fluxos, key=lambda item: item[0], reverse=True):
+        if len(eventos) == limite:
+            return eventos, codificar_cursor(chave)
+        eventos.append(evento)
+        chave = chave_evento
+    return eventos, None
@@ -0,0 +1,99 @@
+"""
+Shared API helpers for JT Sistemas.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+def projecao_dos_campos(serializer, campos):
+    """
+    Return (columns for only(), relations for select_related) needed to
+    serialize `campos`, or None when a field cannot be mapped to columns.
+    Fields computed from the instance declare their columns in
+    `Meta.dependencias` ({field name: [lookup paths]}).
+    """
+    model = serializer.Meta.model
+    dependencias = getattr(serializer.Meta, 'dependencias', {})
+    colunas = set()
+    relacoes = set()
+
+    for nome in campos:
+        campo = serializer.fields[nome]
+        if nome in dependencias:
+            caminhos = dependencias[nome]
+        elif campo.source == '*':
+            return None
+        else:
+            caminhos = ['__'.join(campo.source_attrs)]
+
+        for caminho in caminhos:
+            partes = caminho.split('__')
+            modelo = model
+            for posicao, parte in enumerate(partes):
+                try:
+                    field = modelo._meta.get_field(parte)
+                except FieldDoesNotExist:
+                    return None
+                if not field.concrete or field.many_to_many:
+                    return None
+                if posicao < len(partes) - 1:
+                    if not field.is_relation:
+                        return None
+                    relacao = '__'.join(partes[:posicao + 1])
+                    relacoes.add(relacao)
+                    colunas.add(relacao)
+                    modelo = field.related_model
+            colunas.add(caminho)
+    return colunas, relacoes
+
+
+class CamposEsparsosSerializerMixin:
+    """Serializer mixin keeping only the fields listed in context['campos']"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        if campos is not None:
+            for nome in set(self.fields) - set(campos):
+                self.fields.pop(nome)
+
+
+class CamposEsparsosMixin:
+    """
+    ViewSet mixin for sparse fieldsets: `?fields=id,data_hora,cliente_nome`
+    limits the serialized fields on reads and narrows the SQL projection
+    with only() (and select_related for the relations they traverse).
+    `campos_obrigatorios` are always loaded (e.g. the pagination ordering).
+    """
+    campos_obrigatorios = ('id',)
+
+    def get_campos(self):
+        if not hasattr(self, '_campos'):
+            self._campos = None
+            parametro = self.request.query_params.get('fields') if self.request else None
+            if parametro and self.request.method in ('GET', 'HEAD'):
+                campos = list(dict.fromkeys(nome.strip() for nome in parametro.split(',') if nome.strip()))
+                disponiveis = self.get_serializer_class()().fields
+                invalidos = [nome for nome in campos if nome not in disponiveis]
+                if invalidos:
+                    raise ValidationError({'fields': f"Campo(s) inválido(s): {', '.join(invalidos)}"})
+                self._campos = campos
+        return self._campos
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['campos'] = self.get_campos()
+        return context
+
+    def projetar(self, queryset):
+        """Narrow the queryset to the columns of the requested fields"""
+        campos = self.get_campos()
+        if not campos:
+            return queryset
+        projecao = projecao_dos_campos(self.get_serializer_class()(), campos)
+        if projecao is None:
+            return queryset
+        colunas, relacoes = projecao
+        return queryset.select_related(None).select_related(*relacoes).only(
+            *self.campos_obrigatorios, *colunas
+        )
@@ -1,9 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from apps.agendamentos.api import AgendamentoViewSet, DisponibilidadeView
+from apps.clientes.api import TimelineClienteView
+from apps.servicos.api import PacoteServicoViewSet
+
 router = DefaultRouter()
+router.register('agendamentos', AgendamentoViewSet, basename='agendamento')
+router.register('pacotes', PacoteServicoViewSet, basename='pacote')
 
 urlpatterns = [
     path('', include(router.urls)),
-    # APIs serão implementadas posteriormente
-]
\ No newline at end of file
+    path('disponibilidade/', DisponibilidadeView.as_view(), name='disponibilidade'),
+    path('clientes/<int:pk>/timeline/', TimelineClienteView.as_view(), name='cliente-timeline'),
+]
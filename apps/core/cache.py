@@ -0,0 +1,157 @@
+"""
+Cache helpers for JT Sistemas.
+Version keys and stampede-protected recomputation on top of the configured
+Django cache (Redis in production, locmem in development).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Version keys collected by the innermost agrupar_invalidacoes() block, per thread
+_agrupamento = threading.local()
+
+# Versions last read by this process: key -> (version, time.monotonic() of the read)
+_versoes_locais = {}
+
+
+def get_version(version_key):
+    """Return the current value of a version key, creating it if missing"""
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, time.time_ns(), timeout=None)
+        version = cache.get(version_key)
+    return version
+
+
+def get_local_version(version_key):
+    """
+    Return a version key as last read by this process, checking the shared
+    cache at most every SNAPSHOT_VERSION_CHECK_INTERVAL seconds. Meant for
+    per-process snapshots consulted many times per request; bumps made by
+    this process are seen at once, other workers' within the interval.
+    """
+    intervalo = getattr(settings, 'SNAPSHOT_VERSION_CHECK_INTERVAL', 2)
+    agora = time.monotonic()
+    local = _versoes_locais.get(version_key)
+    if local is not None and agora - local[1] < intervalo:
+        return local[0]
+    version = get_version(version_key)
+    _versoes_locais[version_key] = (version, agora)
+    return version
+
+
+def bump_version(version_key):
+    """
+    Replace a version key with a new unique value.
+    Every entry stamped with the previous version becomes stale.
+    """
+    version = time.time_ns()
+    cache.set(version_key, version, timeout=None)
+    _versoes_locais.pop(version_key, None)
+    return version
+
+
+def bump_version_on_commit(version_key):
+    """Bump a version key once the current transaction commits"""
+    if getattr(_agrupamento, 'version_keys', None) is not None:
+        _agrupamento.version_keys.add(version_key)
+        return
+    transaction.on_commit(lambda: bump_version(version_key))
+
+
+def get_versions(version_keys):
+    """Return {key: version} for several version keys with one round trip"""
+    versions = cache.get_many(version_keys)
+    for version_key in version_keys:
+        if versions.get(version_key) is None:
+            versions[version_key] = get_version(version_key)
+    return versions
+
+
+def bump_versions_on_commit(version_keys):
+    """Bump several version keys with one write once the current transaction commits"""
+    if getattr(_agrupamento, 'version_keys', None) is not None:
+        _agrupamento.version_keys.update(version_keys)
+        return
+    version_keys = list(version_keys)
+    transaction.on_commit(lambda: _bump_versions(version_keys))
+
+
+def _bump_versions(version_keys):
+    cache.set_many(dict.fromkeys(version_keys, time.time_ns()), timeout=None)
+    for version_key in version_keys:
+        _versoes_locais.pop(version_key, None)
+
+
+@contextmanager
+def agrupar_invalidacoes():
+    """
+    Collect the version bumps scheduled inside the block (e.g. by signal
+    handlers running once per row of a bulk delete) and schedule them as a
+    single cache write when it exits.
+    """
+    if getattr(_agrupamento, 'version_keys', None) is not None:
+        yield
+        return
+    _agrupamento.version_keys = set()
+    try:
+        yield
+        version_keys = _agrupamento.version_keys
+    finally:
+        _agrupamento.version_keys = None
+    if version_keys:
+        bump_versions_on_commit(version_keys)
+
+
+def get_or_compute(key, compute, version_key=None, timeout=300,
+                   stale_timeout=3600, lock_timeout=30, wait_timeout=5):
+    """
+    Return the cached value for `key`, recomputing it with `compute()` when
+    missing, expired or stamped with an outdated version.
+
+    Only one process recomputes at a time (lock via `cache.add`); the others
+    keep serving the stale copy while it is refreshed, or wait up to
+    `wait_timeout` seconds when there is no copy at all.
+    """
+    lock_key = f'{key}:lock'
+    if version_key:
+        values = cache.get_many([key, version_key])
+        version = values.get(version_key)
+        if version is None:
+            version = get_version(version_key)
+    else:
+        values = {key: cache.get(key)}
+        version = None
+    entry = values.get(key)
+
+    if entry is not None and entry['version'] == version and entry['fresh_until'] > time.time():
+        return entry['value']
+
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            value = compute()
+            cache.set(
+                key,
+                {'value': value, 'version': version, 'fresh_until': time.time() + timeout},
+                timeout=timeout + stale_timeout
+            )
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    # Another process is recomputing: serve the stale copy if there is one
+    if entry is not None:
+        return entry['value']
+
+    deadline = time.time() + wait_timeout
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == version:
+            return entry['value']
+
+    return compute()
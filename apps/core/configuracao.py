@@ -0,0 +1,114 @@
+"""
+Configuration service for JT Sistemas.
+
+Every SystemConfiguration row is loaded once per process into a read-only
+mapping and typed values are parsed once per key (JSON values frozen into
+read-only mappings and tuples, as they are shared). Saving a configuration
+bumps a version key in the shared cache, so every worker reloads its
+snapshot within SNAPSHOT_VERSION_CHECK_INTERVAL seconds.
+"""
+import json
+from types import MappingProxyType
+
+from django.utils.dateparse import parse_duration
+
+from .cache import bump_version_on_commit, get_local_version
+
+CONFIGURACAO_VERSION_KEY = 'core:configuracao:version'
+
+VALORES_VERDADEIROS = {'1', 'true', 'sim', 's', 'yes', 'y', 'on'}
+VALORES_FALSOS = {'0', 'false', 'nao', 'não', 'n', 'no', 'off', ''}
+
+# Marker for missing or invalid values in the parsed cache
+_AUSENTE = object()
+
+# Snapshot of the current process
+_configuracao = None
+
+
+def _para_bool(valor):
+    valor = valor.strip().lower()
+    if valor in VALORES_VERDADEIROS:
+        return True
+    if valor in VALORES_FALSOS:
+        return False
+    raise ValueError(f'Valor booleano inválido: {valor}')
+
+
+def _congelar(valor):
+    """Turn parsed JSON into read-only mappings and tuples"""
+    if isinstance(valor, dict):
+        return MappingProxyType({chave: _congelar(item) for chave, item in valor.items()})
+    if isinstance(valor, list):
+        return tuple(_congelar(item) for item in valor)
+    return valor
+
+
+def _para_json(valor):
+    return _congelar(json.loads(valor))
+
+
+def _para_duracao(valor):
+    duracao = parse_duration(valor.strip())
+    if duracao is None:
+        raise ValueError(f'Duração inválida: {valor}')
+    return duracao
+
+
+class Configuracao:
+    """
+    Read-only snapshot of every configuration for a given version.
+    Typed accessors return `default` when the key is missing or invalid.
+    """
+
+    def __init__(self, versao):
+        from .models import SystemConfiguration
+
+        self.versao = versao
+        self.valores = MappingProxyType(dict(SystemConfiguration.objects.values_list('key', 'value')))
+        self._convertidos = {}
+
+    def get(self, key, default=None):
+        """Return the raw string value"""
+        return self.valores.get(key, default)
+
+    def _converter(self, key, tipo, conversor, default):
+        """Parse a value once per snapshot and reuse the result"""
+        chave = (key, tipo)
+        if chave not in self._convertidos:
+            valor = self.valores.get(key)
+            try:
+                self._convertidos[chave] = _AUSENTE if valor is None else conversor(valor)
+            except (ValueError, TypeError):
+                self._convertidos[chave] = _AUSENTE
+        valor = self._convertidos[chave]
+        return default if valor is _AUSENTE else valor
+
+    def get_int(self, key, default=None):
+        return self._converter(key, 'int', int, default)
+
+    def get_bool(self, key, default=None):
+        """Accepts 1/0, true/false, sim/não, yes/no, on/off"""
+        return self._converter(key, 'bool', _para_bool, default)
+
+    def get_json(self, key, default=None):
+        """Objects come back as read-only mappings and lists as tuples"""
+        return self._converter(key, 'json', _para_json, default)
+
+    def get_duration(self, key, default=None):
+        """Accepts the formats of parse_duration (e.g. '01:30:00', 'P1D', '2 00:00:00')"""
+        return self._converter(key, 'duration', _para_duracao, default)
+
+
+def get_configuracao():
+    """Return the configuration snapshot, reloading it when the shared version changed"""
+    global _configuracao
+    versao = get_local_version(CONFIGURACAO_VERSION_KEY)
+    if _configuracao is None or _configuracao.versao != versao:
+        _configuracao = Configuracao(versao)
+    return _configuracao
+
+
+def invalidar_configuracao():
+    """Make every worker reload the configuration after the current transaction commits"""
+    bump_version_on_commit(CONFIGURACAO_VERSION_KEY)
@@ -0,0 +1,190 @@
+"""
+Maintained table counters for JT Sistemas.
+
+A counter is a named equality filter over a model (e.g. active
+appointments). Its value lives in a ContadorTabela row, adjusted by +1/-1
+from the model's save/delete signals after commit, so headline totals cost
+a primary-key lookup instead of a full scan. Bulk inserts and updates,
+which bypass the signals, report their effect explicitly; anything else can
+mark the counters as inexact, and until the next recount
+(`manage.py recontar_contadores`, run via cron) readers get a planner
+estimate instead. Inside `agrupar_contagens()` the adjustments of a bulk
+operation (e.g. one post_delete per row) are applied as one UPDATE per
+counter.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import ContadorTabela
+from .paginacao import contagem_estimada
+from .sinais import linha_anterior, registrar_colunas_anteriores
+
+# name -> (model, {field: value})
+CONTADORES = {}
+
+# Pending deltas of the innermost agrupar_contagens() block, per thread
+_agrupamento = threading.local()
+
+
+def registrar_contador(nome, model, **filtros):
+    """Register a counter of the rows of `model` matching the equality `filtros`"""
+    for campo in filtros:
+        model._meta.get_field(campo)
+    CONTADORES[nome] = (model, filtros)
+    registrar_colunas_anteriores(model, filtros)
+
+    uid = f'contadores:{model._meta.label}'
+    pre_save.connect(_antes_de_salvar, sender=model, dispatch_uid=uid)
+    post_save.connect(_depois_de_salvar, sender=model, dispatch_uid=uid)
+    post_delete.connect(_depois_de_excluir, sender=model, dispatch_uid=uid)
+
+
+def _contadores_do_modelo(model):
+    return {nome: filtros for nome, (modelo, filtros) in CONTADORES.items() if modelo is model}
+
+
+def _atende(valores, filtros):
+    return all(valores.get(campo) == valor for campo, valor in filtros.items())
+
+
+def _valores(instance, campos):
+    return {campo: getattr(instance, campo) for campo in campos}
+
+
+def _ajustar(nome, delta):
+    pendentes = getattr(_agrupamento, 'deltas', None)
+    if pendentes is not None:
+        pendentes[nome] += delta
+        return
+    transaction.on_commit(
+        lambda: ContadorTabela.objects.filter(pk=nome, exato=True).update(valor=F('valor') + delta)
+    )
+
+
+@contextmanager
+def agrupar_contagens():
+    """
+    Collect the counter adjustments made inside the block and schedule them
+    as a single UPDATE per counter when it exits.
+    """
+    if getattr(_agrupamento, 'deltas', None) is not None:
+        yield
+        return
+    _agrupamento.deltas = Counter()
+    try:
+        yield
+        deltas = _agrupamento.deltas
+    finally:
+        _agrupamento.deltas = None
+    for nome, delta in deltas.items():
+        if delta:
+            _ajustar(nome, delta)
+
+
+def _antes_de_salvar(sender, instance, raw=False, update_fields=None, **kwargs):
+    contadores = _contadores_do_modelo(sender)
+    campos = {campo for filtros in contadores.values() for campo in filtros}
+    instance._contadores_antes = None
+    if raw or (update_fields is not None and not campos & set(update_fields)):
+        return
+    if instance._state.adding:
+        instance._contadores_antes = set()
+        return
+    anteriores = linha_anterior(sender, instance)
+    instance._contadores_antes = {
+        nome for nome, filtros in contadores.items() if anteriores and _atende(anteriores, filtros)
+    }
+
+
+def _depois_de_salvar(sender, instance, raw=False, **kwargs):
+    antes = getattr(instance, '_contadores_antes', None)
+    if raw or antes is None:
+        return
+    contadores = _contadores_do_modelo(sender)
+    depois = {
+        nome for nome, filtros in contadores.items()
+        if _atende(_valores(instance, filtros), filtros)
+    }
+    for nome in depois - antes:
+        _ajustar(nome, 1)
+    for nome in antes - depois:
+        _ajustar(nome, -1)
+
+
+def _depois_de_excluir(sender, instance, **kwargs):
+    for nome, filtros in _contadores_do_modelo(sender).items():
+        if _atende(_valores(instance, filtros), filtros):
+            _ajustar(nome, -1)
+
+
+def contar_inseridos(model, objetos):
+    """Count rows inserted with bulk_create (which skips the save signals)"""
+    for nome, filtros in _contadores_do_modelo(model).items():
+        total = sum(1 for objeto in objetos if _atende(_valores(objeto, filtros), filtros))
+        if total:
+            _ajustar(nome, total)
+
+
+def contar_atualizados(queryset, **valores):
+    """
+    Count the effect of `queryset.update(**valores)` (which skips the save
+    signals). Call it right before the update, in the same transaction.
+    """
+    contadores = {
+        nome: filtros for nome, filtros in _contadores_do_modelo(queryset.model).items()
+        if set(filtros) & set(valores)
+    }
+    if not contadores:
+        return
+    campos = {campo for filtros in contadores.values() for campo in filtros}
+    deltas = dict.fromkeys(contadores, 0)
+    for linha in queryset.values(*campos).iterator():
+        novos = {**linha, **{campo: valor for campo, valor in valores.items() if campo in campos}}
+        for nome, filtros in contadores.items():
+            deltas[nome] += _atende(novos, filtros) - _atende(linha, filtros)
+    for nome, delta in deltas.items():
+        if delta:
+            _ajustar(nome, delta)
+
+
+def marcar_inexatos(model):
+    """Flag the counters of a model after a bulk change that skipped the signals"""
+    nomes = list(_contadores_do_modelo(model))
+    if nomes:
+        transaction.on_commit(lambda: ContadorTabela.objects.filter(pk__in=nomes).update(exato=False))
+
+
+def get_queryset(nome):
+    model, filtros = CONTADORES[nome]
+    return model._base_manager.filter(**filtros)
+
+
+def get_contadores(*nomes):
+    """
+    Return {name: value} for the given counters with one primary-key lookup.
+    Missing or inexact counters fall back to the planner estimate.
+    """
+    valores = dict(ContadorTabela.objects.filter(pk__in=nomes, exato=True).values_list('nome', 'valor'))
+    for nome in nomes:
+        if nome not in valores:
+            valores[nome] = contagem_estimada(get_queryset(nome))
+    return valores
+
+
+def get_contador(nome):
+    return get_contadores(nome)[nome]
+
+
+def recontar(nome):
+    """Recompute a counter exactly; returns the new value"""
+    with transaction.atomic():
+        contador, _ = ContadorTabela.objects.select_for_update().get_or_create(pk=nome)
+        contador.valor = get_queryset(nome).count()
+        contador.exato = True
+        contador.save()
+    return contador.valor
@@ -0,0 +1,23 @@
+"""
+Recounts the maintained table counters (run periodically via cron).
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.contadores import CONTADORES, recontar
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de tabelas mantidos por sinais'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nomes', nargs='*', help='Contadores a recalcular (padrão: todos)')
+
+    def handle(self, *args, **options):
+        nomes = options['nomes'] or sorted(CONTADORES)
+        desconhecidos = set(nomes) - set(CONTADORES)
+        if desconhecidos:
+            raise CommandError(f"Contador(es) desconhecido(s): {', '.join(sorted(desconhecidos))}")
+
+        for nome in nomes:
+            self.stdout.write(f'{nome}: {recontar(nome)}')
+        self.stdout.write(self.style.SUCCESS(f'{len(nomes)} contador(es) recalculado(s).'))
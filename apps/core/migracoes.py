@@ -0,0 +1,46 @@
+"""
+Migration operations shared by the apps.
+
+Indexes on large tables are built and dropped CONCURRENTLY on PostgreSQL, so
+applying a migration does not block writes. Other databases (SQLite in
+development) get a plain CREATE/DROP INDEX. Migrations using these
+operations must set `atomic = False`.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations
+
+
+def _postgres(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class AddIndexConcurrentlyNoPostgres(AddIndexConcurrently):
+    """AddIndexConcurrently on PostgreSQL, a plain AddIndex elsewhere"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _postgres(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _postgres(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class RemoveIndexConcurrentlyNoPostgres(RemoveIndexConcurrently):
+    """RemoveIndexConcurrently on PostgreSQL, a plain RemoveIndex elsewhere"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _postgres(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.RemoveIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _postgres(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.RemoveIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContadorTabela",
+            fields=[
+                (
+                    "nome",
+                    models.CharField(
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Nome",
+                    ),
+                ),
+                ("valor", models.BigIntegerField(default=0, verbose_name="Valor")),
+                (
+                    "exato",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Desmarcado após operações em lote, até a próxima recontagem",
+                        verbose_name="Exato",
+                    ),
+                ),
+                (
+                    "atualizado_em",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+            ],
+            options={
+                "verbose_name": "Contador de Tabela",
+                "verbose_name_plural": "Contadores de Tabelas",
+                "ordering": ["nome"],
+            },
+        ),
+    ]
@@ -160,14 +160,22 @@ class SystemConfiguration(models.Model):
     def __str__(self):
         return f"{self.key}: {self.description or 'Sem descrição'}"
 
+    def save(self, *args, **kwargs):
+        from .configuracao import invalidar_configuracao
+        super().save(*args, **kwargs)
+        invalidar_configuracao()
+
+    def delete(self, *args, **kwargs):
+        from .configuracao import invalidar_configuracao
+        resultado = super().delete(*args, **kwargs)
+        invalidar_configuracao()
+        return resultado
+
     @classmethod
     def get_value(cls, key, default=None):
-        """Get configuration value by key"""
-        try:
-            config = cls.objects.get(key=key)
-            return config.value
-        except cls.DoesNotExist:
-            return default
+        """Get configuration value by key (from the per-process snapshot)"""
+        from .configuracao import get_configuracao
+        return get_configuracao().get(key, default)
 
     @classmethod
     def set_value(cls, key, value, description=''):
@@ -181,4 +189,37 @@ class SystemConfiguration(models.Model):
             if description:
                 config.description = description
             config.save()
-        return config
\ No newline at end of file
+        return config
+
+
+class ContadorTabela(models.Model):
+    """
+    Maintained row count of a registered counter (see apps.core.contadores),
+    read with a primary-key lookup instead of a COUNT(*) over the table.
+    """
+    nome = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Nome'
+    )
+    valor = models.BigIntegerField(
+        default=0,
+        verbose_name='Valor'
+    )
+    exato = models.BooleanField(
+        default=True,
+        verbose_name='Exato',
+        help_text='Desmarcado após operações em lote, até a próxima recontagem'
+    )
+    atualizado_em = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Atualizado em'
+    )
+
+    class Meta:
+        verbose_name = 'Contador de Tabela'
+        verbose_name_plural = 'Contadores de Tabelas'
+        ordering = ['nome']
+
+    def __str__(self):
+        return f"{self.nome}: {self.valor}"
@@ -0,0 +1,251 @@
+"""
+Keyset (seek) pagination helpers for JT Sistemas.
+
+Pages are addressed by an opaque cursor holding the sort key of the last row
+served, and the next page is fetched with a row comparison on that key
+instead of OFFSET, so deep pages cost the same as the first one. Totals can
+come from planner estimates instead of a full COUNT(*).
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import CursorPagination
+
+# Below this estimate an exact COUNT(*) is cheap enough
+LIMITE_CONTAGEM_EXATA = 10000
+
+
+def codificar_cursor(valores):
+    """Encode a sequence of sort values (datetimes, numbers, strings) as an opaque cursor"""
+    dados = [{'dt': valor.isoformat()} if isinstance(valor, datetime) else valor for valor in valores]
+    texto = json.dumps(dados, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Decode a cursor into a tuple of values. Raises ValueError when it is invalid"""
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as erro:
+        raise ValueError('Cursor inválido') from erro
+    if not isinstance(dados, list):
+        raise ValueError('Cursor inválido')
+
+    valores = []
+    for valor in dados:
+        if isinstance(valor, dict):
+            valor = parse_datetime(str(valor.get('dt', '')))
+            if valor is None:
+                raise ValueError('Cursor inválido')
+        valores.append(valor)
+    return tuple(valores)
+
+
+def filtro_ordenacao(ordenacao, valores, reverso=False):
+    """
+    Return the Q selecting the rows after `valores` for an ordering such as
+    ('nome', '-pk'): (a, b) > (x, y) expanded as a > x OR (a = x AND b < y).
+    With `reverso`, select the rows before them instead.
+    """
+    filtro = Q()
+    for posicao, campo in enumerate(ordenacao):
+        descendente = campo.startswith('-') != reverso
+        condicao = Q(**{f"{campo.lstrip('-')}__{'lt' if descendente else 'gt'}": valores[posicao]})
+        for anterior, valor in zip(ordenacao[:posicao], valores[:posicao]):
+            condicao &= Q(**{anterior.lstrip('-'): valor})
+        filtro |= condicao
+    return filtro
+
+
+def filtro_apos(campos, valores, descendente=True):
+    """Return the Q selecting the rows after `valores` when every field has the same direction"""
+    return filtro_ordenacao([f'-{campo}' if descendente else campo for campo in campos], valores)
+
+
+def inverter_ordenacao(ordenacao):
+    return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordenacao]
+
+
+def valor_campo(item, campo):
+    """Read a sort value from a model instance or a values() dict"""
+    campo = campo.lstrip('-')
+    return item[campo] if isinstance(item, dict) else getattr(item, campo)
+
+
+def cursor_do_item(item, ordenacao):
+    return codificar_cursor([valor_campo(item, campo) for campo in ordenacao])
+
+
+def _campo_ordenacao(model, campo):
+    """Return the model field behind an ordering entry such as '-cliente__nome' or 'pk'"""
+    partes = campo.lstrip('-').split('__')
+    for parte in partes[:-1]:
+        model = model._meta.get_field(parte).related_model
+    return model._meta.pk if partes[-1] == 'pk' else model._meta.get_field(partes[-1])
+
+
+def valores_do_cursor(model, ordenacao, cursor):
+    """
+    Decode a cursor for an ordering, converting each value with its field.
+    Raises ValueError when the cursor does not match the ordering.
+    """
+    valores = decodificar_cursor(cursor)
+    if len(valores) != len(ordenacao):
+        raise ValueError('Cursor inválido')
+    try:
+        return [
+            _campo_ordenacao(model, campo).to_python(valor) if valor is not None else None
+            for campo, valor in zip(ordenacao, valores)
+        ]
+    except (ValidationError, TypeError) as erro:
+        raise ValueError('Cursor inválido') from erro
+
+
+def paginar_keyset(queryset, ordenacao, cursor=None, limite=20, anterior=False):
+    """
+    Return (items, more) for one page of `queryset` sorted by `ordenacao`,
+    whose fields must be non-null and identify a row (end them with the pk).
+    Items come after `cursor`, or before it when `anterior` is set; `more`
+    tells whether there are further rows in that direction. Raises
+    ValueError for a cursor that does not match the ordering.
+    """
+    ordem = inverter_ordenacao(ordenacao) if anterior else list(ordenacao)
+    queryset = queryset.order_by(*ordem)
+    if cursor:
+        valores = valores_do_cursor(queryset.model, ordenacao, cursor)
+        if None in valores:
+            raise ValueError('Cursor inválido')
+        queryset = queryset.filter(filtro_ordenacao(ordenacao, valores, reverso=anterior))
+
+    itens = list(queryset[:limite + 1])
+    mais = len(itens) > limite
+    itens = itens[:limite]
+    if anterior:
+        itens.reverse()
+    return itens, mais
+
+
+def estimativa_tabela(model):
+    """
+    Planner estimate of the number of rows of a model's table (PostgreSQL
+    `pg_class.reltuples`, summed over the partitions of a partitioned table).
+    Returns None when there is no estimate (other databases, never analyzed).
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT CASE WHEN c.relkind = 'p' THEN (
+                SELECT sum(p.reltuples) FROM pg_inherits i
+                JOIN pg_class p ON p.oid = i.inhrelid
+                WHERE i.inhparent = c.oid AND p.reltuples >= 0
+            ) ELSE c.reltuples END
+            FROM pg_class c WHERE c.oid = to_regclass(%s)
+            """,
+            [model._meta.db_table]
+        )
+        linha = cursor.fetchone()
+    if not linha or linha[0] is None or linha[0] < 0:
+        return None
+    return int(linha[0])
+
+
+def contagem_estimada(queryset, limite_exato=LIMITE_CONTAGEM_EXATA):
+    """
+    Approximate row count of a queryset for page totals on large tables:
+    the table estimate for unfiltered querysets, the planner's row estimate
+    (EXPLAIN) otherwise. Small results are counted exactly.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    if not queryset.query.has_filters():
+        estimativa = estimativa_tabela(queryset.model)
+    else:
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plano = cursor.fetchone()[0]
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        estimativa = int(plano[0]['Plan']['Plan Rows'])
+
+    if estimativa is None or estimativa < limite_exato:
+        return queryset.count()
+    return estimativa
+
+
+class PaginaKeyset:
+    """Page of a keyset-paginated list (exposed as `page_obj`)"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, total_estimado=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total_estimado = total_estimado
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin paginating by keyset instead of OFFSET/COUNT(*).
+    The next page is requested with ?cursor=<page_obj.next_cursor> and the
+    previous one with ?antes=<page_obj.previous_cursor>. Set
+    `contagem_estimada = True` to expose an approximate total.
+    """
+    keyset_ordering = ('-pk',)
+    contagem_estimada = False
+
+    def paginate_queryset(self, queryset, page_size):
+        depois = self.request.GET.get('cursor')
+        antes = self.request.GET.get('antes')
+        try:
+            itens, mais = paginar_keyset(
+                queryset, self.keyset_ordering, cursor=antes or depois, limite=page_size, anterior=bool(antes)
+            )
+        except (ValueError, TypeError, ValidationError):
+            # Invalid or outdated cursor: back to the first page
+            itens, mais = paginar_keyset(queryset, self.keyset_ordering, limite=page_size)
+            depois = antes = None
+
+        # Going back there is always a next page (the one we came from), and
+        # going forward from a cursor there is always a previous one
+        tem_proximo = bool(antes) or mais
+        tem_anterior = mais if antes else bool(depois)
+        proximo = cursor_do_item(itens[-1], self.keyset_ordering) if itens and tem_proximo else None
+        anterior = cursor_do_item(itens[0], self.keyset_ordering) if itens and tem_anterior else None
+
+        total = contagem_estimada(queryset) if self.contagem_estimada else None
+        pagina = PaginaKeyset(itens, proximo, anterior, total)
+        return None, pagina, itens, pagina.has_other_pages()
+
+
+class CursorPaginacao(CursorPagination):
+    """
+    Default API pagination: opaque cursors on a unique ordering, no COUNT(*)
+    and no OFFSET. Views may override `ordering`.
+    """
+    ordering = '-pk'
+    page_size = 20
+    page_size_query_param = 'limite'
+    max_page_size = 100
@@ -0,0 +1,36 @@
+"""
+Helpers shared by model signal handlers.
+
+Several pre_save handlers compare an instance with the row it replaces
+(maintained counters, cache invalidation). `linha_anterior` reads that row
+once per save, with every column the handlers of the model registered.
+"""
+from collections import defaultdict
+
+from django.db.models.signals import post_save
+
+# model -> columns read by its pre_save handlers
+COLUNAS_ANTERIORES = defaultdict(set)
+
+
+def registrar_colunas_anteriores(model, colunas):
+    """Declare the columns pre_save handlers of `model` read through linha_anterior"""
+    COLUNAS_ANTERIORES[model].update(colunas)
+    post_save.connect(_descartar_linha_anterior, sender=model, dispatch_uid=f'linha_anterior:{model._meta.label}')
+
+
+def linha_anterior(sender, instance):
+    """
+    Return {column: stored value} of the registered columns for an instance
+    being updated ({} when the row does not exist). The first handler
+    that asks loads it; the others of the same save reuse it.
+    """
+    if '_linha_anterior' not in instance.__dict__:
+        instance._linha_anterior = sender._base_manager.filter(pk=instance.pk).values(
+            *COLUNAS_ANTERIORES[sender]
+        ).first() or {}
+    return instance._linha_anterior
+
+
+def _descartar_linha_anterior(sender, instance, **kwargs):
+    instance.__dict__.pop('_linha_anterior', None)
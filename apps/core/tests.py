@@ -0,0 +1,132 @@
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.views.generic import ListView
+
+from apps.usuarios.models import Usuario
+from .configuracao import get_configuracao
+from .contadores import agrupar_contagens, get_contador, recontar
+from .models import ContadorTabela, SystemConfiguration
+from .paginacao import KeysetPaginationMixin, codificar_cursor, cursor_do_item, paginar_keyset
+
+
+class UsuariosKeysetView(KeysetPaginationMixin, ListView):
+    model = Usuario
+    paginate_by = 2
+    keyset_ordering = ('nome', 'pk')
+
+
+class PaginacaoKeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for nome in ['Ana', 'Bia', 'Bia', 'Caio', 'Duda']:
+            Usuario.objects.create(username=f'{nome.lower()}{Usuario.objects.count()}', nome=nome)
+
+    def setUp(self):
+        self.queryset = Usuario.objects.all()
+        self.ordenacao = ('nome', 'pk')
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        vistos = []
+        cursor = None
+        while True:
+            itens, mais = paginar_keyset(self.queryset, self.ordenacao, cursor=cursor, limite=2)
+            vistos.extend(item.pk for item in itens)
+            if not mais:
+                break
+            cursor = cursor_do_item(itens[-1], self.ordenacao)
+        esperado = list(self.queryset.order_by('nome', 'pk').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_pagina_anterior(self):
+        itens, _ = paginar_keyset(self.queryset, self.ordenacao, limite=3)
+        cursor = cursor_do_item(itens[-1], self.ordenacao)
+        anteriores, mais = paginar_keyset(self.queryset, self.ordenacao, cursor=cursor, limite=2, anterior=True)
+        self.assertEqual([item.pk for item in anteriores], [item.pk for item in itens[:2]])
+        self.assertFalse(mais)
+
+    def test_cursor_invalido(self):
+        cursores = [
+            'nao-e-base64!',
+            codificar_cursor(['Ana']),
+            codificar_cursor(['Ana', 1, 2]),
+            codificar_cursor(['Ana', 'x']),
+            codificar_cursor([['Ana'], {'x': 1}]),
+            codificar_cursor([None, 1]),
+        ]
+        for cursor in cursores:
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                paginar_keyset(self.queryset, self.ordenacao, cursor=cursor)
+
+    def test_view_volta_para_primeira_pagina_com_cursor_invalido(self):
+        for cursor in [codificar_cursor(['Ana']), codificar_cursor(['Ana', 'x'])]:
+            with self.subTest(cursor=cursor):
+                request = RequestFactory().get('/', {'cursor': cursor})
+                resposta = UsuariosKeysetView.as_view()(request)
+                pagina = resposta.context_data['page_obj']
+                self.assertEqual([item.nome for item in pagina], ['Ana', 'Bia'])
+                self.assertFalse(pagina.has_previous())
+                self.assertTrue(pagina.has_next())
+
+
+class ContadoresTests(TestCase):
+
+    def setUp(self):
+        for indice in range(3):
+            Usuario.objects.create(username=f'usuario{indice}', nome=f'Usuário {indice}')
+        recontar('total_usuarios')
+
+    def test_acompanha_inclusoes_e_alteracoes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario = Usuario.objects.create(username='novo', nome='Novo')
+        self.assertEqual(get_contador('total_usuarios'), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.is_active = False
+            usuario.save()
+        self.assertEqual(get_contador('total_usuarios'), 3)
+
+    def test_save_sem_campos_contados_nao_consulta_a_linha(self):
+        usuario = Usuario.objects.get(username='usuario0')
+        with CaptureQueriesContext(connection) as consultas:
+            usuario.save(update_fields=['nome'])
+        tabela = f'FROM "{Usuario._meta.db_table}"'
+        self.assertEqual([consulta['sql'] for consulta in consultas if tabela in consulta['sql']], [])
+
+    def test_exclusao_em_lote_atualiza_uma_vez(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with agrupar_contagens():
+                Usuario.objects.filter(username__startswith='usuario').delete()
+        with CaptureQueriesContext(connection) as consultas:
+            for callback in callbacks:
+                callback()
+
+        atualizacoes = [
+            consulta for consulta in consultas
+            if consulta['sql'].startswith('UPDATE') and ContadorTabela._meta.db_table in consulta['sql']
+        ]
+        self.assertEqual(len(atualizacoes), 1)
+        self.assertEqual(get_contador('total_usuarios'), 0)
+
+
+class ConfiguracaoTests(TestCase):
+
+    def test_valores_json_somente_leitura(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SystemConfiguration.objects.create(key='horarios', value='{"seg": ["09:00", "18:00"]}')
+        horarios = get_configuracao().get_json('horarios')
+        self.assertEqual(horarios['seg'], ('09:00', '18:00'))
+        with self.assertRaises(TypeError):
+            horarios['ter'] = ()
+
+    @override_settings(SNAPSHOT_VERSION_CHECK_INTERVAL=3600)
+    def test_snapshot_recarregado_apos_alteracao(self):
+        get_configuracao()
+        with CaptureQueriesContext(connection) as consultas:
+            get_configuracao()
+        self.assertEqual(len(consultas), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SystemConfiguration.objects.create(key='lembrete_horas', value='24')
+        self.assertEqual(get_configuracao().get_int('lembrete_horas'), 24)
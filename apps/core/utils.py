@@ -0,0 +1,23 @@
+"""
+Utility functions for JT Sistemas.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def inicio_do_dia(dia):
+    """Return midnight of `dia` as an aware datetime in the project timezone"""
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def intervalo_dia(dia):
+    """Return the half-open [start, end) datetime range covering `dia`"""
+    return inicio_do_dia(dia), inicio_do_dia(dia + timedelta(days=1))
+
+
+def intervalo_mes(ano, mes):
+    """Return the half-open [start, end) datetime range covering a month"""
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio_do_dia(inicio), inicio_do_dia(fim)
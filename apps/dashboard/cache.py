@@ -0,0 +1,43 @@
+"""
+KPI cache for the dashboard.
+Results are keyed by date bucket and invalidated through a version key bumped
+whenever appointments or clients change.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.cache import bump_version_on_commit, get_or_compute
+
+DASHBOARD_VERSION_KEY = 'dashboard:kpis:version'
+
+
+def dashboard_cache_key(name, bucket=None):
+    """Return the cache key for a KPI group in a date bucket"""
+    bucket = bucket or timezone.localdate().isoformat()
+    return f'dashboard:kpis:{name}:{bucket}'
+
+
+def cached_kpis(name):
+    """
+    Decorator for dashboard methods returning KPI dictionaries.
+    The result is shared by every user for the current day.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return get_or_compute(
+                dashboard_cache_key(name),
+                lambda: method(self, *args, **kwargs),
+                version_key=DASHBOARD_VERSION_KEY,
+                timeout=getattr(settings, 'DASHBOARD_KPI_CACHE_TIMEOUT', 300),
+                stale_timeout=getattr(settings, 'DASHBOARD_KPI_STALE_TIMEOUT', 3600),
+            )
+        return wrapper
+    return decorator
+
+
+def invalidate_dashboard_kpis():
+    """Mark every cached KPI as stale after the current transaction commits"""
+    bump_version_on_commit(DASHBOARD_VERSION_KEY)
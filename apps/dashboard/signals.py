@@ -0,0 +1,33 @@
+"""
+Signals for dashboard app.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.agendamentos.models import Agendamento
+from apps.agendamentos.signals import agendamentos_alterados_em_lote
+from apps.clientes.models import Cliente
+from apps.core.contadores import registrar_contador
+from apps.funcionarios.models import Funcionario
+from apps.servicos.models import Servico
+from apps.usuarios.models import Usuario
+from .cache import invalidate_dashboard_kpis
+
+# Headline totals of the dashboard, maintained in ContadorTabela
+registrar_contador('total_usuarios', Usuario, is_active=True)
+registrar_contador('total_funcionarios', Funcionario, is_active=True, status='ativo')
+registrar_contador('total_clientes', Cliente, is_active=True, status='ativo')
+registrar_contador('total_servicos', Servico, is_active=True, status='ativo')
+registrar_contador('total_agendamentos', Agendamento, is_active=True)
+
+
+@receiver(post_save, sender=Agendamento)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Agendamento)
+@receiver(post_delete, sender=Cliente)
+@receiver(agendamentos_alterados_em_lote, sender=Agendamento)
+def invalidate_kpis(sender, **kwargs):
+    """
+    Invalidate cached dashboard KPIs when appointments or clients change.
+    """
+    invalidate_dashboard_kpis()
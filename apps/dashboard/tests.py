@@ -0,0 +1,97 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.agendamentos.models import Agendamento
+from apps.clientes.models import Cliente
+from apps.funcionarios.models import Cargo, Funcionario
+from apps.servicos.models import CategoriaServico, Servico
+from .cache import cached_kpis
+from .views import DashboardView
+
+
+class Indicadores:
+    """Counts how many times the cached KPIs are actually computed"""
+
+    def __init__(self):
+        self.calculos = 0
+
+    @cached_kpis('teste')
+    def get_indicadores(self):
+        self.calculos += 1
+        return {'total_clientes': Cliente.objects.count()}
+
+
+class CacheKpisTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nome='João', telefone='11988887777')
+        cargo = Cargo.objects.create(nome='Cabeleireiro')
+        cls.funcionario = Funcionario.objects.create(
+            nome='Ana', telefone='11999999999', cpf='111.111.111-11', data_nascimento=date(1990, 1, 1),
+            endereco='Rua A', cidade='São Paulo', estado='SP', cep='01000-000', cargo=cargo,
+            data_admissao=date(2020, 1, 1), salario_atual=Decimal('2000'),
+            horario_entrada=time(9), horario_saida=time(18), dias_trabalho='seg-sab'
+        )
+        categoria = CategoriaServico.objects.create(nome='Cabelo')
+        cls.servico = Servico.objects.create(
+            nome='Corte', descricao='Corte', categoria=categoria, preco=Decimal('50'), duracao=30
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.indicadores = Indicadores()
+
+    def agendar(self):
+        return Agendamento.objects.create(
+            cliente=self.cliente, funcionario=self.funcionario, servico=self.servico,
+            data_hora=timezone.now() + timedelta(days=1)
+        )
+
+    def test_resultado_e_reaproveitado(self):
+        self.assertEqual(self.indicadores.get_indicadores(), {'total_clientes': 1})
+        self.assertEqual(Indicadores().get_indicadores(), {'total_clientes': 1})
+        self.assertEqual(self.indicadores.calculos, 1)
+
+    def test_salvar_invalida_apos_o_commit(self):
+        self.indicadores.get_indicadores()
+
+        with self.captureOnCommitCallbacks(execute=False):
+            Cliente.objects.create(nome='Maria', telefone='11977776666')
+        self.assertEqual(self.indicadores.get_indicadores(), {'total_clientes': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.create(nome='Bia', telefone='11966665555')
+        self.assertEqual(self.indicadores.get_indicadores(), {'total_clientes': 3})
+        self.assertEqual(self.indicadores.calculos, 2)
+
+    def test_excluir_invalida(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento = self.agendar()
+        self.indicadores.get_indicadores()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            agendamento.delete()
+        self.indicadores.get_indicadores()
+        self.assertEqual(self.indicadores.calculos, 2)
+
+    def test_transicao_em_lote_invalida(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agendar()
+        self.indicadores.get_indicadores()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Agendamento.objects.confirmar_em_lote(), 1)
+        self.indicadores.get_indicadores()
+        self.assertEqual(self.indicadores.calculos, 2)
+
+    def test_indicadores_do_painel(self):
+        self.assertEqual(DashboardView().get_basic_stats()['total_clientes'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.create(nome='Maria', telefone='11977776666')
+        self.assertEqual(DashboardView().get_basic_stats()['total_clientes'], 2)
@@ -5,15 +5,15 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 from django.db.models import Count, Sum, Q, Avg
 from django.utils import timezone
-from datetime import date, timedelta, datetime
+from datetime import date, timedelta
 import json
 
-from apps.usuarios.models import Usuario
-from apps.funcionarios.models import Funcionario
 from apps.clientes.models import Cliente
 from apps.agendamentos.models import Agendamento
-from apps.servicos.models import Servico
+from apps.core.contadores import get_contadores
 from apps.core.models import AuditLog
+from apps.core.utils import inicio_do_dia
+from .cache import cached_kpis
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -42,23 +42,22 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         
         return context
     
+    @cached_kpis('basic_stats')
     def get_basic_stats(self):
         """Get basic system statistics"""
-        today = date.today()
-        this_month = today.replace(day=1)
-        
+        # Table totals come from the maintained counters (see dashboard.signals)
         return {
-            'total_usuarios': Usuario.objects.filter(is_active=True).count(),
-            'total_funcionarios': Funcionario.objects.filter(is_active=True, status='ativo').count(),
-            'total_clientes': Cliente.objects.filter(is_active=True, status='ativo').count(),
-            'total_servicos': Servico.objects.filter(is_active=True, status='ativo').count(),
-            'total_agendamentos': Agendamento.objects.filter(is_active=True).count(),
-            'agendamentos_mes': Agendamento.objects.filter(
-                data_hora__gte=this_month,
+            **get_contadores(
+                'total_usuarios',
+                'total_funcionarios',
+                'total_clientes',
+                'total_servicos',
+                'total_agendamentos',
+            ),
+            'agendamentos_mes': Agendamento.objects.no_mes().filter(
                 is_active=True
             ).count(),
-            'receita_mes': Agendamento.objects.filter(
-                data_hora__gte=this_month,
+            'receita_mes': Agendamento.objects.no_mes().filter(
                 status='concluido',
                 pago=True,
                 is_active=True
@@ -67,11 +66,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     
     def get_today_data(self):
         """Get today's data"""
-        today = date.today()
         now = timezone.now()
         
-        agendamentos_hoje = Agendamento.objects.filter(
-            data_hora__date=today,
+        agendamentos_hoje = Agendamento.objects.no_dia().filter(
             is_active=True
         ).select_related('cliente', 'funcionario', 'servico')
         
@@ -90,6 +87,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             ).aggregate(total=Sum('valor_final'))['total'] or 0,
         }
     
+    @cached_kpis('charts_data')
     def get_charts_data(self):
         """Get data for charts and graphs"""
         # Appointments by status (last 30 days)
@@ -104,12 +102,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # Monthly revenue (last 12 months)
         monthly_revenue = []
         for i in range(12):
-            month_start = (date.today().replace(day=1) - timedelta(days=32*i)).replace(day=1)
-            next_month = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+            month_start = (timezone.localdate().replace(day=1) - timedelta(days=32*i)).replace(day=1)
             
-            revenue = Agendamento.objects.filter(
-                data_hora__gte=month_start,
-                data_hora__lt=next_month,
+            revenue = Agendamento.objects.no_mes(month_start.year, month_start.month).filter(
                 status='concluido',
                 pago=True,
                 is_active=True
@@ -164,36 +159,29 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             'recent_audit': recent_audit,
         }
     
+    @cached_kpis('performance_metrics')
     def get_performance_metrics(self):
         """Get performance metrics"""
-        today = date.today()
+        today = timezone.localdate()
         last_month = today.replace(day=1) - timedelta(days=1)
-        last_month_start = last_month.replace(day=1)
-        this_month_start = today.replace(day=1)
         
         # This month vs last month
-        agendamentos_this_month = Agendamento.objects.filter(
-            data_hora__gte=this_month_start,
+        agendamentos_this_month = Agendamento.objects.no_mes().filter(
             is_active=True
         ).count()
         
-        agendamentos_last_month = Agendamento.objects.filter(
-            data_hora__gte=last_month_start,
-            data_hora__lt=this_month_start,
+        agendamentos_last_month = Agendamento.objects.no_mes(last_month.year, last_month.month).filter(
             is_active=True
         ).count()
         
         # Revenue comparison
-        receita_this_month = Agendamento.objects.filter(
-            data_hora__gte=this_month_start,
+        receita_this_month = Agendamento.objects.no_mes().filter(
             status='concluido',
             pago=True,
             is_active=True
         ).aggregate(total=Sum('valor_final'))['total'] or 0
         
-        receita_last_month = Agendamento.objects.filter(
-            data_hora__gte=last_month_start,
-            data_hora__lt=this_month_start,
+        receita_last_month = Agendamento.objects.no_mes(last_month.year, last_month.month).filter(
             status='concluido',
             pago=True,
             is_active=True
@@ -303,18 +291,16 @@ class ReportsView(LoginRequiredMixin, TemplateView):
         end_date = self.request.GET.get('end_date')
         
         if not start_date:
-            start_date = (date.today() - timedelta(days=30)).isoformat()
+            start_date = (timezone.localdate() - timedelta(days=30)).isoformat()
         if not end_date:
-            end_date = date.today().isoformat()
+            end_date = timezone.localdate().isoformat()
         
-        # Convert to datetime
-        start_datetime = datetime.fromisoformat(start_date)
-        end_datetime = datetime.fromisoformat(end_date) + timedelta(days=1)  # Include end date
+        # Convert to aware datetimes in the project timezone
+        start_datetime = inicio_do_dia(date.fromisoformat(start_date))
+        end_datetime = inicio_do_dia(date.fromisoformat(end_date) + timedelta(days=1))  # Include end date
         
         # Filter appointments
-        agendamentos = Agendamento.objects.filter(
-            data_hora__gte=start_datetime,
-            data_hora__lt=end_datetime,
+        agendamentos = Agendamento.objects.no_periodo(start_datetime, end_datetime).filter(
             is_active=True
         )
         
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("funcionarios", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContadorMatricula",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ano", models.PositiveIntegerField(unique=True, verbose_name="Ano")),
+                (
+                    "ultimo_numero",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Último Número Alocado"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Contador de Matrícula",
+                "verbose_name_plural": "Contadores de Matrícula",
+                "ordering": ["-ano"],
+            },
+        ),
+    ]
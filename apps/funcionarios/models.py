@@ -1,7 +1,7 @@
 """
 Employee models for JT Sistemas.
 """
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import RegexValidator
 from apps.core.models import BaseModel
 
@@ -54,6 +54,54 @@ class Cargo(BaseModel):
         return self.funcionarios.filter(is_active=True).count()
 
 
+class ContadorMatricula(models.Model):
+    """
+    Per-year counter of employee registration numbers (matrícula).
+    The row is locked with SELECT ... FOR UPDATE while numbers are allocated.
+    """
+    ano = models.PositiveIntegerField(
+        unique=True,
+        verbose_name='Ano'
+    )
+    ultimo_numero = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Último Número Alocado'
+    )
+
+    class Meta:
+        verbose_name = 'Contador de Matrícula'
+        verbose_name_plural = 'Contadores de Matrícula'
+        ordering = ['-ano']
+
+    def __str__(self):
+        return f"{self.ano}: {self.ultimo_numero}"
+
+    @classmethod
+    def alocar(cls, ano, quantidade=1):
+        """
+        Reserve `quantidade` consecutive numbers for a year and return the
+        first one. The counter stays locked until the caller's transaction
+        ends, so a rolled back insert does not leave gaps.
+        """
+        with transaction.atomic():
+            contador, _ = cls.objects.select_for_update().get_or_create(
+                ano=ano,
+                defaults={'ultimo_numero': lambda: cls.get_ultimo_numero_existente(ano)}
+            )
+            primeiro = contador.ultimo_numero + 1
+            contador.ultimo_numero += quantidade
+            contador.save(update_fields=['ultimo_numero'])
+        return primeiro
+
+    @staticmethod
+    def get_ultimo_numero_existente(ano):
+        """Highest number already used in a year (employees created before the counter)"""
+        prefixo = str(ano)
+        matriculas = Funcionario.objects.filter(matricula__startswith=prefixo).values_list('matricula', flat=True)
+        numeros = [int(matricula[len(prefixo):]) for matricula in matriculas if matricula[len(prefixo):].isdigit()]
+        return max(numeros, default=0)
+
+
 class Funcionario(BaseModel):
     """
     Model for employees.
@@ -260,22 +308,34 @@ class Funcionario(BaseModel):
     def save(self, *args, **kwargs):
         # Generate matricula if not provided
         if not self.matricula:
-            from django.utils import timezone
-            year = timezone.now().year
-            last_funcionario = Funcionario.objects.filter(
-                matricula__startswith=str(year)
-            ).order_by('-matricula').first()
-            
-            if last_funcionario:
-                last_number = int(last_funcionario.matricula[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.matricula = f"{year}{new_number:04d}"
+            with transaction.atomic():
+                self.matricula = Funcionario.gerar_matriculas(1)[0]
+                super().save(*args, **kwargs)
+            return
         
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def gerar_matriculas(quantidade, ano=None):
+        """Allocate a block of registration numbers ("AAAANNNN") for the year"""
+        from django.utils import timezone
+        ano = ano or timezone.now().year
+        primeiro = ContadorMatricula.alocar(ano, quantidade)
+        return [f"{ano}{numero:04d}" for numero in range(primeiro, primeiro + quantidade)]
+
+    @classmethod
+    def atribuir_matriculas(cls, funcionarios):
+        """
+        Fill the missing matricula of unsaved employees with one block
+        allocation, for bulk imports with bulk_create. Call it inside the
+        transaction that inserts them.
+        """
+        sem_matricula = [funcionario for funcionario in funcionarios if not funcionario.matricula]
+        if sem_matricula:
+            for funcionario, matricula in zip(sem_matricula, cls.gerar_matriculas(len(sem_matricula))):
+                funcionario.matricula = matricula
+        return funcionarios
+
     @property
     def nome_display(self):
         """Return the display name"""
@@ -329,29 +389,19 @@ class Funcionario(BaseModel):
 
     def get_agendamentos_hoje(self):
         """Get today's appointments for this employee"""
-        from datetime import date
         from apps.agendamentos.models import Agendamento
         
-        return Agendamento.objects.filter(
+        return Agendamento.objects.no_dia().filter(
             funcionario=self,
-            data_hora__date=date.today(),
             is_active=True
         ).exclude(status='cancelado')
 
     def get_total_agendamentos_mes(self, mes=None, ano=None):
         """Get total appointments for a specific month"""
-        from datetime import date
         from apps.agendamentos.models import Agendamento
         
-        if not mes:
-            mes = date.today().month
-        if not ano:
-            ano = date.today().year
-            
-        return Agendamento.objects.filter(
+        return Agendamento.objects.no_mes(ano, mes).filter(
             funcionario=self,
-            data_hora__month=mes,
-            data_hora__year=ano,
             is_active=True
         ).exclude(status='cancelado').count()
 
@@ -0,0 +1,49 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Cargo, ContadorMatricula, Funcionario
+
+
+def criar_funcionario(nome, cpf, **kwargs):
+    cargo, _ = Cargo.objects.get_or_create(nome='Cabeleireiro')
+    return Funcionario.objects.create(
+        nome=nome, telefone='11999999999', cpf=cpf, data_nascimento=date(1990, 1, 1),
+        endereco='Rua A', cidade='São Paulo', estado='SP', cep='01000-000', cargo=cargo,
+        data_admissao=date(2020, 1, 1), salario_atual=Decimal('2000'),
+        horario_entrada=time(9), horario_saida=time(18), dias_trabalho='seg-sab', **kwargs
+    )
+
+
+class ContadorMatriculaTests(TestCase):
+
+    def test_alocacao_sequencial(self):
+        self.assertEqual(ContadorMatricula.alocar(2026), 1)
+        self.assertEqual(ContadorMatricula.alocar(2026, quantidade=3), 2)
+        self.assertEqual(ContadorMatricula.alocar(2026), 5)
+        self.assertEqual(ContadorMatricula.objects.get(ano=2026).ultimo_numero, 5)
+        self.assertEqual(Funcionario.gerar_matriculas(2, ano=2026), ['20260006', '20260007'])
+
+    def test_virada_do_ano(self):
+        with mock.patch('django.utils.timezone.now', return_value=timezone.make_aware(datetime(2025, 12, 31, 23))):
+            ana = criar_funcionario('Ana', '111.111.111-11')
+            bia = criar_funcionario('Bia', '222.222.222-22')
+        with mock.patch('django.utils.timezone.now', return_value=timezone.make_aware(datetime(2026, 1, 1, 8))):
+            caio = criar_funcionario('Caio', '333.333.333-33')
+
+        self.assertEqual([ana.matricula, bia.matricula, caio.matricula], ['20250001', '20250002', '20260001'])
+        self.assertEqual(
+            list(ContadorMatricula.objects.values_list('ano', 'ultimo_numero')), [(2026, 1), (2025, 2)]
+        )
+
+    def test_primeiro_uso_continua_das_matriculas_existentes(self):
+        criar_funcionario('Ana', '111.111.111-11', matricula='20240007')
+        criar_funcionario('Bia', '222.222.222-22', matricula='20240003')
+        criar_funcionario('Caio', '333.333.333-33', matricula='2024-ext')
+        self.assertFalse(ContadorMatricula.objects.exists())
+
+        self.assertEqual(ContadorMatricula.alocar(2024), 8)
+        self.assertEqual(ContadorMatricula.alocar(2023), 1)
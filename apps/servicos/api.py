@@ -0,0 +1,42 @@
+"""
+API views for services.
+"""
+from rest_framework import serializers, viewsets
+
+from .models import ItemPacote, PacoteServico
+
+
+class ItemPacoteSerializer(serializers.ModelSerializer):
+    servico_nome = serializers.CharField(source='servico.nome', read_only=True)
+
+    class Meta:
+        model = ItemPacote
+        fields = ['servico', 'servico_nome', 'quantidade', 'ordem']
+
+
+class PacoteServicoSerializer(serializers.ModelSerializer):
+    itens = ItemPacoteSerializer(source='itens_pacote', many=True, read_only=True)
+    preco_individual_total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    valor_desconto = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    desconto_real_percentual = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    duracao_total_estimada = serializers.IntegerField(source='get_duracao_total_estimada', read_only=True)
+
+    class Meta:
+        model = PacoteServico
+        fields = [
+            'id', 'nome', 'descricao', 'preco_total', 'desconto_percentual', 'validade_dias',
+            'itens', 'preco_individual_total', 'valor_desconto', 'desconto_real_percentual',
+            'duracao_total_estimada',
+        ]
+
+
+class PacoteServicoViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Active service packages with their items and totals. Items and their
+    services are prefetched, so a page costs the same few queries whatever
+    the number of packages.
+    """
+    serializer_class = PacoteServicoSerializer
+
+    def get_queryset(self):
+        return PacoteServico.objects.filter(ativo=True, is_active=True).com_itens()
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ServicosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.servicos'
+    verbose_name = 'Serviços'
+
+    def ready(self):
+        import apps.servicos.signals
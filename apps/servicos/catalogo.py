@@ -0,0 +1,103 @@
+"""
+Read-through cache of the service catalog.
+
+Active categories, services (with their enabled employees) and job titles
+are loaded into a read-only snapshot kept per process; lookups hand out
+copies of the instances, so callers cannot change the shared ones. A version
+key in the shared cache is bumped whenever one of them changes, so every
+worker reloads its snapshot within SNAPSHOT_VERSION_CHECK_INTERVAL seconds.
+"""
+import copy
+from collections import defaultdict
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from apps.core.cache import bump_version_on_commit, get_local_version
+
+CATALOGO_VERSION_KEY = 'servicos:catalogo:version'
+
+# Snapshot of the current process
+_catalogo = None
+
+
+def _copiar(instancia):
+    """Copy a model instance along with its cached related instances"""
+    copia = copy.copy(instancia)
+    copia._state.fields_cache = {
+        nome: _copiar(relacionado) if relacionado is not None else None
+        for nome, relacionado in copia._state.fields_cache.items()
+    }
+    return copia
+
+
+class Instancias(Mapping):
+    """Read-only mapping of pk to model instance returning a copy on each lookup"""
+
+    def __init__(self, instancias):
+        self._instancias = instancias
+
+    def __getitem__(self, pk):
+        return _copiar(self._instancias[pk])
+
+    def __contains__(self, pk):
+        return pk in self._instancias
+
+    def __iter__(self):
+        return iter(self._instancias)
+
+    def __len__(self):
+        return len(self._instancias)
+
+
+class Catalogo:
+    """Read-only snapshot of the catalog for a given version"""
+
+    def __init__(self, versao):
+        from apps.funcionarios.models import Cargo
+        from .models import CategoriaServico, Servico
+
+        self.versao = versao
+        categorias = {categoria.pk: categoria for categoria in CategoriaServico.objects.filter(is_active=True)}
+        servicos = {
+            servico.pk: servico
+            for servico in Servico.objects.filter(is_active=True).select_related('categoria')
+        }
+        habilitados = defaultdict(list)
+        for servico_id, funcionario_id in Servico.funcionarios_habilitados.through.objects.filter(
+            servico_id__in=list(servicos)
+        ).values_list('servico_id', 'funcionario_id'):
+            habilitados[servico_id].append(funcionario_id)
+
+        self.categorias = Instancias(categorias)
+        self._servicos = servicos
+        self.servicos = Instancias(servicos)
+        self.funcionarios_habilitados = MappingProxyType({
+            servico_id: frozenset(ids) for servico_id, ids in habilitados.items()
+        })
+        self.cargos = Instancias({cargo.pk: cargo for cargo in Cargo.objects.filter(is_active=True)})
+
+    def get_servicos_disponiveis(self, categoria_id=None):
+        """Return the bookable services, optionally of a single category"""
+        return [
+            _copiar(servico) for servico in self._servicos.values()
+            if servico.is_disponivel and categoria_id in (None, servico.categoria_id)
+        ]
+
+    def pode_realizar(self, servico_id, funcionario_id):
+        """Check if an employee may perform a service (anyone when none is configured)"""
+        habilitados = self.funcionarios_habilitados.get(servico_id)
+        return not habilitados or funcionario_id in habilitados
+
+
+def get_catalogo():
+    """Return the catalog snapshot, reloading it when the shared version changed"""
+    global _catalogo
+    versao = get_local_version(CATALOGO_VERSION_KEY)
+    if _catalogo is None or _catalogo.versao != versao:
+        _catalogo = Catalogo(versao)
+    return _catalogo
+
+
+def invalidar_catalogo():
+    """Make every worker reload the catalog after the current transaction commits"""
+    bump_version_on_commit(CATALOGO_VERSION_KEY)
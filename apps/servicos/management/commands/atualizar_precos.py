@@ -0,0 +1,23 @@
+"""
+Rolls the effective price table forward (run daily via cron).
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.servicos.precos import atualizar_tabela_precos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela de preços efetivos para a janela de dias configurada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=getattr(settings, 'PRECOS_JANELA_DIAS', 60),
+            help='Tamanho da janela, em dias a partir de hoje'
+        )
+
+    def handle(self, *args, **options):
+        total = atualizar_tabela_precos(dias=options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{total} preço(s) diário(s) gerado(s).'))
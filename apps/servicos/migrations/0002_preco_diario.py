@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("servicos", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PrecoDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("data", models.DateField(verbose_name="Data")),
+                (
+                    "preco",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Preço Efetivo"
+                    ),
+                ),
+                (
+                    "promocional",
+                    models.BooleanField(
+                        default=False, verbose_name="Preço Promocional"
+                    ),
+                ),
+                (
+                    "pacote",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="precos_diarios",
+                        to="servicos.pacoteservico",
+                        verbose_name="Pacote",
+                    ),
+                ),
+                (
+                    "servico",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="precos_diarios",
+                        to="servicos.servico",
+                        verbose_name="Serviço",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Preço Diário",
+                "verbose_name_plural": "Preços Diários",
+                "ordering": ["data", "servico"],
+                "indexes": [
+                    models.Index(
+                        fields=["data", "servico"], name="servicos_pr_data_42c61a_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="precodiario",
+            constraint=models.UniqueConstraint(
+                fields=("servico", "pacote", "data"), name="preco_diario_unico"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="precodiario",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("pacote__isnull", True)),
+                fields=("servico", "data"),
+                name="preco_diario_avulso_unico",
+            ),
+        ),
+    ]
@@ -2,6 +2,8 @@
 Service models for JT Sistemas.
 """
 from django.db import models
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.core.models import BaseModel
 
@@ -244,30 +246,45 @@ class Servico(BaseModel):
         ]
 
     def __str__(self):
-        return f"{self.nome} - {self.categoria.nome}"
+        return f"{self.nome} - {self.get_categoria().nome}"
+
+    def get_categoria(self):
+        """Return the category without querying when it is in the catalog snapshot"""
+        if not Servico.categoria.is_cached(self):
+            from .catalogo import get_catalogo
+            categoria = get_catalogo().categorias.get(self.categoria_id)
+            if categoria is not None:
+                return categoria
+        return self.categoria
 
     @property
     def preco_atual(self):
-        """Return current price (promotional if active, otherwise regular)"""
-        if self.is_promocao_ativa and self.preco_promocional:
-            return self.preco_promocional
-        return self.preco
+        """Return today's price from the price table (promotional if active, otherwise regular)"""
+        from .precos import get_tabela_precos
+        return get_tabela_precos().preco(self)
 
     @property
     def is_promocao_ativa(self):
-        """Check if promotional price is currently active"""
+        """Check if promotional price is active today (project timezone)"""
+        return self.is_promocao_ativa_em(timezone.localdate())
+
+    def preco_em(self, dia):
+        """Return the price on a given day (promotional if active, otherwise regular)"""
+        if self.is_promocao_ativa_em(dia) and self.preco_promocional:
+            return self.preco_promocional
+        return self.preco
+
+    def is_promocao_ativa_em(self, dia):
+        """Check if promotional price is active on a given day"""
         if not self.preco_promocional:
             return False
         
-        from datetime import date
-        today = date.today()
-        
         if self.data_inicio_promocao and self.data_fim_promocao:
-            return self.data_inicio_promocao <= today <= self.data_fim_promocao
+            return self.data_inicio_promocao <= dia <= self.data_fim_promocao
         elif self.data_inicio_promocao:
-            return today >= self.data_inicio_promocao
+            return dia >= self.data_inicio_promocao
         elif self.data_fim_promocao:
-            return today <= self.data_fim_promocao
+            return dia <= self.data_fim_promocao
         else:
             return self.status == 'promocao'
 
@@ -311,7 +328,7 @@ class Servico(BaseModel):
     @property
     def cor_exibicao(self):
         """Return display color (own color or category color)"""
-        return self.cor_identificacao or self.categoria.cor_identificacao
+        return self.cor_identificacao or self.get_categoria().cor_identificacao
 
     @property
     def is_disponivel(self):
@@ -366,25 +383,43 @@ class Servico(BaseModel):
 
     def pode_ser_agendado_por_funcionario(self, funcionario):
         """Check if a specific employee can perform this service"""
+        from .catalogo import get_catalogo
+        catalogo = get_catalogo()
+        if self.pk in catalogo.servicos:
+            return catalogo.pode_realizar(self.pk, funcionario.id)
+
         if not self.funcionarios_habilitados.exists():
             return True
         return self.funcionarios_habilitados.filter(id=funcionario.id).exists()
 
     def get_agendamentos_hoje(self):
         """Get today's appointments for this service"""
-        from datetime import date
         from apps.agendamentos.models import Agendamento
         
-        return Agendamento.objects.filter(
+        return Agendamento.objects.no_dia().filter(
             servico=self,
-            data_hora__date=date.today(),
             is_active=True
         ).exclude(status='cancelado')
 
 
+class PacoteServicoQuerySet(models.QuerySet):
+    """QuerySet for service packages"""
+
+    def com_itens(self):
+        """
+        Prefetch the items with their services in two queries, so the
+        package totals don't query per package or per item.
+        """
+        return self.prefetch_related(
+            models.Prefetch('itens_pacote', queryset=ItemPacote.objects.select_related('servico'))
+        )
+
+
 class PacoteServico(BaseModel):
     """
     Model for service packages (multiple services bundled together).
+    Totals are computed once per instance from `itens_pacote` (use
+    `PacoteServico.objects.com_itens()` when listing packages).
     """
     nome = models.CharField(
         max_length=100,
@@ -428,6 +463,8 @@ class PacoteServico(BaseModel):
         verbose_name='Pacote Ativo'
     )
 
+    objects = PacoteServicoQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Pacote de Serviços'
         verbose_name_plural = 'Pacotes de Serviços'
@@ -436,13 +473,26 @@ class PacoteServico(BaseModel):
     def __str__(self):
         return self.nome
 
+    @cached_property
+    def totais_itens(self):
+        """Individual price and duration of all items, computed in a single pass"""
+        from .precos import get_tabela_precos
+
+        tabela_precos = get_tabela_precos()
+        preco = 0
+        duracao = 0
+        itens = self.itens_pacote.all()
+        if 'itens_pacote' not in getattr(self, '_prefetched_objects_cache', {}):
+            itens = itens.select_related('servico')
+        for item in itens:
+            preco += tabela_precos.preco(item.servico) * item.quantidade
+            duracao += item.servico.duracao_em_minutos * item.quantidade
+        return {'preco': preco, 'duracao': duracao}
+
     @property
     def preco_individual_total(self):
         """Calculate total price if services were bought individually"""
-        total = 0
-        for item in self.itens_pacote.all():
-            total += item.servico.preco_atual * item.quantidade
-        return total
+        return self.totais_itens['preco']
 
     @property
     def valor_desconto(self):
@@ -460,10 +510,7 @@ class PacoteServico(BaseModel):
 
     def get_duracao_total_estimada(self):
         """Get estimated total duration for all services in the package"""
-        total_minutos = 0
-        for item in self.itens_pacote.all():
-            total_minutos += item.servico.duracao_em_minutos * item.quantidade
-        return total_minutos
+        return self.totais_itens['duracao']
 
 
 class ItemPacote(models.Model):
@@ -499,4 +546,57 @@ class ItemPacote(models.Model):
         unique_together = ['pacote', 'servico']
 
     def __str__(self):
-        return f"{self.pacote.nome} - {self.servico.nome} ({self.quantidade}x)"
\ No newline at end of file
+        return f"{self.pacote.nome} - {self.servico.nome} ({self.quantidade}x)"
+
+
+class PrecoDiario(models.Model):
+    """
+    Precomputed effective price of a service on a day, standalone (no
+    package) or within a package. Maintained by apps.servicos.precos for a
+    rolling window.
+    """
+    servico = models.ForeignKey(
+        Servico,
+        on_delete=models.CASCADE,
+        related_name='precos_diarios',
+        verbose_name='Serviço'
+    )
+    pacote = models.ForeignKey(
+        PacoteServico,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='precos_diarios',
+        verbose_name='Pacote'
+    )
+    data = models.DateField(
+        verbose_name='Data'
+    )
+    preco = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Preço Efetivo'
+    )
+    promocional = models.BooleanField(
+        default=False,
+        verbose_name='Preço Promocional'
+    )
+
+    class Meta:
+        verbose_name = 'Preço Diário'
+        verbose_name_plural = 'Preços Diários'
+        ordering = ['data', 'servico']
+        constraints = [
+            models.UniqueConstraint(fields=['servico', 'pacote', 'data'], name='preco_diario_unico'),
+            models.UniqueConstraint(
+                fields=['servico', 'data'],
+                condition=models.Q(pacote__isnull=True),
+                name='preco_diario_avulso_unico'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'servico']),
+        ]
+
+    def __str__(self):
+        return f"{self.servico.nome} - {self.data:%d/%m/%Y}: R$ {self.preco}"
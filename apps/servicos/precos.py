@@ -0,0 +1,144 @@
+"""
+Effective price table.
+
+Prices (promotions and package discounts included) are precomputed per
+service per day for a rolling window in PrecoDiario. Lookups go through a
+TabelaPrecos snapshot of a day, cached and invalidated through a version key
+whenever the table is refreshed.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.core.cache import bump_version_on_commit, get_or_compute
+from .models import ItemPacote, PacoteServico, PrecoDiario, Servico
+
+PRECOS_VERSION_KEY = 'servicos:precos:version'
+
+# Attempts of a refresh that collides with a concurrent one
+TENTATIVAS_ATUALIZACAO = 3
+
+
+def calcular_preco(servico, dia, pacote=None):
+    """Return the effective price of a service on a day, within a package if given"""
+    preco = servico.preco_em(dia)
+    if pacote is not None and pacote.desconto_percentual:
+        preco = (preco * (100 - pacote.desconto_percentual) / 100).quantize(Decimal('0.01'))
+    return preco
+
+
+def atualizar_tabela_precos(servico_ids=None, pacote_ids=None, inicio=None, dias=None):
+    """
+    Rebuild the price rows from `inicio` (today) for `dias` days, restricted
+    to the given services or packages (everything by default), and drop the
+    rows before `inicio`. Returns the number of rows written.
+
+    Refreshes run after the commit that triggered them, so two of them may
+    rewrite the same rows at once; the one that hits the unique constraints
+    is recomputed from the committed data and retried.
+    """
+    inicio = inicio or timezone.localdate()
+    dias = dias or getattr(settings, 'PRECOS_JANELA_DIAS', 60)
+    janela = [inicio + timedelta(days=deslocamento) for deslocamento in range(dias)]
+
+    for tentativa in range(1, TENTATIVAS_ATUALIZACAO + 1):
+        try:
+            return _reconstruir_precos(servico_ids, pacote_ids, inicio, janela)
+        except IntegrityError:
+            if tentativa == TENTATIVAS_ATUALIZACAO:
+                raise
+
+
+def _reconstruir_precos(servico_ids, pacote_ids, inicio, janela):
+    """Replace the price rows of `janela` in one transaction"""
+    pares = []
+    if pacote_ids is None:
+        servicos = Servico.objects.filter(is_active=True)
+        if servico_ids is not None:
+            servicos = servicos.filter(pk__in=servico_ids)
+        pares.extend((servico, None) for servico in servicos)
+
+    itens = ItemPacote.objects.filter(
+        pacote__ativo=True,
+        pacote__is_active=True,
+        servico__is_active=True
+    ).select_related('servico', 'pacote')
+    substituidas = PrecoDiario.objects.filter(data__gte=inicio)
+    if servico_ids is not None:
+        itens = itens.filter(servico_id__in=servico_ids)
+        substituidas = substituidas.filter(servico_id__in=servico_ids)
+    if pacote_ids is not None:
+        itens = itens.filter(pacote_id__in=pacote_ids)
+        substituidas = substituidas.filter(pacote_id__in=pacote_ids)
+    pares.extend((item.servico, item.pacote) for item in itens)
+
+    linhas = [
+        PrecoDiario(
+            servico=servico,
+            pacote=pacote,
+            data=dia,
+            preco=calcular_preco(servico, dia, pacote),
+            promocional=servico.is_promocao_ativa_em(dia),
+        )
+        for servico, pacote in pares
+        for dia in janela
+    ]
+    with transaction.atomic():
+        PrecoDiario.objects.filter(data__lt=inicio).delete()
+        substituidas.delete()
+        PrecoDiario.objects.bulk_create(linhas, batch_size=1000)
+        bump_version_on_commit(PRECOS_VERSION_KEY)
+    return len(linhas)
+
+
+class TabelaPrecos:
+    """
+    Read-only snapshot of the effective prices of a day.
+    Keep one instance for a whole booking session (quote, confirmation,
+    bulk creation) so every price in it is consistent.
+    """
+
+    def __init__(self, dia, precos):
+        self.dia = dia
+        self.precos = MappingProxyType(precos)
+
+    def preco(self, servico, pacote=None):
+        """Return the price of a service (instance or id), within a package if given"""
+        servico_id = getattr(servico, 'pk', servico)
+        pacote_id = getattr(pacote, 'pk', pacote)
+        preco = self.precos.get((servico_id, pacote_id))
+        if preco is not None:
+            return preco
+
+        # Outside the window or not refreshed yet: compute on the spot
+        if not isinstance(servico, Servico):
+            servico = Servico.objects.get(pk=servico_id)
+        if pacote_id is not None and not isinstance(pacote, PacoteServico):
+            pacote = PacoteServico.objects.get(pk=pacote_id)
+        return calcular_preco(servico, self.dia, pacote)
+
+
+def carregar_precos(dia):
+    """Return {(servico_id, pacote_id): preco} for a day from the price table"""
+    return {
+        (servico_id, pacote_id): preco
+        for servico_id, pacote_id, preco in PrecoDiario.objects.filter(data=dia).values_list(
+            'servico_id', 'pacote_id', 'preco'
+        )
+    }
+
+
+def get_tabela_precos(dia=None):
+    """Return the price snapshot of a day (today by default)"""
+    dia = dia or timezone.localdate()
+    precos = get_or_compute(
+        f'servicos:precos:{dia.isoformat()}',
+        lambda: carregar_precos(dia),
+        version_key=PRECOS_VERSION_KEY,
+        timeout=getattr(settings, 'PRECOS_CACHE_TIMEOUT', 3600),
+    )
+    return TabelaPrecos(dia, precos)
@@ -0,0 +1,38 @@
+"""
+Signals for servicos app.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.funcionarios.models import Cargo
+from .catalogo import invalidar_catalogo
+from .models import CategoriaServico, ItemPacote, PacoteServico, Servico
+from .precos import atualizar_tabela_precos
+
+
+@receiver(post_save, sender=Servico)
+def atualizar_precos_servico(sender, instance, **kwargs):
+    """Rebuild the price rows of a service once its changes are committed"""
+    transaction.on_commit(lambda: atualizar_tabela_precos(servico_ids=[instance.pk]))
+
+
+@receiver(post_save, sender=PacoteServico)
+@receiver(post_save, sender=ItemPacote)
+@receiver(post_delete, sender=ItemPacote)
+def atualizar_precos_pacote(sender, instance, **kwargs):
+    """Rebuild the price rows of a package when it or its items change"""
+    pacote_id = instance.pk if sender is PacoteServico else instance.pacote_id
+    transaction.on_commit(lambda: atualizar_tabela_precos(pacote_ids=[pacote_id]))
+
+
+@receiver(post_save, sender=CategoriaServico)
+@receiver(post_save, sender=Servico)
+@receiver(post_save, sender=Cargo)
+@receiver(post_delete, sender=CategoriaServico)
+@receiver(post_delete, sender=Servico)
+@receiver(post_delete, sender=Cargo)
+@receiver(m2m_changed, sender=Servico.funcionarios_habilitados.through)
+def invalidar_catalogo_servicos(sender, **kwargs):
+    """Invalidate the catalog snapshot of every worker"""
+    invalidar_catalogo()
@@ -0,0 +1,171 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.agendamentos.models import Agendamento
+from apps.core.cache import bump_version
+from apps.usuarios.models import Usuario
+from .catalogo import CATALOGO_VERSION_KEY, get_catalogo
+from .models import CategoriaServico, ItemPacote, PacoteServico, PrecoDiario, Servico
+from .precos import atualizar_tabela_precos, get_tabela_precos
+
+
+def criar_servico(nome, preco, **kwargs):
+    categoria, _ = CategoriaServico.objects.get_or_create(nome='Cabelo')
+    return Servico.objects.create(
+        nome=nome, descricao=nome, categoria=categoria, preco=Decimal(preco), duracao=30, **kwargs
+    )
+
+
+class PrecosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoje = timezone.localdate()
+        cls.corte = criar_servico('Corte', '100')
+        cls.escova = criar_servico(
+            'Escova', '50', preco_promocional=Decimal('40'),
+            data_inicio_promocao=cls.hoje + timedelta(days=2),
+            data_fim_promocao=cls.hoje + timedelta(days=4),
+        )
+        cls.pacote = PacoteServico.objects.create(
+            nome='Cortes', descricao='Cortes', preco_total=Decimal('180'), desconto_percentual=Decimal('10')
+        )
+        ItemPacote.objects.create(pacote=cls.pacote, servico=cls.corte, quantidade=2)
+
+    def test_janela_da_promocao(self):
+        atualizar_tabela_precos(servico_ids=[self.escova.pk], dias=7)
+
+        linhas = PrecoDiario.objects.filter(servico=self.escova, pacote=None).order_by('data')
+        self.assertEqual(
+            [(linha.preco, linha.promocional) for linha in linhas],
+            [(Decimal('50'), False)] * 2 + [(Decimal('40'), True)] * 3 + [(Decimal('50'), False)] * 2
+        )
+        self.assertFalse(self.escova.is_promocao_ativa)
+        self.assertEqual(self.escova.preco_atual, Decimal('50'))
+        self.assertEqual(get_tabela_precos(self.hoje + timedelta(days=3)).preco(self.escova), Decimal('40'))
+
+    def test_preco_do_pacote(self):
+        atualizar_tabela_precos(dias=1)
+        tabela = get_tabela_precos()
+        self.assertEqual(tabela.preco(self.corte), Decimal('100'))
+        self.assertEqual(tabela.preco(self.corte, self.pacote), Decimal('90'))
+
+        for pacote in (self.pacote, None):
+            with self.subTest(pacote=pacote):
+                agendamento = Agendamento(
+                    servico=self.corte, pacote=pacote, data_hora=timezone.now() + timedelta(days=1)
+                )
+                agendamento.calcular_campos_derivados(tabela)
+                self.assertEqual(agendamento.valor_servico, Decimal('90') if pacote else Decimal('100'))
+
+    def test_salvar_servico_atualiza_a_tabela(self):
+        atualizar_tabela_precos(dias=1)
+        self.assertEqual(self.corte.preco_atual, Decimal('100'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.corte.preco = Decimal('120')
+            self.corte.save()
+
+        linha = PrecoDiario.objects.get(servico=self.corte, pacote=None, data=self.hoje)
+        self.assertEqual(linha.preco, Decimal('120'))
+        self.assertEqual(get_tabela_precos().preco(self.corte, self.pacote), Decimal('108'))
+        self.assertEqual(Servico.objects.get(pk=self.corte.pk).preco_atual, Decimal('120'))
+
+
+class PacoteApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.servicos = [criar_servico(nome, preco) for nome, preco in [('Corte', '50'), ('Escova', '40')]]
+        cls.usuario = Usuario.objects.create(username='adm', nome='Administrador')
+
+    def setUp(self):
+        self.api = APIClient(SERVER_NAME='localhost')
+        self.api.force_authenticate(self.usuario)
+
+    def criar_pacote(self, nome):
+        pacote = PacoteServico.objects.create(nome=nome, descricao=nome, preco_total=Decimal('80'))
+        for ordem, servico in enumerate(self.servicos):
+            ItemPacote.objects.create(pacote=pacote, servico=servico, quantidade=1, ordem=ordem)
+        return pacote
+
+    def listar(self):
+        get_tabela_precos()
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.api.get('/api/pacotes/')
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.data['results'], len(consultas)
+
+    def test_consultas_nao_crescem_com_os_pacotes(self):
+        self.criar_pacote('Pacote 1')
+        _, uma = self.listar()
+
+        for indice in range(2, 6):
+            self.criar_pacote(f'Pacote {indice}')
+        pacotes, varias = self.listar()
+
+        self.assertEqual(len(pacotes), 5)
+        self.assertEqual(varias, uma)
+        self.assertEqual(varias, 2)
+        pacote = pacotes[0]
+        self.assertEqual([item['servico_nome'] for item in pacote['itens']], ['Corte', 'Escova'])
+        self.assertEqual(
+            (pacote['preco_individual_total'], pacote['valor_desconto'], pacote['duracao_total_estimada']),
+            ('90.00', '10.00', 60)
+        )
+
+
+@override_settings(SNAPSHOT_VERSION_CHECK_INTERVAL=3600)
+class CatalogoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corte = criar_servico('Corte', '50')
+
+    def setUp(self):
+        bump_version(CATALOGO_VERSION_KEY)
+
+    def test_snapshot_reaproveitado_ate_a_versao_mudar(self):
+        catalogo = get_catalogo()
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertIs(get_catalogo(), catalogo)
+        self.assertEqual(len(consultas), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.corte.nome = 'Corte masculino'
+            self.corte.save()
+            self.assertIs(get_catalogo(), catalogo)
+
+        recarregado = get_catalogo()
+        self.assertIsNot(recarregado, catalogo)
+        self.assertEqual(recarregado.servicos[self.corte.pk].nome, 'Corte masculino')
+        self.assertEqual(catalogo.servicos[self.corte.pk].nome, 'Corte')
+
+    def test_versao_alterada_por_outro_processo(self):
+        catalogo = get_catalogo()
+        criar_servico('Escova', '40')
+        # Another worker bumped the shared key: seen once the check interval ends
+        cache.set(CATALOGO_VERSION_KEY, 1, timeout=None)
+        self.assertIs(get_catalogo(), catalogo)
+
+        with override_settings(SNAPSHOT_VERSION_CHECK_INTERVAL=0):
+            recarregado = get_catalogo()
+        self.assertEqual(recarregado.versao, 1)
+        self.assertEqual(
+            sorted(servico.nome for servico in recarregado.get_servicos_disponiveis()), ['Corte', 'Escova']
+        )
+
+    def test_instancias_sao_copias(self):
+        servico = get_catalogo().servicos[self.corte.pk]
+        servico.nome = 'Alterado'
+        servico.categoria.nome = 'Alterada'
+
+        original = get_catalogo().servicos[self.corte.pk]
+        self.assertEqual((original.nome, original.categoria.nome), ('Corte', 'Cabelo'))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:35
+
+from django.db import migrations, models
+
+from apps.core.migracoes import AddIndexConcurrentlyNoPostgres
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("usuarios", "0001_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyNoPostgres(
+            model_name="usuario",
+            index=models.Index(fields=["nome", "id"], name="usuario_nome_id_idx"),
+        ),
+    ]
@@ -119,6 +119,8 @@ class Usuario(AbstractUser, TimestampedModel):
             models.Index(fields=['tipo_usuario']),
             models.Index(fields=['is_active']),
             models.Index(fields=['email']),
+            # Keyset pagination of the user list
+            models.Index(fields=['nome', 'id'], name='usuario_nome_id_idx'),
         ]
 
     def __str__(self):
@@ -10,6 +10,8 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.db.models import Q
 
+from apps.core.paginacao import KeysetPaginationMixin
+
 from .models import Usuario, PerfilUsuario
 from .forms import CustomLoginForm, UsuarioCreateForm, UsuarioUpdateForm, PerfilUsuarioForm
 
@@ -156,7 +158,7 @@ class UsuarioCreateView(LoginRequiredMixin, CreateView):
         return ip
 
 
-class UsuarioListView(LoginRequiredMixin, ListView):
+class UsuarioListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     List all users view.
     """
@@ -164,6 +166,8 @@ class UsuarioListView(LoginRequiredMixin, ListView):
     template_name = 'usuarios/usuario_list.html'
     context_object_name = 'usuarios'
     paginate_by = 20
+    keyset_ordering = ('nome', 'pk')
+    contagem_estimada = True
     
     def get_queryset(self):
         queryset = Usuario.objects.filter(is_active=True).select_related('perfil')
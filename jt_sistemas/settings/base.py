@@ -142,7 +142,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.paginacao.CursorPaginacao',
     'PAGE_SIZE': 20,
 }
 
@@ -224,6 +224,25 @@ CACHES = {
     }
 }
 
+# Dashboard KPI cache (seconds)
+DASHBOARD_KPI_CACHE_TIMEOUT = 300
+DASHBOARD_KPI_STALE_TIMEOUT = 3600
+
+# Effective price table: days precomputed ahead and snapshot cache (seconds)
+PRECOS_JANELA_DIAS = 60
+PRECOS_CACHE_TIMEOUT = 3600
+
+# Availability cache (seconds); entries are also invalidated per employee and day
+DISPONIBILIDADE_CACHE_TIMEOUT = 300
+DISPONIBILIDADE_STALE_TIMEOUT = 60
+
+# Per-process snapshots (catalog, configuration) check their shared cache
+# version at most this often (seconds)
+SNAPSHOT_VERSION_CHECK_INTERVAL = 2
+
+# Maximum number of rows per bulk appointment request
+AGENDAMENTOS_LOTE_MAXIMO = 500
+
 # WhatsApp Bot Configuration
 WHATSAPP_TOKEN = config('WHATSAPP_TOKEN', default='')
 WHATSAPP_PHONE_ID = config('WHATSAPP_PHONE_ID', default='')
@@ -41,10 +41,11 @@ CSRF_COOKIE_SECURE = False
 # Email backend for development (prints to console)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
-# Cache configuration for development (use dummy cache)
+# Cache configuration for development (in-process memory cache)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jt-sistemas-dev',
     }
 }
 